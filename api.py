@@ -0,0 +1,313 @@
+"""
+Itinerary HTTP API
+The generation pipeline as a small HTTP service for other internal services,
+scalable separately from the Streamlit UI. POST a trip and read the
+itinerary back as NDJSON: one event per line, each stage sent as soon as it
+completes.
+
+    python api.py --port 8600
+
+    POST /itineraries              trip parameters (JSON) -> NDJSON event stream
+    GET  /itineraries/<id>         a finished or saved itinerary (JSON)
+    GET  /itineraries/<id>/<fmt>   export it: pdf, txt, html, md, ics or json
+    POST /exports/<fmt>            export an itinerary posted as JSON
+    GET  /health                   provider health and job counts
+
+Trip parameters (only `destination` or `legs` is required):
+    {"from_place": "Mumbai", "destination": "Paris", "start_date": "2026-11-02",
+     "num_days": 3, "num_people": 2, "budget": 25000, "fast": false}
+`destination` is a place name (resolved like the UI's search box) or a place
+object with name/latitude/longitude. A multi-city trip sends
+"legs": [{"destination": ..., "days": 2}, ...] instead.
+
+Events, one JSON object per line:
+    {"event": "accepted", "id": ..., "destination": ...}
+    {"event": "started"}                               (once a worker picks it up)
+    {"event": "stage", "stage": "weather", "data": ...} (multi-city events carry "leg")
+    {"event": "itinerary", "id": ..., "links": {...}, "data": ...}
+    {"event": "error", "message": ...}
+Stage names: weather, attractions, activities, hotels, images, packing tips, news, daily plans
+(sent in the order they finish, not in this order).
+"""
+
+import argparse
+import json
+import math
+import queue
+import re
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+import app
+import exports
+import jobs
+import llm
+import saved
+from pdf_render import render_pdf, submit_pdf
+from providers import health_stats
+
+PDF_TIMEOUT_S = 60
+MAX_BODY_BYTES = 2 * 2 ** 20
+
+# Export formats by URL suffix: (render(itinerary) -> str | bytes, content type)
+EXPORTS = {
+    "txt": (app.create_pdf_content, "text/plain; charset=utf-8"),
+    **{extension: (render, f"{mime}; charset=utf-8") for extension, (render, mime, _) in exports.FORMATS.items()},
+}
+
+_EXPORT_PATH = re.compile(r"^/itineraries/([0-9a-f]+)/([a-z]+)$")
+_ITINERARY_PATH = re.compile(r"^/itineraries/([0-9a-f]+)$")
+
+
+class BadRequest(Exception):
+    """The trip parameters can't be used; sent back as a 400."""
+
+
+def resolve_destination(value: Any) -> Dict[str, Any]:
+    """
+    A place object as the pipeline expects it, from a name or a place object.
+    """
+    if isinstance(value, dict) and value.get("latitude") is not None and value.get("longitude") is not None:
+        return {"timezone": "UTC", **value, "name": value.get("name") or f"{value['latitude']},{value['longitude']}"}
+    if isinstance(value, str) and value.strip():
+        place = app.find_destination(value.strip())
+        if place is not None:
+            return place
+        raise BadRequest(f"No place named {value!r}; send a more complete name or an object with latitude and longitude")
+    raise BadRequest("destination must be a place name or an object with latitude and longitude")
+
+
+def parse_trip(body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validated trip parameters, with the UI's defaults for anything left out.
+    """
+    try:
+        trip = {
+            "from_place": str(body.get("from_place") or ""),
+            "start_date": date.fromisoformat(body.get("start_date") or (date.today() + timedelta(days=1)).isoformat()),
+            "num_days": int(body.get("num_days", 3)),
+            "num_people": int(body.get("num_people", 2)),
+            "budget": float(body.get("budget", 25000)),
+            "fast": bool(body.get("fast", False)),
+        }
+    except (TypeError, ValueError) as e:
+        raise BadRequest(f"Invalid trip parameters: {e}")
+    if body.get("legs"):
+        legs = body["legs"]
+        if not isinstance(legs, list) or not 2 <= len(legs) <= app.MAX_LEGS:
+            raise BadRequest(f"legs must list 2-{app.MAX_LEGS} cities")
+        if not all(isinstance(leg, dict) for leg in legs):
+            raise BadRequest("each leg must be an object with destination and days")
+        days = [leg.get("days", 2) for leg in legs]
+        if not all(isinstance(d, int) and not isinstance(d, bool) and d >= 1 for d in days):
+            raise BadRequest("each leg's days must be a whole number of at least 1")
+        trip["legs"] = [{"destination": resolve_destination(leg.get("destination")), "days": d}
+                        for leg, d in zip(legs, days)]
+        trip["num_days"] = sum(days)
+    else:
+        trip["destination"] = resolve_destination(body.get("destination"))
+
+    if not 1 <= trip["num_days"] <= 30 or not 1 <= trip["num_people"] <= 20 \
+            or not math.isfinite(trip["budget"]) or trip["budget"] <= 0:
+        raise BadRequest("num_days (the legs' days combined) must be 1-30, num_people 1-20 and budget a positive number")
+    return trip
+
+
+def start_generation(trip: Dict[str, Any], events: "queue.Queue") -> "jobs.Job":
+    """
+    Queue the generation as a job (sharing the UI's worker limit); stages go to `events`.
+    """
+    def on_stage(name: str, data: Any, leg: Optional[int] = None) -> None:
+        event = {"event": "stage", "stage": name, "data": data}
+        if leg is not None:
+            event["leg"] = leg
+        events.put(event)
+
+    llm.set_fast_mode(trip["fast"])  # carried into the job's context
+    if "legs" in trip:
+        return jobs.start_job(
+            " → ".join(leg["destination"]["name"] for leg in trip["legs"]),
+            app.build_trip, trip["legs"], trip["from_place"], trip["start_date"], trip["num_people"],
+            trip["budget"], on_stage=on_stage
+        )
+    return jobs.start_job(
+        trip["destination"]["name"],
+        app.build_itinerary, trip["destination"], trip["from_place"], trip["start_date"], trip["num_days"],
+        trip["num_people"], trip["budget"], on_stage=on_stage
+    )
+
+
+def export_links(job_id: str) -> Dict[str, str]:
+    return {extension: f"/itineraries/{job_id}/{extension}" for extension in ["pdf", *EXPORTS]}
+
+
+def render_export(itinerary: Dict[str, Any], extension: str,
+                  day_images: Optional[Dict[str, bytes]] = None) -> Optional[tuple]:
+    """
+    (body bytes, content type), or None for an unknown format.
+    `day_images` are the day visuals a PDF includes.
+    """
+    if extension == "pdf":
+        try:
+            return submit_pdf(itinerary, day_images).result(timeout=PDF_TIMEOUT_S), "application/pdf"
+        except (BrokenProcessPool, OSError) as e:
+            print(f"PDF pool unavailable, rendering inline: {e}")
+            return render_pdf(itinerary, day_images), "application/pdf"
+    if extension not in EXPORTS:
+        return None
+    render, content_type = EXPORTS[extension]
+    body = render(itinerary)
+    return (body.encode("utf-8") if isinstance(body, str) else body), content_type
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "IterationPlannerAPI/1"
+
+    # -- helpers ---------------------------------------------------------------
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        self._send(status, json.dumps(payload, default=str).encode("utf-8"), "application/json")
+
+    def _read_json(self) -> Dict[str, Any]:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise BadRequest("Content-Length must be a number")
+        if length < 0:
+            raise BadRequest("Content-Length must not be negative")
+        if length > MAX_BODY_BYTES:
+            raise BadRequest("Request body too large")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            raise BadRequest(f"Body is not valid JSON: {e}")
+        if not isinstance(body, dict):
+            raise BadRequest("Body must be a JSON object")
+        return body
+
+    def _write_chunk(self, event: Dict[str, Any]) -> None:
+        line = (json.dumps(event, default=str) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format: str, *args) -> None:
+        print(f"API {self.address_string()} {format % args}")
+
+    # -- routes ----------------------------------------------------------------
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send_json(200, {"providers": health_stats(), "jobs": jobs.job_stats()})
+            return
+
+        match = _ITINERARY_PATH.match(self.path) or _EXPORT_PATH.match(self.path)
+        job = jobs.get_job(match.group(1)) if match else None
+        if job is not None and job.status != jobs.DONE:
+            self._send_json(409, {"error": f"Itinerary is {job.status}", "job": job.snapshot()})
+            return
+        # Past the job's retention (or a restart), it comes from the saved itineraries
+        itinerary = job.result if job is not None else saved.load(match.group(1)) if match else None
+        if itinerary is None:
+            self._send_json(404, {"error": "Unknown itinerary"})
+            return
+
+        if match.re is _ITINERARY_PATH:
+            self._send_json(200, itinerary)
+        else:
+            self._export(itinerary, match.group(2), saved.load_images(match.group(1)))
+
+    def do_POST(self) -> None:
+        try:
+            body = self._read_json()
+            if self.path == "/itineraries":
+                self._stream_itinerary(parse_trip(body))
+            elif self.path.startswith("/exports/"):
+                self._export(body, self.path[len("/exports/"):])
+            else:
+                self._send_json(404, {"error": "Not found"})
+        except BadRequest as e:
+            self._send_json(400, {"error": str(e)})
+
+    def _export(self, itinerary: Dict[str, Any], extension: str,
+                day_images: Optional[Dict[str, bytes]] = None) -> None:
+        try:
+            rendered = render_export(itinerary, extension, day_images)
+        except (KeyError, TypeError) as e:
+            self._send_json(400, {"error": f"Not an itinerary: {e}"})
+            return
+        except Exception as e:
+            print(f"API {extension} export error: {e}")
+            self._send_json(500, {"error": f"{extension} export failed: {e}"})
+            return
+        if rendered is None:
+            self._send_json(404, {"error": f"Unknown format {extension!r}; use one of {', '.join(['pdf', *EXPORTS])}"})
+            return
+        self._send(200, *rendered)
+
+    def _stream_itinerary(self, trip: Dict[str, Any]) -> None:
+        events: "queue.Queue" = queue.Queue()
+        job = start_generation(trip, events)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        try:
+            self._write_chunk({"event": "accepted", "id": job.id, "destination": job.label,
+                               "queued_ahead": job.snapshot()["queued_ahead"]})
+            started = False
+            while True:
+                if not started and job.status != jobs.QUEUED:
+                    started = True
+                    self._write_chunk({"event": "started"})
+                try:
+                    event = events.get(timeout=0.2)
+                except queue.Empty:
+                    if not job.active and events.empty():
+                        break
+                    continue
+                self._write_chunk(event)
+
+            if job.status == jobs.DONE:
+                self._write_chunk({"event": "itinerary", "id": job.id, "links": export_links(job.id),
+                                   "data": job.result})
+            else:
+                self._write_chunk({"event": "error", "message": job.error or "Generation failed"})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away; the job finishes anyway and stays fetchable by id
+            print(f"API client left before itinerary {job.id} finished")
+            self.close_connection = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the itinerary pipeline over HTTP (NDJSON streaming).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    print(f"Itinerary API on http://{args.host}:{args.port} ({jobs.GENERATION_WORKERS} generation workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
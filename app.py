@@ -5,18 +5,55 @@ AI-Powered Trip Itinerary Planner with Weather, Attractions, Hotels, and PDF Exp
 
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
-import requests
+from datetime import date, datetime, timedelta
 import json
-from typing import List, Dict, Any
-import base64
-from io import BytesIO
+from typing import List, Dict, Any, Optional
 import os
+import contextvars
+from contextlib import contextmanager
+import threading
 from dotenv import load_dotenv
 import wikipedia
 
+import hashlib
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from providers import (
+    limited_get, limited_call, coalesce, hedged, deadline, DeadlineExceeded, submit, stage_pool,
+    rate_limit_stats, coalesce_stats, hedge_stats, health_stats, by_health
+)
+from cache import cached, dont_cache, cache_stats, MISS, get as cache_get, put as cache_put, expires_in as cache_expires_in
+from poi_index import load_index as load_poi_index
+from gazetteer import load_gazetteer, names_match
+from news import get_ranked_news
+import llm
+import climate
+import exports
+import hotels as hotels_rank
+import places
+import jobs
+import saved
+from pdf_render import render_pdf, submit_pdf
+
 load_dotenv()
 
+# Latency budget for one itinerary generation (seconds), day plans included.
+# Anything not back in time is filled from stale cache or a placeholder.
+GENERATION_DEADLINE_S = float(os.getenv("GENERATION_DEADLINE_S", "8"))
+
+# Days of real forecast requested from Open-Meteo (max 16); later trip days use climate normals
+FORECAST_DAYS = 16
+
+# A stage whose inputs didn't change since this session's last generation
+# reuses that output for up to this many seconds instead of running again.
+STAGE_REUSE_S = float(os.getenv("STAGE_REUSE_S", "3600"))
+
+# How often a running generation job's progress is polled (seconds)
+JOB_POLL_S = float(os.getenv("JOB_POLL_S", "0.5"))
+
 # Page Configuration
 st.set_page_config(
     page_title="🌍 Iteration Planner Agent",
@@ -65,6 +102,112 @@ st.markdown("""
 # HELPER FUNCTIONS
 # ============================================================================
 
+def within_budget(label: str, fn, *args, placeholder=None, **kwargs):
+    """
+    Run a provider helper under the current generation deadline.
+    If the budget ran out first, use stale cached data, then whatever the
+    helper managed to return, then `placeholder`.
+    """
+    result = None
+    with deadline() as scope:
+        try:
+            result = fn(*args, **kwargs)
+        except DeadlineExceeded:
+            pass
+
+    if scope is None or not scope.cut_short:
+        return result
+
+    scope.root.degraded.append(label)
+    stale = getattr(fn, "stale", None)
+    if stale is not None:
+        value = stale(*args, **kwargs)
+        if value is not MISS:
+            return value
+    return result if result else placeholder
+
+
+def with_script_ctx(fn):
+    """
+    Wrap fn so a worker thread runs it with this session's Streamlit context (so st.error works).
+    """
+    ctx = get_script_run_ctx()
+
+    def task(*args, **kwargs):
+        if ctx is not None:
+            add_script_run_ctx(ctx=ctx)
+        return fn(*args, **kwargs)
+
+    return task
+
+
+def run_stage(fn, *args, **kwargs):
+    """
+    Start a pipeline stage on the shared stage pool. The worker inherits the
+    current deadline and this session's Streamlit context.
+    """
+    return submit(stage_pool, with_script_ctx(fn), *args, **kwargs)
+
+
+def stage_result(future, label: str, placeholder=None, grace: float = 1.0):
+    """
+    Wait for a stage until the current deadline (plus a little grace), else use the placeholder.
+    """
+    with deadline() as scope:
+        timeout = None if scope is None else max(0.0, scope.remaining()) + grace
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            scope.root.degraded.append(label)
+            return placeholder
+
+
+def stage_key(*inputs) -> str:
+    """
+    Stable key for a stage's inputs (outputs of earlier stages are hashed in).
+    """
+    text = json.dumps(inputs, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def reused_stage(store: Dict, name: str, key: str):
+    """
+    The output `name` left in `store` by the last generation if it ran
+    with the same inputs less than STAGE_REUSE_S ago, else MISS.
+    """
+    previous = store.get(name)
+    if previous and previous["key"] == key and time.time() - previous["at"] < STAGE_REUSE_S:
+        return previous["output"]
+    return MISS
+
+
+def remember_stage(store: Dict, name: str, key: str, output, degraded: bool = False) -> None:
+    """
+    Keep a stage's output for the next generation. Degraded (stale or
+    placeholder) outputs are dropped so the next run tries again.
+    """
+    if degraded:
+        store.pop(name, None)
+    else:
+        store[name] = {"key": key, "output": output, "at": time.time()}
+
+
+def run_stage_once(store: Dict, name: str, key: str, reused: List[str], fn, *args, **kwargs):
+    """
+    run_stage() unless reused_stage() has the answer, in which case the
+    returned future is already done. Reused stage names are added to `reused`.
+    """
+    output = reused_stage(store, name, key)
+    if output is MISS:
+        return run_stage(fn, *args, **kwargs)
+    reused.append(name)
+    future = Future()
+    future.set_result(output)
+    return future
+
+
+@coalesce
+@cached(ttl=7 * 24 * 3600)
 def geocode_location(location: str) -> List[Dict[str, Any]]:
     """
     Geocode a location using Open-Meteo Geocoding API (Free, no key needed)
@@ -78,7 +221,7 @@ def geocode_location(location: str) -> List[Dict[str, Any]]:
             "language": "en",
             "format": "json"
         }
-        response = requests.get(url, params=params, timeout=5)
+        response = limited_get("open_meteo", url, params=params, timeout=5)
         response.raise_for_status()
         
         data = response.json()
@@ -96,11 +239,60 @@ def geocode_location(location: str) -> List[Dict[str, Any]]:
                     "timezone": result.get("timezone", "UTC")
                 })
         return results
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         st.error(f"Geocoding error: {str(e)}")
         return []
 
 
+def search_destinations(query: str) -> List[Dict[str, Any]]:
+    """
+    Destination autocomplete: offline gazetteer first (instant, no network),
+    Open-Meteo Geocoding only when the local index has no place of that exact
+    name (its prefix matches may be other places, e.g. a smaller town for a
+    city outside the dump). Exact name matches come first.
+    Build the gazetteer with: python gazetteer.py build cities15000.txt
+    """
+    prefix_matches = []
+    try:
+        gazetteer = load_gazetteer()
+        if gazetteer is not None:
+            exact = gazetteer.search(query, limit=10, exact=True)
+            prefix_matches = gazetteer.search(query, limit=10)
+            if exact:
+                exact_ids = {place["id"] for place in exact}
+                return (exact + [p for p in prefix_matches if p["id"] not in exact_ids])[:10]
+    except Exception as e:
+        print(f"Gazetteer error: {e}")
+
+    geocoded = geocode_location(query)
+    geocoded_ids = {place["id"] for place in geocoded}
+    results = geocoded + [p for p in prefix_matches if p["id"] not in geocoded_ids]
+    results.sort(key=lambda place: not names_match(query, place))
+    return results[:10]
+
+
+def find_destination(query: str) -> Optional[Dict[str, Any]]:
+    """
+    The place a typed destination name means, for callers that can't ask
+    (the API, the cache warmer): the most populous place of exactly that name,
+    or None rather than whichever place merely starts with it.
+    """
+    try:
+        gazetteer = load_gazetteer()
+        if gazetteer is not None:
+            exact = gazetteer.search(query, limit=1, exact=True)
+            if exact:
+                return exact[0]
+    except Exception as e:
+        print(f"Gazetteer error: {e}")
+
+    return next((place for place in geocode_location(query) if names_match(query, place)), None)
+
+
+@coalesce
+@cached(ttl=3600)
 def get_weather(latitude: float, longitude: float, timezone: str = "UTC") -> Dict[str, Any]:
     """
     Get weather data using Open-Meteo API (Free, no API key needed)
@@ -115,18 +307,47 @@ def get_weather(latitude: float, longitude: float, timezone: str = "UTC") -> Dic
             "temperature_unit": "celsius",
             "wind_speed_unit": "kmh",
             "timezone": timezone,
-            "forecast_days": 7
+            "forecast_days": FORECAST_DAYS
         }
-        response = requests.get(url, params=params, timeout=5)
+        response = limited_get("open_meteo", url, params=params, timeout=5)
         response.raise_for_status()
         
         return response.json()
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         st.error(f"Weather API error: {str(e)}")
         return None
 
 
 
+def get_climate_normals(latitude: float, longitude: float, fetch: bool = True):
+    """
+    Per-day-of-year climate normals for the area (see climate.py), or None
+    """
+    try:
+        return climate.load_normals(latitude, longitude, fetch=fetch)
+    except Exception as e:
+        print(f"Climate normals error: {e}")
+        return None
+
+
+def prefetch_climate_normals(latitude: float, longitude: float) -> Future:
+    """
+    Load the area's climate normals, fetching them from the archive if this is
+    the first time. Runs outside any generation deadline (a cold archive
+    download can outlast a whole generation), so the file is there next time
+    even when this generation can't wait for it.
+    """
+    normals = get_climate_normals(latitude, longitude, fetch=False)
+    if normals is not None:
+        future = Future()
+        future.set_result(normals)
+        return future
+    # Plain submit: the worker doesn't inherit the caller's deadline
+    return stage_pool.submit(get_climate_normals, latitude, longitude)
+
+
 def generate_daily_image(location: str, activity_highlight: str):
     """
     Generate an exciting image for the day's itinerary using DALL-E 3
@@ -137,25 +358,133 @@ def generate_daily_image(location: str, activity_highlight: str):
         if not api_key:
             return None, "OpenAI API Key not found. Check .env or Secrets."
 
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
-        
         prompt = f"A hyper-realistic, exciting travel photography shot of {location}. The scene features {activity_highlight}. Sunny lighting, vibrant colors, cinematic composition, 4k resolution."
         
-        response = client.images.generate(
-            model="dall-e-3",
-            prompt=prompt[:1000],
-            size="1024x1024",
-            quality="standard",
-            n=1,
-        )
-
-        return response.data[0].url, None
+        return llm.generate_image(prompt, "day image"), None
     except Exception as e:
         print(f"Image Gen Error: {e}")
         return None, str(e)
 
 
+# Called with each attraction/activity as soon as it has streamed in (see stream_llm_list)
+streamed_item_listener: contextvars.ContextVar = contextvars.ContextVar("streamed_item_listener", default=None)
+
+
+@contextmanager
+def streamed_items_to(listener):
+    """
+    Hand streamed items to `listener` for the duration of the block (stages started inside it inherit it).
+    """
+    token = streamed_item_listener.set(listener)
+    try:
+        yield
+    finally:
+        streamed_item_listener.reset(token)
+
+
+def iter_json_array_items(chunks):
+    """
+    Incrementally parse a streamed JSON array of objects, yielding each object
+    as soon as its closing brace arrives. A malformed object is skipped (parsing
+    resumes at the next line starting with "{") instead of losing the whole list,
+    so the prompts ask for one object per line.
+    """
+    started = broken = False
+    depth = 0
+    in_string = escape = False
+    line_start = True
+    item = []
+
+    for chunk in chunks:
+        for ch in chunk:
+            at_line_start = line_start
+            if ch == "\n":
+                line_start = True
+            elif not ch.isspace():
+                line_start = False
+
+            if not started:
+                # Skip ```json fences or any chatter before the array
+                started = ch == "["
+                continue
+
+            if broken or depth == 0:
+                if ch == "{" and (depth == 0 or at_line_start):
+                    broken, depth, in_string, escape, item = False, 1, False, False, [ch]
+                elif ch == "]" and depth == 0:
+                    return
+                continue
+
+            item.append(ch)
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+                elif ch == "\n":
+                    # Raw newline inside a string: an unescaped quote threw us off
+                    print("Streamed JSON: skipping malformed item")
+                    broken = True
+                continue
+
+            if ch == '"':
+                in_string = True
+            elif ch == "{" and depth == 1 and at_line_start:
+                # A new object while this one never closed: drop the unterminated one
+                print("Streamed JSON: skipping malformed item")
+                item = [ch]
+            elif ch in "{[":
+                depth += 1
+            elif ch in "}]":
+                depth -= 1
+                if depth == 0:
+                    try:
+                        yield json.loads("".join(item))
+                    except ValueError as e:
+                        print(f"Streamed JSON: skipping malformed item ({e})")
+
+
+def stream_llm_list(prompt: str, label: str, tier: str, max_tokens: int):
+    """
+    Stream a JSON list from OpenAI, yielding each object as soon as it's complete.
+    """
+    text = llm.stream_chat(prompt, label, tier=tier, max_tokens=max_tokens)
+
+    listener = streamed_item_listener.get()
+    for item in iter_json_array_items(text):
+        if isinstance(item, dict) and item.get("name"):
+            if listener is not None:
+                listener(item)
+            yield item
+    # The parser stops at "]"; drain the tail so the usage chunk gets recorded
+    for _ in text:
+        pass
+
+
+def collect_streamed(items, limit: int) -> List[Dict[str, Any]]:
+    """
+    Gather up to `limit` streamed items. If the stream dies part way, the items
+    that already arrived are returned (and not cached) instead of raising.
+    """
+    collected = []
+    try:
+        for item in items:
+            collected.append(item)
+            if len(collected) >= limit:
+                break
+    except Exception as e:
+        if not collected:
+            raise
+        if not isinstance(e, DeadlineExceeded):
+            print(f"OpenAI stream interrupted after {len(collected)} items: {e}")
+        dont_cache()
+    return collected
+
+
+@coalesce
+@cached(ttl=7 * 24 * 3600)
 def get_attractions(location: str, limit: int = 5) -> List[Dict[str, Any]]:
     """
     Get top attractions using OpenAI (Best for descriptive, curated content)
@@ -166,9 +495,6 @@ def get_attractions(location: str, limit: int = 5) -> List[Dict[str, Any]]:
             # Fallback to simple logic if key is missing (though it shouldn't be)
             return []
 
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
-
         prompt = f"""
         List top {limit} tourist attractions in {location}.
         Return a strict JSON array of objects with these keys:
@@ -178,28 +504,22 @@ def get_attractions(location: str, limit: int = 5) -> List[Dict[str, Any]]:
         - lon: float (approximate longitude)
         - summary: string (An exciting, engaging description, max 200 chars)
 
+        Put each object on its own line.
         Do not include markdown formatting (like ```json), just the raw JSON string.
         """
 
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7
+        attractions = collect_streamed(
+            stream_llm_list(prompt, "attractions", tier="balanced", max_tokens=90 * limit + 50), limit
         )
+        if attractions:
+            return attractions
+        raise ValueError("no attractions in response")
 
-        content = response.choices[0].message.content.strip()
-        
-        # Clean up if the model adds markdown
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.endswith("```"):
-            content = content[:-3]
-            
-        attractions = json.loads(content)
-        return attractions[:limit]
-
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"OpenAI Attractions error: {e}")
+        dont_cache()
         return [{
             "name": f"Check out {location}", 
             "type": "City Center", 
@@ -210,6 +530,8 @@ def get_attractions(location: str, limit: int = 5) -> List[Dict[str, Any]]:
 
 
 
+@coalesce
+@cached(ttl=7 * 24 * 3600)
 def get_activities(location: str, limit: int = 5) -> List[Dict[str, Any]]:
     """
     Get activities using OpenAI (Creative things to do)
@@ -219,9 +541,6 @@ def get_activities(location: str, limit: int = 5) -> List[Dict[str, Any]]:
         if not api_key:
             return []
 
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
-
         prompt = f"""
         List top {limit} specific activities/experiences to do in {location} (e.g., food tour, kayaking, hiking trail, sunset cruise).
         Return a strict JSON array of objects with these keys:
@@ -229,23 +548,22 @@ def get_activities(location: str, limit: int = 5) -> List[Dict[str, Any]]:
         - type: string (e.g. Adventure, Culinary, Relaxation)
         - summary: string (Exciting description, max 200 chars)
 
+        Put each object on its own line.
         Do not include markdown formatting.
         """
 
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7
+        activities = collect_streamed(
+            stream_llm_list(prompt, "activities", tier="fast", max_tokens=70 * limit + 50), limit
         )
+        if activities:
+            return activities
+        raise ValueError("no activities in response")
 
-        content = response.choices[0].message.content.strip()
-        if content.startswith("```json"): content = content[7:]
-        if content.endswith("```"): content = content[:-3]
-            
-        return json.loads(content)[:limit]
-
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"OpenAI Activities error: {e}")
+        dont_cache()
         return [{
             "name": "Walking Tour",
             "type": "Exploration",
@@ -253,220 +571,286 @@ def get_activities(location: str, limit: int = 5) -> List[Dict[str, Any]]:
         }]
 
 
+@coalesce
 def get_geoapify_attractions(latitude: float, longitude: float, limit: int = 5) -> List[Dict[str, Any]]:
     """
     Get attractions using Geoapify Places API (Real-time, Location-based)
+    Served from geohash tiles shared by nearby queries; only missing tiles are fetched
     """
     try:
         api_key = os.getenv("GEOAPIFY_API_KEY")
         if not api_key:
             return []
-            
-        url = "https://api.geoapify.com/v2/places"
-        params = {
-            "categories": "tourism.attraction,entertainment.museum,religion.place_of_worship",
-            "filter": f"circle:{longitude},{latitude},10000", # 10km radius
-            "limit": limit,
-            "apiKey": api_key,
-            "lang": "en"
-        }
-        
-        response = requests.get(url, params=params, timeout=5)
-        if response.status_code != 200:
-            return []
-            
-        data = response.json()
-        attractions = []
         
-        for feature in data.get("features", []):
-            props = feature.get("properties", {})
-            
-            # Skip if name is missing
-            if not props.get("name"):
-                continue
-                
-            attraction = {
-                "name": props.get("name"),
-                "type": props.get("categories", ["landmark"])[0].split('.')[-1].title(),
-                "lat": props.get("lat"),
-                "lon": props.get("lon"),
-                "summary": props.get("formatted", f"Located at {props.get('address_line2', 'city center')}")
-            }
-            attractions.append(attraction)
-            
-        return attractions
+        found = places.nearby_places(latitude, longitude, api_key, radius_m=10000, limit=limit)  # 10km radius
+        return [{
+            "name": place["name"],
+            "type": place["category"].split('.')[-1].title(),
+            "lat": place["lat"],
+            "lon": place["lon"],
+            "summary": place["address"]
+        } for place in found]
     except Exception as e:
         print(f"Geoapify error: {e}")
         return []
 
 
-def get_hotels(location: str, total_budget: int, num_days: int, num_people: int) -> List[Dict[str, Any]]:
+def get_local_attractions(latitude: float, longitude: float, limit: int = 5, radius_km: float = 10.0) -> List[Dict[str, Any]]:
     """
-    Get hotels using SerpAPI (Google Hotels) with strict budget filtering
-    Budget Rule: 50%-75% of per day budget (total_budget / num_days)
+    Get attractions from the offline POI index (Instant, works without Geoapify)
+    Build the index first with: python poi_index.py build <geonames.txt | osm.geojson>
+    """
+    try:
+        index = load_poi_index()
+        if index is None:
+            return []
+
+        return [{
+            "name": poi["name"],
+            "type": poi["type"],
+            "lat": poi["lat"],
+            "lon": poi["lon"],
+            "summary": f"{poi['type']} about {poi['distance_km']:.1f} km from the city center"
+        } for poi in index.nearby(latitude, longitude, radius_km=radius_km, limit=limit)]
+    except Exception as e:
+        print(f"POI index error: {e}")
+        return []
+
+
+def merge_attractions(primary: List[Dict[str, Any]], extra: List[Dict[str, Any]], limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Append `extra` attractions whose names don't roughly match one already in `primary`
+    """
+    seen_names = {a["name"].lower() for a in primary}
+    attractions = primary.copy()
+
+    for candidate in extra:
+        # Simple dedupe: if name not roughly in existing list
+        is_duplicate = False
+        candidate_name = candidate["name"].lower()
+        for seen in seen_names:
+            if candidate_name in seen or seen in candidate_name:
+                is_duplicate = True
+                break
+
+        if not is_duplicate:
+            attractions.append(candidate)
+            seen_names.add(candidate_name)
+
+    return attractions[:limit]
+
+
+def get_nearby_attractions(latitude: float, longitude: float, limit: int = 6) -> List[Dict[str, Any]]:
+    """
+    Location-based attractions from the offline POI index and Geoapify
+    POI_INDEX_MODE=replace skips Geoapify whenever the local index has results.
+    """
+    local_attractions = get_local_attractions(latitude, longitude, limit=limit)
+    if local_attractions and os.getenv("POI_INDEX_MODE", "merge") == "replace":
+        return local_attractions
+
+    geoapify_attractions = get_geoapify_attractions(latitude, longitude, limit=limit)
+    # Geoapify has real addresses, so it goes first; the index fills the gaps
+    return merge_attractions(geoapify_attractions, local_attractions, limit=limit)
+
+
+def get_hotel_properties(location: str, num_people: int, check_in: date, nights: int) -> List[Dict[str, Any]]:
+    """
+    Every property from the first few SerpAPI (Google Hotels) result pages, unranked,
+    priced for the real stay (check_in for `nights` nights).
+    The budget only affects ranking, so a budget change doesn't refetch.
     """
     try:
         api_key = os.getenv("SERP_API_KEY")
         if not api_key:
             return []
-            
-        from serpapi import GoogleSearch
-        
-        # Calculate daily budget and target range
-        per_day_budget = total_budget / num_days
-        min_price = per_day_budget * 0.5
-        max_price = per_day_budget * 0.75
-        
-        currency = "INR"
 
         params = {
             "engine": "google_hotels",
             "q": f"hotels in {location}",
-            "check_in_date": (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d"),
-            "check_out_date": (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d"),
             "adults": num_people,
-            "currency": currency,
+            "currency": exports.CURRENCY,
             "gl": "in", # India
             "hl": "en",
             "api_key": api_key
         }
-
-        search = GoogleSearch(params)
-        results = search.get_dict()
-        
-        hotels = []
-        if "properties" in results:
-            for property in results["properties"]:
-                # Extract details
-                rating = property.get("overall_rating", 0.0)
-                reviews = property.get("reviews", 0)
-                link = property.get("link", f"https://www.google.com/search?q=hotel+{property.get('name')}+{location}")
-                
-                # Extract image (use thumbnail or placeholder)
-                image = "https://source.unsplash.com/400x300/?hotel"
-                if property.get("images") and len(property["images"]) > 0:
-                    image = property["images"][0].get("thumbnail", image)
-                
-                # Extract price
-                price = 0
-                if property.get("rate_per_night") and property["rate_per_night"].get("lowest"):
-                    price_str = property["rate_per_night"]["lowest"]
-                    # Extract digits from string like "₹1,200"
-                    price = int(''.join(filter(str.isdigit, price_str)))
-                
-                # Strict Budget Filtering
-                if min_price <= price <= max_price:
-                    hotels.append({
-                        "name": property.get("name", "Hotel"),
-                        "price": price,
-                        "rating": rating,
-                        "reviews": reviews,
-                        "address": property.get("description", location),
-                        "link": link,
-                        "image": image
-                    })
-        
-        # Sort by rating matching budget
-        hotels.sort(key=lambda x: x['rating'], reverse=True)
-        
-        return hotels[:10]  # Return top 10 matches
+        return hotels_rank.fetch_stay(params, check_in, nights)
 
     except Exception as e:
         print(f"SerpAPI Hotels error: {e}")
         return []
 
 
+def hotel_budget_band(total_budget: int, num_days: int) -> tuple:
+    """
+    Budget Rule: 50%-75% of per day budget (total_budget / num_days)
+    """
+    per_day_budget = total_budget / num_days
+    return per_day_budget * 0.5, per_day_budget * 0.75
+
+
+def _unsplash_image(query: str, api_key: str):
+    """
+    Unsplash (High Quality)
+    """
+    url = "https://api.unsplash.com/search/photos"
+    params = {
+        "query": query,
+        "per_page": 1,
+        "client_id": api_key,
+        "order_by": "relevant",
+        "orientation": "landscape" 
+    }
+    response = limited_get("unsplash", url, params=params, timeout=3)
+    if response.status_code == 200:
+        data = response.json()
+        if data.get("results"):
+            return data["results"][0]["urls"]["regular"]
+    return None
+
+
+def _duckduckgo_image(query: str):
+    """
+    DuckDuckGo (Best Free Web Search)
+    """
+    from duckduckgo_search import DDGS
+
+    with DDGS() as ddgs:
+        # Simple image search
+        # Arguments passed through limited_call so recorded calls can be told apart
+        results = limited_call(
+            "duckduckgo", lambda **search: list(ddgs.images(**search)),
+            keywords=query,
+            region="wt-wt",
+            safesearch="on",
+            size="Large",
+            max_results=1
+        )
+        if results:
+            return results[0].get("image")
+    return None
+
+
+def _wikipedia_image(query: str):
+    """
+    Wikipedia (Free, good for landmarks)
+    """
+    # Use 'generator=search' to find page even if title doesn't match exactly
+    wiki_url = "https://en.wikipedia.org/w/api.php"
+    params = {
+        "action": "query",
+        "generator": "search",
+        "gsrsearch": query,
+        "gsrlimit": 1,
+        "prop": "pageimages",
+        "pithumbsize": 1000,
+        "format": "json",
+        "origin": "*"
+    }
+    response = limited_get("wikipedia", wiki_url, params=params, timeout=3)
+    data = response.json()
+    pages = data.get("query", {}).get("pages", {})
+    for page_id in pages:
+        if "thumbnail" in pages[page_id]:
+            return pages[page_id]["thumbnail"]["source"]
+    return None
+
+
+@coalesce
+@cached(ttl=7 * 24 * 3600)
+def find_image(query: str) -> str:
+    """
+    Find one image for a name using Unsplash, DuckDuckGo (Free), or Wikipedia
+    Falls back to a placeholder so callers never get a broken image.
+
+    IMAGE_LOOKUP_MODE=hedged (default) races the providers: the preferred one
+    starts first and the next joins after IMAGE_HEDGE_DELAY seconds or as soon
+    as one fails. IMAGE_LOOKUP_MODE=sequential tries them strictly in order.
+    Either way the order follows observed provider health, and providers with
+    an open circuit breaker are skipped.
+    """
+    image_url = None
+
+    # Providers in order of preference
+    lookups = []
+    unsplash_key = os.getenv("UNSPLASH_API_KEY")
+    if unsplash_key:
+        lookups.append(("unsplash", lambda: _unsplash_image(query, unsplash_key)))
+
+    # Import DuckDuckGo Search inside function to avoid global dependency issues if not installed
+    try:
+        import duckduckgo_search  # noqa: F401
+        lookups.append(("duckduckgo", lambda: _duckduckgo_image(query)))
+    except ImportError:
+        print("DuckDuckGo Search library not found. Install with: pip install duckduckgo_search")
+
+    lookups.append(("wikipedia", lambda: _wikipedia_image(query)))
+
+    # Healthiest first; providers with an open circuit are skipped until their next probe
+    lookups = by_health(lookups)
+
+    if os.getenv("IMAGE_LOOKUP_MODE", "hedged") == "sequential":
+        for name, lookup in lookups:
+            try:
+                image_url = lookup()
+            except Exception as e:
+                print(f"{name.title()} image error for {query}: {e}")
+            if image_url:
+                break
+    elif lookups:
+        image_url = hedged(lookups, delay=float(os.getenv("IMAGE_HEDGE_DELAY", "0.4")))
+    
+    # Final Fallback
+    if not image_url:
+        # Reliable static placeholder (not cached, so a later run can find a real image)
+        dont_cache()
+        image_url = placeholder_image(query)
+
+    return image_url
+
+
+def placeholder_image(query: str) -> str:
+    """
+    Reliable static placeholder image with the name written on it
+    """
+    safe_name = query.replace(" ", "+")
+    return f"https://placehold.co/600x400/EEE/31343C?text={safe_name}"
+
+
+def prefetch_image(item: Dict[str, Any]) -> None:
+    """
+    Start resolving an item's image while the rest of its list is still streaming.
+    get_images() later joins the in-flight lookup (or hits the cache).
+    """
+    def task():
+        try:
+            find_image(item["name"])
+        except Exception:
+            pass  # get_images() retries with its own fallbacks
+
+    submit(stage_pool, task)
+
+
 def get_images(attractions: List[Dict[str, Any]]) -> Dict[str, str]:
     """
     Get images using Unsplash API, DuckDuckGo (Free), or Wikipedia
     Robust fallbacks to ensure no broken images.
     """
     try:
-        unsplash_key = os.getenv("UNSPLASH_API_KEY")
-        images = {}
+        names = list(dict.fromkeys(attraction["name"] for attraction in attractions))
+        if not names:
+            return {}
 
-        # Import DuckDuckGo Search inside function to avoid global dependency issues if not installed
+        # Resolve names concurrently; the provider rate limiters cap the real fan-out
+        pool = ThreadPoolExecutor(max_workers=min(8, len(names)), thread_name_prefix="images")
         try:
-            from duckduckgo_search import DDGS
-            ddg_available = True
-        except ImportError:
-            ddg_available = False
-            print("DuckDuckGo Search library not found. Install with: pip install duckduckgo_search")
-
-        for attraction in attractions:
-            image_url = None
-            query = attraction["name"]
-            
-            # 1. Try Unsplash (High Quality)
-            if unsplash_key:
-                try:
-                    url = "https://api.unsplash.com/search/photos"
-                    params = {
-                        "query": query,
-                        "per_page": 1,
-                        "client_id": unsplash_key,
-                        "order_by": "relevant",
-                        "orientation": "landscape" 
-                    }
-                    response = requests.get(url, params=params, timeout=3)
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data.get("results"):
-                            image_url = data["results"][0]["urls"]["regular"]
-                except Exception as e:
-                    print(f"Unsplash error for {query}: {e}")
-
-            # 2. Try DuckDuckGo (Best Free Web Search)
-            if not image_url and ddg_available:
-                try:
-                    with DDGS() as ddgs:
-                        # Simple image search
-                        results = list(ddgs.images(
-                            keywords=query,
-                            region="wt-wt",
-                            safesearch="on",
-                            size="Large",
-                            max_results=1
-                        ))
-                        if results:
-                            image_url = results[0].get("image")
-                except Exception as e:
-                    print(f"DuckDuckGo error for {query}: {e}")
-
-            # 3. Try Wikipedia (Free, good for landmarks)
-            if not image_url:
-                try:
-                    # Use 'generator=search' to find page even if title doesn't match exactly
-                    wiki_url = "https://en.wikipedia.org/w/api.php"
-                    params = {
-                        "action": "query",
-                        "generator": "search",
-                        "gsrsearch": query,
-                        "gsrlimit": 1,
-                        "prop": "pageimages",
-                        "pithumbsize": 1000,
-                        "format": "json",
-                        "origin": "*"
-                    }
-                    response = requests.get(wiki_url, params=params, timeout=3)
-                    data = response.json()
-                    pages = data.get("query", {}).get("pages", {})
-                    for page_id in pages:
-                        if "thumbnail" in pages[page_id]:
-                            image_url = pages[page_id]["thumbnail"]["source"]
-                            break
-                except Exception as e:
-                    print(f"Wikipedia Image error for {query}: {e}")
-            
-            # 4. Final Fallback
-            if not image_url:
-                # Reliable static placeholder
-                safe_name = query.replace(" ", "+")
-                image_url = f"https://placehold.co/600x400/EEE/31343C?text={safe_name}"
-            
-            images[attraction["name"]] = image_url
-        
-        return images
+            futures = {
+                name: submit(pool, within_budget, "images", find_image, name, placeholder=placeholder_image(name))
+                for name in names
+            }
+            return {name: future.result() for name, future in futures.items()}
+        finally:
+            pool.shutdown(wait=False)
 
     except Exception as e:
         print(f"Global Images error: {str(e)}")
@@ -483,9 +867,6 @@ def get_clothing_recommendation(weather_data: Dict, num_days: int) -> str:
         
         if api_key and weather_data and "current" in weather_data:
             try:
-                from openai import OpenAI
-                client = OpenAI(api_key=api_key)
-                
                 temp = weather_data["current"]["temperature_2m"]
                 conditions = format_weather_code(weather_data["current"]["weather_code"])
                 
@@ -502,14 +883,7 @@ def get_clothing_recommendation(weather_data: Dict, num_days: int) -> str:
                 Be conversational and helpful!
                 """
                 
-                response = client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.7,
-                    max_tokens=300
-                )
-                
-                return response.choices[0].message.content
+                return llm.chat(prompt, "packing tips", tier="fast", max_tokens=300)
             except Exception as e:
                 print(f"OpenAI error: {e}")
                 # Fallback to mock logic below
@@ -567,8 +941,8 @@ def format_weather_code(code: int) -> str:
 
 def generate_day_plan(day_num: int, attractions: List[Dict], weather_info: str) -> str:
     """
-    Generate a friendly day plan
-    In production, use OpenAI API for personalized recommendations
+    Generate a friendly day plan from a fixed template
+    Used when the LLM day planner (generate_day_plans) is unavailable
     """
     plan = f"""
     ### Day {day_num} - Adventure Awaits! 🌟
@@ -594,47 +968,197 @@ def generate_day_plan(day_num: int, attractions: List[Dict], weather_info: str)
     return plan
 
 
-def create_pdf_content(itinerary_data: Dict) -> str:
-    """
-    Create PDF content - will use ReportLab for actual generation
+DAY_PLAN_NAMESPACE = "day_plan"
+DAY_PLAN_TTL = 7 * 24 * 3600
+# Long trips are split into chunks of this many days, requested concurrently
+DAY_PLAN_CHUNK_DAYS = int(os.getenv("DAY_PLAN_CHUNK_DAYS", "7"))
+# Day plans can only start once attractions are known; they get at most this
+# long, and never more than what's left of GENERATION_DEADLINE_S
+DAY_PLAN_DEADLINE_S = float(os.getenv("DAY_PLAN_DEADLINE_S", "10"))
+
+
+def format_day_plan(day_num: int, plan: Dict[str, str], weather_info: str) -> str:
     """
-    content = f"""
-    ╔════════════════════════════════════════════════════════════════╗
-    ║           🌍 YOUR PERSONALIZED TRIP ITINERARY 🌍              ║
-    ╚════════════════════════════════════════════════════════════════╝
-    
-    TRIP DETAILS
-    ─────────────────────────────────────────────────────────────────
-    From: {itinerary_data['from_place']}
-    To: {itinerary_data['to_place']}
-    Duration: {itinerary_data['num_days']} days
-    Travelers: {itinerary_data['num_people']} people
-    Budget: ${itinerary_data['budget']}
-    
-    RECOMMENDED ACCOMMODATIONS
-    ─────────────────────────────────────────────────────────────────
+    Render one generated day in the same layout as generate_day_plan()
     """
+    return f"""
+    ### Day {day_num} - {plan.get('title') or 'Adventure Awaits!'} 🌟
     
-    for hotel in itinerary_data.get('hotels', []):
-        content += f"\n★ {hotel['name']} - ${hotel['price']}/night (Rating: {hotel['rating']}/5)"
-    
-    content += f"""
+    **Morning (9:00 AM - 12:00 PM)**
+    - {plan['morning']}
     
-    WHAT TO PACK
-    ─────────────────────────────────────────────────────────────────
-    {itinerary_data.get('clothing_tips', '')}
+    **Afternoon (12:00 PM - 5:00 PM)**
+    - {plan['afternoon']}
     
-    DAILY ITINERARIES
-    ─────────────────────────────────────────────────────────────────
-    {itinerary_data.get('daily_plans', '')}
+    **Evening (5:00 PM - 9:00 PM)**
+    - {plan['evening']}
     
-    TOP ATTRACTIONS NOT TO MISS
-    ─────────────────────────────────────────────────────────────────
+    **Weather:** {weather_info}
+    **Tips:** {plan.get('tip') or 'Stay hydrated, wear comfortable shoes, bring a camera!'}
     """
-    
-    for i, attraction in enumerate(itinerary_data.get('attractions', []), 1):
+
+
+def _day_plan_key(destination_id: Any, day: Dict[str, Any]) -> str:
+    # Day number is left out on purpose: the same weather and attractions
+    # on another day of the trip reuse the plan
+    return json.dumps([destination_id, day["weather"], sorted(day["attractions"])], ensure_ascii=False)
+
+
+def _plan_days_chunk(destination: str, days: List[Dict[str, Any]]) -> Dict[int, Dict[str, str]]:
+    """
+    One OpenAI request for several days. Returns {day number: plan} for the
+    days that came back well-formed; missing days fall back to the template.
+    """
+    day_lines = "\n".join(
+        f"Day {day['day']}: weather {day['weather']}; visit {', '.join(day['attractions']) or 'anything local'}"
+        for day in days
+    )
+    prompt = f"""
+    Plan these days of a trip to {destination}. Fit each day to its weather
+    (indoor options on rainy days) and include the attractions listed for it.
+
+    {day_lines}
+
+    Return a strict JSON array with one object per day, each on its own line, with these keys:
+    - day: int (the day number above)
+    - title: string (short, catchy, max 40 chars)
+    - morning: string (max 150 chars)
+    - afternoon: string (max 150 chars)
+    - evening: string (max 150 chars)
+    - tip: string (one practical tip for the day, max 100 chars)
+
+    Do not include markdown formatting.
+    """
+
+    content = llm.chat(prompt, "daily plans", tier="balanced", max_tokens=120 * len(days) + 50)
+
+    wanted = {day["day"] for day in days}
+    plans = {}
+    for item in iter_json_array_items([content]):
+        if not isinstance(item, dict) or item.get("day") not in wanted:
+            continue
+        if all(isinstance(item.get(part), str) and item[part] for part in ("morning", "afternoon", "evening")):
+            plans[item["day"]] = item
+    return plans
+
+
+def generate_day_plans(destination: Dict[str, Any], days: List[Dict[str, Any]]) -> List[str]:
+    """
+    Day plans for a whole trip, one entry per item of `days`
+    ({"day": n, "weather": format_weather_code(...), "attractions": [names]}).
+    Each day is cached by (destination, weather, attraction set); the days not
+    in cache are requested in DAY_PLAN_CHUNK_DAYS-sized batches concurrently.
+    Anything the LLM doesn't deliver uses the generate_day_plan() template.
+    """
+    destination_id = destination.get("id") or destination["name"]
+    plans: Dict[int, Dict[str, str]] = {}
+
+    # Days with the same weather and attractions share one plan (and one request)
+    missing: Dict[str, List[Dict[str, Any]]] = {}
+    for day in days:
+        key = _day_plan_key(destination_id, day)
+        plan = MISS if key in missing else cache_get(DAY_PLAN_NAMESPACE, key)
+        if plan is MISS:
+            missing.setdefault(key, []).append(day)
+        else:
+            plans[day["day"]] = plan
+
+    if missing and os.getenv("OPENAI_API_KEY"):
+        unique = [same[0] for same in missing.values()]
+        chunks = [unique[i:i + DAY_PLAN_CHUNK_DAYS] for i in range(0, len(unique), DAY_PLAN_CHUNK_DAYS)]
+        chunk_futures = [
+            submit(stage_pool, within_budget, "daily plans", _plan_days_chunk, destination["name"], chunk, placeholder={})
+            for chunk in chunks
+        ]
+        for chunk, chunk_future in zip(chunks, chunk_futures):
+            try:
+                generated = chunk_future.result() or {}
+            except Exception as e:
+                print(f"OpenAI Day Plans error: {e}")
+                continue
+            for day in chunk:
+                plan = generated.get(day["day"])
+                if plan:
+                    key = _day_plan_key(destination_id, day)
+                    plan = {k: plan.get(k) for k in ("title", "morning", "afternoon", "evening", "tip")}
+                    cache_put(DAY_PLAN_NAMESPACE, key, plan, ttl=DAY_PLAN_TTL)
+                    for same in missing[key]:
+                        plans[same["day"]] = plan
+
+    texts = []
+    for day in days:
+        plan = plans.get(day["day"])
+        if plan:
+            texts.append(format_day_plan(day["day"], plan, day["weather"]))
+        else:
+            names = [{"name": name} for name in day["attractions"]]
+            texts.append(generate_day_plan(day["day"], names, day["weather"]))
+    return texts
+
+
+def _itinerary_text_sections(itinerary_data: Dict) -> str:
+    """
+    Hotels, packing, daily plans and attractions of one itinerary (or leg) as text
+    """
+    content = """
+    RECOMMENDED ACCOMMODATIONS
+    ─────────────────────────────────────────────────────────────────
+    """
+    
+    for hotel in itinerary_data.get('hotels', []):
+        content += f"\n★ {hotel['name']} - ${hotel['price']}/night (Rating: {hotel['rating']}/5)"
+    
+    content += f"""
+    
+    WHAT TO PACK
+    ─────────────────────────────────────────────────────────────────
+    {itinerary_data.get('clothing_tips', '')}
+    
+    DAILY ITINERARIES
+    ─────────────────────────────────────────────────────────────────
+    {itinerary_data.get('daily_plans', '')}
+    
+    TOP ATTRACTIONS NOT TO MISS
+    ─────────────────────────────────────────────────────────────────
+    """
+    
+    for i, attraction in enumerate(itinerary_data.get('attractions', []), 1):
         content += f"\n{i}. {attraction['name']} ({attraction['type']})"
     
+    return content
+
+
+def create_pdf_content(itinerary_data: Dict) -> str:
+    """
+    Create PDF content - will use ReportLab for actual generation
+    """
+    content = f"""
+    ╔════════════════════════════════════════════════════════════════╗
+    ║           🌍 YOUR PERSONALIZED TRIP ITINERARY 🌍              ║
+    ╚════════════════════════════════════════════════════════════════╝
+    
+    TRIP DETAILS
+    ─────────────────────────────────────────────────────────────────
+    From: {itinerary_data['from_place']}
+    To: {itinerary_data['to_place']}
+    Duration: {itinerary_data['num_days']} days
+    Travelers: {itinerary_data['num_people']} people
+    Budget: ${itinerary_data['budget']}
+    """
+    
+    legs = itinerary_data.get('legs')
+    if legs:
+        for number, leg in enumerate(legs, 1):
+            content += f"""
+    
+    ════════════════════════════════════════════════════════════════
+    LEG {number}: {leg['to_place'].upper()} ({leg['num_days']} days from {leg['start_date']})
+    ════════════════════════════════════════════════════════════════
+    """
+            content += _itinerary_text_sections(leg)
+    else:
+        content += _itinerary_text_sections(itinerary_data)
+    
     content += """
     
     TRAVEL TIPS
@@ -652,312 +1176,724 @@ def create_pdf_content(itinerary_data: Dict) -> str:
     return content
 
 
-def fetch_image_for_pdf(url: str, width_in_inches: float = 4.0):
+def download_pdf_button(itinerary_data: Dict) -> None:
     """
-    Fetch image from URL and return ReportLab Image object
+    Create rich downloadable PDF with images
+    Rendered in the PDF worker pool (see pdf_render.py), so the session's script
+    thread only waits on the result instead of competing for the GIL.
     """
+    session_images = dict(st.session_state.get('daily_images', {}))
     try:
-        from reportlab.platypus import Image as RLImage
-        from reportlab.lib.units import inch
+        try:
+            return submit_pdf(itinerary_data, session_images).result()
+        except (BrokenProcessPool, OSError) as e:
+            # No worker processes available here: render on this thread instead
+            print(f"PDF pool unavailable, rendering inline: {e}")
+            return render_pdf(itinerary_data, session_images)
         
-        response = requests.get(url, timeout=5)
-        if response.status_code == 200:
-            img_data = BytesIO(response.content)
-            # Create RL Image
-            img = RLImage(img_data)
-            # Scale
-            aspect = img.imageHeight / float(img.imageWidth)
-            return RLImage(img_data, width=width_in_inches*inch, height=(width_in_inches*aspect)*inch)
+    except ImportError:
+        st.error("ReportLab not installed. Install with: pip install reportlab")
+        return None
     except Exception as e:
-        print(f"PDF Image Fetch Error: {e}")
+        st.error(f"PDF generation error: {str(e)}")
+        import traceback
+        traceback.print_exc()
         return None
-    return None
 
 
-def download_pdf_button(itinerary_data: Dict) -> None:
+
+@coalesce
+def get_latest_news(destination: str) -> List[Dict]:
     """
-    Create rich downloadable PDF with images
+    Fetch latest news about the destination using NewsAPI
+    Articles are stored per destination, refreshed incrementally, de-duplicated
+    and ranked locally (see news.py).
     """
     try:
-        from reportlab.lib.pagesizes import letter
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Image, KeepTogether
-        from reportlab.lib import colors
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
+        return get_ranked_news(destination, limit=5)
+    except Exception as e:
+        print(f"News error: {e}")
+        return []
+
+
+# ============================================================================
+# ITINERARY PIPELINE
+# ============================================================================
+
+# Multi-city trips run one pipeline per leg concurrently
+MAX_LEGS = int(os.getenv("MAX_LEGS", "5"))
+
+
+def build_itinerary(destination: Dict[str, Any], from_place: str, start_date, num_days: int,
+                    num_people: int, budget: float, stage_outputs: Optional[Dict] = None,
+                    first_day: int = 1, progress=None, on_stage=None) -> Dict[str, Any]:
+    """
+    Run the whole generation pipeline for one destination and return the itinerary.
+    `stage_outputs` (kept in session state) lets unchanged stages be reused by the
+    next run, `progress(percent, text)` reports each step, `on_stage(name, data)`
+    receives each section as soon as it's ready, and `first_day` numbers
+    the days (later legs of a multi-city trip continue the count).
+    """
+    progress = progress or (lambda percent, text: None)
+    on_stage = on_stage or (lambda name, data: None)
+    sent, sent_lock = set(), threading.Lock()
+    
+    def emit(name: str, data) -> None:
+        # Each section goes out once: from its stage's worker when it finishes
+        # early, otherwise where the pipeline reaches it
+        with sent_lock:
+            if name in sent:
+                return
+            sent.add(name)
+        on_stage(name, data)
+    
+    def when_ready(job: Future, name: str, empty=None) -> None:
+        job.add_done_callback(lambda f: f.exception() is None and emit(name, f.result() or empty))
+    if isinstance(start_date, str):
+        start_date = date.fromisoformat(start_date)
+    to_place_name = destination['name']
+    place_id = destination.get("id") or to_place_name
+    store = stage_outputs.setdefault(str(place_id), {}) if stage_outputs is not None else {}
+    
+    # Steps 2-8 share one latency budget: whatever isn't back in time
+    # comes from stale cache or a placeholder instead of holding up the page
+    generation_start = datetime.now()
+    # Images start as soon as each attraction/activity streams in from the LLM
+    with deadline(GENERATION_DEADLINE_S) as time_budget, streamed_items_to(prefetch_image):
+        latitude = destination["latitude"]
+        longitude = destination["longitude"]
         
-        # Create PDF in memory
-        pdf_buffer = BytesIO()
-        doc = SimpleDocTemplate(pdf_buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
+        # Step 2-5: Independent lookups run concurrently
+        progress(25, "🌤️ Fetching weather, attractions, activities and hotels...")
         
-        # Container for PDF elements
-        elements = []
-        styles = getSampleStyleSheet()
+        # Each stage is keyed by the inputs it depends on; stages whose
+        # inputs didn't change since the last Generate reuse their output
+        timezone = destination.get("timezone", "UTC")
+        keys = {
+            "weather": stage_key(latitude, longitude, timezone, start_date, datetime.now().date()),
+            "attractions": stage_key(place_id, to_place_name),
+            "nearby": stage_key(latitude, longitude),
+            "activities": stage_key(place_id, to_place_name),
+            "hotels": stage_key(place_id, to_place_name, num_people, start_date, num_days),
+            "news": stage_key(place_id, to_place_name),
+        }
+        reused = []
         
-        # Custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=26,
-            textColor=colors.HexColor('#2c3e50'),
-            spaceAfter=20,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
+        weather_job = run_stage_once(
+            store, "weather", keys["weather"], reused, within_budget, "weather", get_weather,
+            latitude, longitude, timezone
         )
+        # 1. Get descriptive list from OpenAI
+        openai_job = run_stage_once(store, "attractions", keys["attractions"], reused,
+                                    within_budget, "attractions", get_attractions, to_place_name, limit=4)
+        # 2. Get specific locations from Geoapify and the offline POI index
+        nearby_job = run_stage_once(store, "nearby", keys["nearby"], reused,
+                                    within_budget, "attractions", get_nearby_attractions, latitude, longitude, limit=6)
+        activities_job = run_stage_once(store, "activities", keys["activities"], reused,
+                                        within_budget, "activities", get_activities, to_place_name, limit=6)
+        # All candidate hotels for the stay (a night per trip day); they're ranked
+        # against the budget once attractions are known
+        hotels_job = run_stage_once(store, "hotels", keys["hotels"], reused,
+                                    within_budget, "hotels", get_hotel_properties, to_place_name, num_people,
+                                    start_date, num_days)
+        news_job = run_stage_once(store, "news", keys["news"], reused,
+                                  within_budget, "news", get_latest_news, to_place_name)
+        when_ready(activities_job, "activities", empty=[])
+        when_ready(news_job, "news", empty=[])
+        # Trip days past the forecast window use climate normals (fetched once per area)
+        last_day = start_date + timedelta(days=num_days - 1)
+        climate_job = None
+        if last_day >= date.today() + timedelta(days=FORECAST_DAYS - 1):
+            climate_job = prefetch_climate_normals(latitude, longitude)
         
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=18,
-            textColor=colors.HexColor('#e67e22'), # Accent color
-            spaceAfter=12,
-            spaceBefore=20,
-            fontName='Helvetica-Bold',
-            borderPadding=5,
-            borderWidth=0,
-            
-        )
+        weather_data = stage_result(weather_job, "weather")
+        normals = None
+        if climate_job is not None:
+            if climate_job.done():
+                normals = climate_job.result()
+            else:
+                time_budget.degraded.append("typical weather")
+        if normals is None:
+            # Covers a failed forecast too, if this area's normals are already on disk
+            normals = get_climate_normals(latitude, longitude, fetch=False)
+        trip_weather = climate.trip_days(weather_data, normals, start_date, num_days)
+        emit("weather", {"forecast": weather_data, "trip_days": trip_weather})
         
-        subheading_style = ParagraphStyle(
-            'CustomSubHeading',
-            parent=styles['Heading3'],
-            fontSize=14,
-            textColor=colors.HexColor('#34495e'),
-            spaceAfter=10,
-            fontName='Helvetica-Bold'
-        )
+        # Packing tips only need the weather, so they run alongside the remaining stages
+        tips_placeholder = "👕 Pack comfortable, versatile clothing suitable for urban exploration."
+        keys["packing tips"] = stage_key((weather_data or {}).get("current"), num_days)
+        tips_job = run_stage_once(store, "packing tips", keys["packing tips"], reused,
+                                  within_budget, "packing tips", get_clothing_recommendation, weather_data, num_days,
+                                  placeholder=tips_placeholder)
+        when_ready(tips_job, "packing tips", empty=tips_placeholder)
         
-        normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=styles['Normal'],
-            fontSize=11,
-            alignment=TA_LEFT,
-            spaceAfter=10,
-            leading=16,
-            textColor=colors.HexColor('#2c3e50')
-        )
+        # Step 3: Get Attractions (Merged Sources)
+        progress(40, "🎭 Discovering attractions (OpenAI + Geoapify + local places)...")
         
-        center_style = ParagraphStyle(
-            'Center',
-            parent=styles['Normal'],
-            alignment=TA_CENTER
-        )
-
-        # --- CONTENT GENERATION ---
+        openai_attractions = stage_result(openai_job, "attractions", placeholder=[]) or []
+        nearby_attractions = stage_result(nearby_job, "attractions", placeholder=[]) or []
         
-        # Title
-        elements.append(Paragraph(f"✈️ Trip to {itinerary_data['to_place']} 🌍", title_style))
-        elements.append(Spacer(1, 0.1*inch))
-        elements.append(Paragraph("<i>Your Personalized Itinerary</i>", center_style))
-        elements.append(Spacer(1, 0.3*inch))
+        # 3. Merge and deduplicate (limit total to 10)
+        # We prefer OpenAI for descriptions, but want Geoapify's variety;
+        # if OpenAI has been failing or slow, the Geoapify list leads instead
+        (_, primary), (_, extra) = by_health([("openai", openai_attractions), ("geoapify", nearby_attractions)],
+                                             skip_open=False)
+        attractions = merge_attractions(primary, extra, limit=10)
+        if not attractions:
+            attractions = [{
+                "name": f"Explore {to_place_name}",
+                "type": "City Center",
+                "lat": latitude,
+                "lon": longitude,
+                "summary": f"Explore the vibrant streets and landmarks of {to_place_name}."
+            }]
+        emit("attractions", attractions)
         
-        # Cover Image (Try to get one from the attractions or generic)
-        all_images = itinerary_data.get('images', {})
-        # Find first available image
-        cover_url = None
-        if all_images:
-            cover_url = list(all_images.values())[0]
+        # Step 4: Get Activities
+        progress(50, "🏄 Finding exciting activities...")
         
-        if cover_url:
-            cover_img = fetch_image_for_pdf(cover_url, width_in_inches=6.0)
-            if cover_img:
-                elements.append(cover_img)
-                elements.append(Spacer(1, 0.3*inch))
+        activities = stage_result(activities_job, "activities", placeholder=[]) or []
+        emit("activities", activities)
         
-        # Trip Details Section
-        elements.append(Paragraph("Trip Summary", heading_style))
-        trip_details = [
-            ['📍 From:', itinerary_data['from_place']],
-            ['📍 To:', itinerary_data['to_place']],
-            ['📅 Duration:', f"{itinerary_data['num_days']} days"],
-            ['👥 Travelers:', f"{itinerary_data['num_people']} people"],
-            ['💰 Budget:', f"INR {itinerary_data['budget']}"], # Safe currency text
-        ]
-        trip_table = Table(trip_details, colWidths=[2.5*inch, 4*inch])
-        trip_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ecf0f1')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2c3e50')),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-            ('TOPPADDING', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.white),
-        ]))
-        elements.append(trip_table)
-        elements.append(Spacer(1, 0.2*inch))
+        # Step 5: Get Hotels
+        progress(60, "🏨 finding best hotels in your budget...")
         
-        # Hotels Section
-        elements.append(Paragraph("🏨 Recommended Hotels", heading_style))
-        hotel_data = [['Hotel Name', 'Price/Night', 'Rating']]
-        for hotel in itinerary_data.get('hotels', []):
-            hotel_data.append([
-                hotel['name'],
-                f"Rs. {hotel['price']}",
-                f"{hotel['rating']}/5"
-            ])
+        hotel_properties = stage_result(hotels_job, "hotels", placeholder=[]) or []
+        min_price, max_price = hotel_budget_band(budget, num_days)
+        hotels, hotel_alternatives = hotels_rank.rank_hotels(
+            hotel_properties, min_price, max_price, location=to_place_name,
+            centroid=hotels_rank.attraction_centroid(attractions, fallback=(latitude, longitude))
+        )
+        emit("hotels", {"hotels": hotels, "alternatives": hotel_alternatives})
         
-        if len(hotel_data) > 1:
-            hotel_table = Table(hotel_data, colWidths=[3*inch, 1.5*inch, 1.5*inch])
-            hotel_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f7f9f9')),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bdc3c7')),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f2f6')]),
-            ]))
-            elements.append(hotel_table)
+        # Step 6: Get Images (Attractions + Activities)
+        progress(75, "📸 Fetching beautiful images...")
         
-        elements.append(Spacer(1, 0.2*inch))
+        keys["images"] = stage_key([a["name"] for a in attractions], [a["name"] for a in activities])
+        all_images = reused_stage(store, "images", keys["images"])
+        if all_images is MISS:
+            # Fetch images for both lists
+            attraction_images = get_images(attractions)
+            activity_images = get_images(activities) # get_images works for any list with 'name' key
+            
+            # Combine for itinerary data
+            all_images = {**attraction_images, **activity_images}
+        else:
+            reused.append("images")
+        emit("images", all_images)
         
-        # Clothing Tips
-        elements.append(Paragraph("🎒 What to Pack", heading_style))
-        elements.append(Paragraph(itinerary_data.get('clothing_tips', ''), normal_style))
-        elements.append(Spacer(1, 0.2*inch))
+        # Step 7: Generate Recommendations
+        progress(85, "🎯 Generating personalized recommendations...")
         
-        # Daily Itineraries with Images
-        elements.append(PageBreak())
-        elements.append(Paragraph("📅 Daily Itinerary", heading_style))
+        clothing_tips = stage_result(tips_job, "packing tips", placeholder=tips_placeholder) or tips_placeholder
+        emit("packing tips", clothing_tips)
         
-        daily_plans_list = itinerary_data.get('daily_plans_list', [])
-        session_images = st.session_state.get('daily_images', {})
+        # Step 8: Get Latest News
+        progress(90, "📰 Checking latest news...")
         
-        for plan in daily_plans_list:
-            day_num = plan['day']
-            
-            # Container for Day Header
-            elements.append(Paragraph(f"Day {day_num}: {plan.get('location', '')}", subheading_style))
-            
-            # Text content
-            clean_text = plan['text'].replace('#', '').replace('*', '')
-            elements.append(Paragraph(clean_text, normal_style))
-            
-            # Try to find specific daily image
-            img_key = f"img_{itinerary_data['to_place']}_{day_num}"
-            if img_key in session_images:
-                img_url = session_images[img_key]
-                pdf_img = fetch_image_for_pdf(img_url, width_in_inches=5.5)
-                if pdf_img:
-                    elements.append(Spacer(1, 0.1*inch))
-                    # Add simple "border" or shadow effect notion by placing in table? 
-                    # ReportLab images don't have borders easily, but we can wrap in a single-cell table with border.
-                    img_table = Table([[pdf_img]], colWidths=[5.5*inch])
-                    img_table.setStyle(TableStyle([
-                        ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#bdc3c7')),
-                        ('BACKGROUND', (0, 0), (-1, -1), colors.white),
-                        ('ALIGN', (0,0), (-1,-1), 'CENTER')
-                    ]))
-                    elements.append(img_table)
-                    elements.append(Paragraph(f"<i>AI Visual for Day {day_num}</i>", center_style))
-            
-            elements.append(Spacer(1, 0.4*inch))
+        news_data = stage_result(news_job, "news", placeholder=[]) or []
+        emit("news", news_data)
+    
+    # Step 9: Create Itinerary
+    progress(95, "✍️ Creating your itinerary...")
+    
+    daily_plans = ""
+    daily_plans_list = []
+    
+    # Real forecast where it covers the trip's dates, climate normals beyond it;
+    # days with neither still get a plan with a placeholder weather line
+    day_inputs = []
+    for i, day_weather in enumerate(trip_weather):
+        if day_weather is None:
+            weather_desc = "🌤️ Forecast unavailable right now"
+        elif day_weather["source"] == "normals":
+            weather_desc = (f"{format_weather_code(day_weather['weather_code'])} "
+                            f"(typical for the season, {day_weather['precipitation_probability']}% chance of rain)")
+        else:
+            weather_desc = format_weather_code(day_weather["weather_code"])
+        
+        day_inputs.append({
+            "day": first_day + i,
+            "weather": weather_desc,
+            "attractions": [a['name'] for a in attractions[i % len(attractions):][:2]]
+        })
+    
+    # All days in one batched LLM request (chunked for long trips), within
+    # what's left of the generation budget
+    keys["daily plans"] = stage_key(place_id, day_inputs)
+    with deadline(min(DAY_PLAN_DEADLINE_S, max(0.0, time_budget.remaining()))) as plan_budget:
+        day_plan_texts = reused_stage(store, "daily plans", keys["daily plans"])
+        if day_plan_texts is MISS:
+            day_plan_texts = generate_day_plans(destination, day_inputs)
+        else:
+            reused.append("daily plans")
+    
+    for i, (day, day_plan_text) in enumerate(zip(day_inputs, day_plan_texts)):
+        daily_plans += day_plan_text + "\n"
+        
+        # Highlight activity for image gen
+        daily_plans_list.append({
+            "day": day["day"],
+            "date": (start_date + timedelta(days=i)).isoformat(),
+            "text": day_plan_text,
+            "highlight": f"visiting {day['attractions'][0]}",
+            "location": to_place_name
+        })
+    emit("daily plans", daily_plans_list)
+    
+    generation_seconds = (datetime.now() - generation_start).total_seconds()
+    degraded_sections = sorted(set(time_budget.degraded + plan_budget.degraded))
+    
+    # Keep fresh stage outputs for the next Generate (reused ones keep their original age).
+    # Fallbacks (uncached LLM answers, placeholder images, template days) are not kept.
+    fallback = {
+        "attractions": get_attractions.expires_in(to_place_name, limit=4) is None,
+        "activities": get_activities.expires_in(to_place_name, limit=6) is None,
+        "images": any(url == placeholder_image(name) for name, url in all_images.items()),
+        "daily plans": bool(os.getenv("OPENAI_API_KEY")) and any(
+            cache_expires_in(DAY_PLAN_NAMESPACE, _day_plan_key(place_id, day)) is None for day in day_inputs
+        ),
+    }
+    stage_outputs_now = {
+        "weather": weather_data, "attractions": openai_attractions, "nearby": nearby_attractions,
+        "activities": activities, "hotels": hotel_properties, "news": news_data, "images": all_images,
+        "packing tips": clothing_tips, "daily plans": day_plan_texts,
+    }
+    for name, output in stage_outputs_now.items():
+        if name not in reused:
+            label = "attractions" if name == "nearby" else name
+            degraded = label in degraded_sections or not output or fallback.get(name, False)
+            remember_stage(store, name, keys[name], output, degraded=degraded)
+    
+    return {
+        'from_place': from_place,
+        'to_place': to_place_name,
+        'destination': destination,
+        'start_date': start_date.isoformat(),
+        'num_days': num_days,
+        'num_people': num_people,
+        'budget': budget,
+        'attractions': attractions,
+        'activities': activities,
+        'hotels': hotels,
+        'hotel_alternatives': hotel_alternatives,
+        'clothing_tips': clothing_tips,
+        'daily_plans': daily_plans,
+        'daily_plans_list': daily_plans_list,
+        'images': all_images,
+        'weather': weather_data,
+        'trip_weather': trip_weather,
+        'news': news_data,
+        'generation': {
+            'seconds': round(generation_seconds, 2),
+            'degraded': degraded_sections,
+            'reused': reused,
+        },
+    }
+
+
+def build_trip(legs: List[Dict[str, Any]], from_place: str, start_date, num_people: int,
+               budget: float, stage_outputs: Optional[Dict] = None, progress=None,
+               on_stage=None) -> Dict[str, Any]:
+    """
+    Multi-city trip: legs are [{"destination": ..., "days": n}] in travel order.
+    Every leg runs its own pipeline concurrently (sharing rate limits and cache),
+    leg dates follow on from each other and the budget is split by days.
+    `on_stage(name, data, leg=n)` receives each leg's sections as they're ready.
+    """
+    progress = progress or (lambda percent, text: None)
+    if isinstance(start_date, str):
+        start_date = date.fromisoformat(start_date)
+    total_days = sum(leg["days"] for leg in legs)
+    generation_start = datetime.now()
+    
+    pool = ThreadPoolExecutor(max_workers=len(legs), thread_name_prefix="legs")
+    try:
+        leg_jobs = []
+        offset = 0
+        for number, leg in enumerate(legs, 1):
+            leg_stage = (lambda name, data, number=number: on_stage(name, data, leg=number)) if on_stage else None
+            leg_jobs.append(submit(
+                pool, with_script_ctx(build_itinerary), leg["destination"], from_place,
+                start_date + timedelta(days=offset), leg["days"], num_people,
+                int(budget * leg["days"] / total_days), stage_outputs=stage_outputs, first_day=offset + 1,
+                on_stage=leg_stage
+            ))
+            offset += leg["days"]
+        
+        itineraries = []
+        for job in leg_jobs:
+            itineraries.append(job.result())
+            progress(10 + int(85 * len(itineraries) / len(leg_jobs)),
+                     f"✅ {itineraries[-1]['to_place']} ready ({len(itineraries)}/{len(leg_jobs)} cities)")
+    finally:
+        pool.shutdown(wait=False)
+    
+    return {
+        'from_place': from_place,
+        'to_place': " → ".join(leg['to_place'] for leg in itineraries),
+        'start_date': start_date.isoformat(),
+        'num_days': total_days,
+        'num_people': num_people,
+        'budget': budget,
+        'legs': itineraries,
+        'generation': {
+            'seconds': round((datetime.now() - generation_start).total_seconds(), 2),
+            'degraded': sorted({s for leg in itineraries for s in leg['generation']['degraded']}),
+            'reused': sorted({s for leg in itineraries for s in leg['generation']['reused']}),
+        },
+    }
+
 
-        # Attractions Gallery
-        elements.append(PageBreak())
-        elements.append(Paragraph("📸 Attractions Gallery", heading_style))
+def render_itinerary(data: Dict[str, Any], key_prefix: str = "") -> None:
+    """
+    Show one itinerary (a single-city trip or one leg of a multi-city trip)
+    """
+    # Unpack commonly used variables for easier access in display code
+    weather_data = data['weather']
+    hotels = data['hotels']
+    attractions = data['attractions']
+    activities = data['activities']
+    daily_plans_list = data['daily_plans_list']
+    all_images = data['images']
+    clothing_tips = data['clothing_tips']
+    to_place_name = data['to_place']
+    itinerary_data = data
+
+    # Display Weather
+    trip_weather = [day for day in data.get('trip_weather') or [] if day]
+    if weather_data and weather_data.get("current"):
+        st.markdown("---")
+        st.header("🌤️ Weather Forecast")
         
-        # Create a flow of images
-        attractions = itinerary_data.get('attractions', [])
+        col1, col2, col3, col4 = st.columns(4)
         
-        for attr in attractions:
-            img_url = all_images.get(attr['name'])
-            if img_url:
-                pdf_img = fetch_image_for_pdf(img_url, width_in_inches=4.0)
-                if pdf_img:
-                    # Keep image and title together in a nice formatted block
-                    items = [
-                        Paragraph(f"<b>{attr['name']}</b>", subheading_style),
-                        Paragraph(f"<font color='gray'>{attr['type']}</font>", normal_style),
-                        Spacer(1, 0.05*inch),
-                        pdf_img,
-                        Spacer(1, 0.05*inch),
-                        Paragraph(attr.get('summary', '')[:200] + "...", normal_style),
-                        Spacer(1, 0.3*inch)
-                    ]
-                    elements.append(KeepTogether(items))
+        with col1:
+            st.metric(
+                "Temperature",
+                f"{weather_data['current']['temperature_2m']}°C"
+            )
         
-        # Latest News Section
-        news_items = itinerary_data.get('news', [])
-        if news_items:
-            elements.append(PageBreak())
-            elements.append(Paragraph("📰 Latest News & Updates", heading_style))
+        with col2:
+            st.metric(
+                "Humidity",
+                f"{weather_data['current']['relative_humidity_2m']}%"
+            )
+        
+        with col3:
+            st.metric(
+                "Wind Speed",
+                f"{weather_data['current']['wind_speed_10m']} km/h"
+            )
+        
+        with col4:
+            st.metric(
+                "Conditions",
+                format_weather_code(weather_data['current']['weather_code'])
+            )
             
-            for article in news_items:
-                source_name = article.get('source', {}).get('name', 'Source')
-                pub_date = article.get('publishedAt', '')[:10]
-                
-                # Title as link if possible (ReportLab supports <a href="...">)
-                article_url = article.get('url', '#')
-                title_text = f'<u><a href="{article_url}" color="blue">{article["title"]}</a></u>'
-                
-                items = [
-                    Paragraph(title_text, subheading_style),
-                    Paragraph(f"<font color='gray' size=9>{source_name} • {pub_date}</font>", normal_style),
-                    Spacer(1, 0.05*inch),
-                    Paragraph(f"<i>{article.get('description', '') or ''}</i>", normal_style),
-                    Spacer(1, 0.2*inch)
-                ]
-                elements.append(KeepTogether(items))
-
-        # Build PDF
-        doc.build(elements)
+    elif trip_weather:
+        st.markdown("---")
+        st.header("🌤️ Weather Forecast")
+    
+    if trip_weather:
+        # Daily forecast for the trip's own dates; beyond the forecast window, typical weather
+        st.subheader("Daily Forecast")
+        forecast_df = pd.DataFrame({
+            'Date': [day['date'] for day in trip_weather],
+            'Max Temp': [day['temperature_2m_max'] for day in trip_weather],
+            'Min Temp': [day['temperature_2m_min'] for day in trip_weather],
+            'Conditions': [format_weather_code(day['weather_code']) for day in trip_weather],
+            'Source': ["Forecast" if day['source'] == "forecast" else
+                       f"Typical ({day['precipitation_probability']}% rain)" for day in trip_weather]
+        })
+        st.dataframe(forecast_df, use_container_width=True)
         
-        # Return PDF bytes
-        pdf_bytes = pdf_buffer.getvalue()
-        return pdf_bytes
+    # Display Hotels (Modern Cards with Images)
+    st.markdown("---")
+    st.header("🏨 Recommended Hotels")
+    
+    if hotels:
+        # Display in a grid
+        hotel_cols = st.columns(3)
+        for idx, hotel in enumerate(hotels):
+            with hotel_cols[idx % 3]:
+                # Use a container for card-like styling
+                with st.container():
+                    st.markdown(f"""
+                    <div style="background-color: white; border-radius: 10px; padding: 0; box-shadow: 0 4px 8px rgba(0,0,0,0.1); margin-bottom: 20px; overflow: hidden; border: 1px solid #ddd;">
+                        <img src="{hotel['image']}" style="width: 100%; height: 150px; object-fit: cover;">
+                        <div style="padding: 15px;">
+                            <h4 style="margin: 0 0 5px 0;">
+                                <a href="{hotel['link']}" target="_blank" style="text-decoration: none; color: #333;">{hotel['name']} 🔗</a>
+                            </h4>
+                            <div style="font-size: 14px; color: #666; margin-bottom: 5px;">
+                                ⭐ <b>{hotel['rating']}</b> ({hotel['reviews']} reviews)
+                            </div>
+                            <div style="font-size: 18px; color: #28a745; font-weight: bold; margin-bottom: 10px;">
+                                ₹{hotel['price']}/night
+                                {f'<span style="font-size: 12px; color: #666; font-weight: normal;">(average of {len(hotel["price_calendar"])} nightly rates)</span>' if hotel.get('price_calendar') else ''}
+                            </div>
+                            <p style="font-size: 12px; color: #555; margin: 0;">
+                                {hotel['address']}
+                            </p>
+                        </div>
+                    </div>
+                    """, unsafe_allow_html=True)
+    else:
+        st.info("No hotels matched your strict budget criteria.")
+    
+    # Hotels just outside the budget band
+    hotel_alternatives = data.get('hotel_alternatives') or []
+    if hotel_alternatives:
+        with st.expander(f"💡 {len(hotel_alternatives)} good options just outside your budget"):
+            for hotel in hotel_alternatives:
+                st.markdown(f"**[{hotel['name']}]({hotel['link']})** · ₹{hotel['price']}/night · "
+                            f"⭐ {hotel['rating']} ({hotel['reviews']} reviews)")
+    
+    # Display Attractions
+    st.markdown("---")
+    st.header("🎭 Top Attractions")
+
+    # Prepare HTML for carousel
+    cards_html = ""
+    for attraction in attractions:
+        image_url = all_images.get(attraction['name'], "https://source.unsplash.com/400x300/?travel,landmark")
+        wiki_url = f"https://en.wikipedia.org/wiki/{attraction['name'].replace(' ', '_')}"
         
-    except ImportError:
-        st.error("ReportLab not installed. Install with: pip install reportlab")
-        return None
-    except Exception as e:
-        st.error(f"PDF generation error: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return None
-
+        cards_html += f"""
+        <div style="min-width: 300px; max-width: 300px; background: white; border-radius: 10px; padding: 15px; box-shadow: 0 4px 6px rgba(0,0,0,0.1); border: 1px solid #e0e0e0; display: flex; flex-direction: column;">
+            <img src="{image_url}" style="width: 100%; height: 180px; object-fit: cover; border-radius: 8px; margin-bottom: 10px;">
+            <a href="{wiki_url}" target="_blank" style="text-decoration: none; color: inherit;">
+                <h3 style="margin: 0 0 5px 0; font-size: 1.2rem; color: #333; cursor: pointer; transition: color 0.2s;">
+                    {attraction['name']} 🔗
+                </h3>
+            </a>
+            <div style="font-size: 0.8rem; color: #e91e63; margin-bottom: 8px; text-transform: uppercase; font-weight: bold;">{attraction['type']}</div>
+            <p style="font-size: 0.9rem; color: #555; line-height: 1.4; flex-grow: 1; overflow: hidden; text-overflow: ellipsis; display: -webkit-box; -webkit-line-clamp: 3; -webkit-box-orient: vertical; margin: 0;">
+                {attraction.get('summary', '')}
+            </p>
+        </div>
+        """
+    
+    # Render scrollable container
+    st.markdown(f"""
+        <style>
+        .carousel-container {{
+            display: flex;
+            overflow-x: auto;
+            gap: 20px;
+            padding: 20px 0 40px 0; /* Extra bottom padding for scrollbar */
+            scroll-behavior: smooth;
+            scrollbar-width: thin;
+            scrollbar-color: #667eea #f0f2f6;
+        }}
+        .carousel-container::-webkit-scrollbar {{
+            height: 8px;
+        }}
+        .carousel-container::-webkit-scrollbar-track {{
+            background: #f0f2f6;
+            border-radius: 4px;
+        }}
+        .carousel-container::-webkit-scrollbar-thumb {{
+            background-color: #667eea;
+            border-radius: 4px;
+        }}
+        </style>
+        <div class="carousel-container">
+            {cards_html}
+        </div>
+    """, unsafe_allow_html=True)
 
+    # Display Activities Carousel
+    st.markdown("---")
+    st.header("🏄 Exciting Activities")
+    
+    activity_cards_html = ""
+    for activity in activities:
+        # Use same image logic
+        image_url = all_images.get(activity['name'], "https://source.unsplash.com/400x300/?travel,fun")
+        
+        activity_cards_html += f"""
+        <div style="min-width: 300px; max-width: 300px; background: white; border-radius: 10px; padding: 15px; box-shadow: 0 4px 6px rgba(0,0,0,0.1); border: 1px solid #e0e0e0; display: flex; flex-direction: column;">
+            <img src="{image_url}" style="width: 100%; height: 180px; object-fit: cover; border-radius: 8px; margin-bottom: 10px;">
+            <h3 style="margin: 0 0 5px 0; font-size: 1.2rem; color: #333;">{activity['name']}</h3>
+            <div style="font-size: 0.8rem; color: #e91e63; margin-bottom: 8px; text-transform: uppercase; font-weight: bold;">{activity['type']}</div>
+            <p style="font-size: 0.9rem; color: #555; line-height: 1.4; flex-grow: 1; overflow: hidden; text-overflow: ellipsis; display: -webkit-box; -webkit-line-clamp: 3; -webkit-box-orient: vertical; margin: 0;">
+                {activity.get('summary', '')}
+            </p>
+        </div>
+        """
+    
+    st.markdown(f"""
+        <div class="carousel-container">
+            {activity_cards_html}
+        </div>
+    """, unsafe_allow_html=True)
+    
+    # Display Clothing Tips
+    st.markdown("---")
+    st.header("👕 What to Pack")
+    
+    st.info(clothing_tips)
+    
+    # Display Daily Plans
+    st.markdown("---")
+    st.header("📅 Daily Itineraries")
+    
+    # Initialize session keys for images if not exist
+    if 'daily_images' not in st.session_state:
+        st.session_state.daily_images = {}
 
-def get_latest_news(destination: str) -> List[Dict]:
-    """
-    Fetch latest news about the destination using NewsAPI
-    """
-    try:
-        api_key = os.getenv("NEWS_API_KEY")
-        if not api_key:
-            return []
-            
-        url = "https://newsapi.org/v2/everything"
-        # Refined query for events and local happenings
-        params = {
-            "q": f'"{destination}" AND (events OR festival OR concert OR exhibition OR "things to do" OR culture OR nightlife)',
-            "apiKey": api_key,
-            "language": "en",
-            "sortBy": "relevancy",
-            "pageSize": 5
-        }
+    # Render each day
+    for day_info in daily_plans_list:
+        day_num = day_info['day']
         
-        response = requests.get(url, params=params, timeout=5)
-        data = response.json()
+        # Use columns for layout
+        d_col1, d_col2 = st.columns([1.5, 1])
         
-        if data.get("status") == "ok":
-            return data.get("articles", [])
-        else:
-            print(f"NewsAPI Error: {data.get('message')}")
-            return []
+        with d_col1:
+            st.markdown(day_info['text'])
+        
+        with d_col2:
+            st.write("") # Spacer
+            st.write("")
             
-    except Exception as e:
-        print(f"News error: {e}")
-        return []
+            img_key = f"img_{to_place_name}_{day_num}"
+            
+            # Check if we already have an image
+            if img_key in st.session_state.daily_images:
+                st.image(st.session_state.daily_images[img_key], use_column_width=True, caption=f"Day {day_num} Vibes ✨")
+            else:
+                st.info("🎨 Visualize this day!")
+                if st.button(f"✨ Generate Day {day_num} Visual", key=f"btn_{key_prefix}{day_num}"):
+                    with st.spinner("Creating unique visual..."):
+                        img_url, error_msg = generate_daily_image(day_info['location'], day_info['highlight'])
+                        if img_url:
+                            # Kept as bytes with the saved itinerary: the generated URL expires within hours
+                            image = saved.download_image(img_url)
+                            itinerary_id = st.session_state.get('itinerary_id')
+                            if image and itinerary_id:
+                                saved.save_image(itinerary_id, img_key, image)
+                            st.session_state.daily_images[img_key] = image or img_url
+                            st.rerun()
+                        else:
+                            st.error(f"Image Generation Failed: {error_msg}")
+    
+    # Display News Section
+    if itinerary_data.get('news'):
+        st.markdown("---")
+        st.header("📰 Latest News & Updates")
+        
+        # Show metadata as requested
+        with st.expander("🔍 View News Metadata (Source Data)"):
+            st.json(itinerary_data['news'])
+            
+        for article in itinerary_data['news']:
+            with st.container():
+                cols = st.columns([1, 4])
+                with cols[0]:
+                    if article.get('urlToImage'):
+                        st.image(article['urlToImage'], use_column_width=True)
+                    else:
+                        st.write("📰")
+                with cols[1]:
+                    st.markdown(f"**[{article['title']}]({article['url']})**")
+                    st.caption(f"{article.get('source', {}).get('name')} • {article.get('publishedAt', '')[:10]}")
+                    st.write(article.get('description', ''))
+
+
+def destination_picker(label: str, key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Search box plus confirmation dropdown; returns the chosen place or None
+    """
+    to_place_query = st.text_input(
+        label,
+        placeholder="e.g., Paris",
+        key=f"{key}_query" if key else None
+    )
+    
+    if not to_place_query:
+        return None
+    
+    # Fetch candidates
+    candidates = search_destinations(to_place_query)
+    
+    if not candidates:
+        st.warning("No location found. Try adding a country name (e.g., 'Paris, France')")
+        return None
+    
+    # Create friendly labels for dropdown
+    options = {
+        f"{c['name']}, {c['country']} " + (f"({c['admin1']})" if c['admin1'] else ""): c 
+        for c in candidates
+    }
+    
+    selected_label = st.selectbox(
+        "✅ Confirm Destination",
+        options=list(options.keys()),
+        key=f"{key}_choice" if key else None
+    )
+    
+    return options[selected_label]
 
 
 # ============================================================================
 # MAIN APPLICATION
 # ============================================================================
 
+def finish_generation(job: "jobs.Job") -> None:
+    """
+    Hand a finished job's itinerary (or error) to this session and detach from it.
+    """
+    st.session_state.pop("generation_job", None)
+    if st.query_params.get("job") == job.id:
+        del st.query_params["job"]
+    
+    if job.status == jobs.FAILED:
+        st.session_state.generation_notice = {"error": job.error}
+        return
+    st.session_state.itinerary_data = job.result
+    st.session_state.itinerary_id = job.id
+    st.query_params["trip"] = job.id
+    st.session_state.generation_notice = {"job": job.id}
+
+
+def open_saved_itinerary(itinerary_id: str) -> None:
+    """
+    Show a saved itinerary (from a `?trip=` link) with its day visuals, without generating anything.
+    """
+    st.session_state.itinerary_id = itinerary_id
+    itinerary = saved.load(itinerary_id)
+    if itinerary is None:
+        st.session_state.pop('itinerary_data', None)
+        st.warning("🔗 That saved itinerary no longer exists (old itineraries are cleaned up). Generate a new one below.")
+        return
+    st.session_state.itinerary_data = itinerary
+    st.session_state.setdefault('daily_images', {}).update(saved.load_images(itinerary_id))
+
+
+@st.fragment(run_every=JOB_POLL_S)
+def show_generation_job(job_id: str) -> None:
+    """
+    Poll the background generation. Only this fragment reruns while it works,
+    and the whole page reruns once the itinerary is ready.
+    """
+    job = jobs.get_job(job_id)
+    if job is None:
+        return
+    state = job.snapshot()
+    
+    if state["status"] == jobs.QUEUED:
+        st.info(f"⏳ Waiting for a free worker ({state['queued_ahead']} generations ahead of yours)...")
+    elif state["status"] == jobs.RUNNING:
+        st.progress(state["percent"])
+        st.text(f"{state['message']} ({state['elapsed']:.0f}s)")
+    else:
+        finish_generation(job)
+        st.rerun()
+
+
 def main():
     # Header
     st.markdown("""
@@ -981,6 +1917,50 @@ def main():
             - OpenAI: {'✅ Configured' if os.getenv('OPENAI_API_KEY') else '❌ Not Found'}
             - Unsplash: {'✅ Configured' if os.getenv('UNSPLASH_API_KEY') else '❌ Not Found'}
         """)
+        
+        fast_mode = st.toggle(
+            "⚡ Fast mode",
+            help=f"Use the lowest-latency model ({llm.TIERS[llm.FAST_TIER]['model']}) for every AI step"
+        )
+        llm.set_fast_mode(fast_mode)
+        
+        with st.expander("📊 Provider Metrics"):
+            st.caption("Shared across all sessions in this server process")
+            coalesced = coalesce_stats()
+            if coalesced:
+                st.markdown("**Coalesced calls**")
+                st.dataframe(pd.DataFrame(coalesced).T, use_container_width=True)
+            limits = rate_limit_stats()
+            if limits:
+                st.markdown("**Rate limits**")
+                st.dataframe(pd.DataFrame(limits).T, use_container_width=True)
+            health = health_stats()
+            if health:
+                st.markdown("**Provider health**")
+                st.dataframe(pd.DataFrame(health).T, use_container_width=True)
+            hedge_wins = hedge_stats()
+            if hedge_wins:
+                st.markdown("**Image provider wins**")
+                st.dataframe(pd.DataFrame([hedge_wins]), use_container_width=True)
+            cache_counters = cache_stats()
+            if cache_counters:
+                st.markdown("**Cache**")
+                st.dataframe(pd.DataFrame(cache_counters).T, use_container_width=True)
+            job_counts = jobs.job_stats()
+            st.markdown("**Generation jobs**")
+            st.dataframe(pd.DataFrame([job_counts]), use_container_width=True)
+            st.markdown("**Saved itineraries**")
+            st.dataframe(pd.DataFrame([saved.store_stats()]), use_container_width=True)
+            tiles = places.tile_stats()
+            if tiles["tiles_read"]:
+                st.markdown("**Place tiles**")
+                st.dataframe(pd.DataFrame([tiles]), use_container_width=True)
+            llm_usage = llm.llm_stats()
+            if llm_usage:
+                st.markdown("**LLM usage**")
+                st.dataframe(pd.DataFrame(llm_usage).T, use_container_width=True)
+            if not coalesced and not limits and not health and not hedge_wins and not cache_counters and not tiles["tiles_read"] and not llm_usage:
+                st.write("No provider calls yet.")
     
     # Main Content
     col1, col2 = st.columns([1, 1])
@@ -993,32 +1973,23 @@ def main():
             placeholder="e.g., New York, USA"
         )
         
-        to_place_query = st.text_input(
-            "✈️ Destination Search",
-            placeholder="e.g., Paris"
+        multi_city = st.toggle(
+            "🗺️ Multi-city trip",
+            help=f"Visit up to {MAX_LEGS} cities in order; every city is planned in parallel"
         )
         
         selected_destination = None
+        legs = []
         
-        if to_place_query:
-            # Fetch candidates
-            candidates = geocode_location(to_place_query)
-            
-            if candidates:
-                # Create friendly labels for dropdown
-                options = {
-                    f"{c['name']}, {c['country']} {f'({c['admin1']})' if c['admin1'] else ''}": c 
-                    for c in candidates
-                }
-                
-                selected_label = st.selectbox(
-                    "✅ Confirm Destination",
-                    options=list(options.keys())
-                )
-                
-                selected_destination = options[selected_label]
-            else:
-                st.warning("No location found. Try adding a country name (e.g., 'Paris, France')")
+        if multi_city:
+            num_legs = st.number_input("🏙️ Number of Cities", min_value=2, max_value=MAX_LEGS, value=2)
+            for n in range(1, num_legs + 1):
+                leg_destination = destination_picker(f"✈️ City {n}", key=f"leg{n}")
+                leg_days = st.number_input(f"📅 Days in City {n}", min_value=1, max_value=30, value=2, key=f"leg{n}_days")
+                if leg_destination:
+                    legs.append({"destination": leg_destination, "days": leg_days})
+        else:
+            selected_destination = destination_picker("✈️ Destination Search")
     
     with col2:
         st.header("📋 Trip Info")
@@ -1029,12 +2000,16 @@ def main():
             min_value=datetime.now()
         )
         
-        num_days = st.slider(
-            "Duration (Days)",
-            min_value=1,
-            max_value=30,
-            value=3
-        )
+        if multi_city:
+            num_days = sum(leg["days"] for leg in legs)
+            st.metric("Duration (Days)", num_days, help="Sum of the days in each city")
+        else:
+            num_days = st.slider(
+                "Duration (Days)",
+                min_value=1,
+                max_value=30,
+                value=3
+            )
     
     col3, col4 = st.columns([1, 1])
     
@@ -1055,430 +2030,125 @@ def main():
             step=500
         )
     
+    # Generation runs as a background job; this script run only starts or polls it.
+    # The job id is also in the URL, so a page refresh reattaches to it.
+    job = jobs.get_job(st.session_state.get("generation_job") or st.query_params.get("job"))
+    
+    # A share link (?trip=<id>) reopens a saved itinerary instantly
+    trip_id = st.query_params.get("trip")
+    if trip_id and trip_id != st.session_state.get("itinerary_id"):
+        open_saved_itinerary(trip_id)
+    
     # Generate Button
-    if st.button("🚀 Generate My Perfect Itinerary", use_container_width=True):
+    if st.button("🚀 Generate My Perfect Itinerary", use_container_width=True,
+                 disabled=job is not None and job.active):
         
-        if not from_place or not selected_destination:
+        if not from_place or (multi_city and len(legs) < num_legs) or (not multi_city and not selected_destination):
             st.error("❌ Please ensure you have entered a 'From' location and selected a 'Destination'!")
         else:
-            # Create progress bar
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            # Step 1: Geocode Destination
-            status_text.text("📍 Finding your destination...")
-            progress_bar.progress(10)
-            
-            destination_coords = selected_destination
-            to_place_name = selected_destination['name']
-            
-            # Step 2: Get Weather
-            status_text.text("🌤️ Fetching weather forecast...")
-            progress_bar.progress(25)
-            
-            weather_data = get_weather(
-                destination_coords["latitude"],
-                destination_coords["longitude"],
-                destination_coords.get("timezone", "UTC")
-            )
-            
-            # Step 3: Get Attractions (Merged Sources)
-            status_text.text("🎭 Discovering attractions (OpenAI + Geoapify)...")
-            progress_bar.progress(40)
-            
-            # 1. Get descriptive list from OpenAI
-            openai_attractions = get_attractions(to_place_name, limit=4)
-            
-            # 2. Get specific locations from Geoapify
-            geoapify_attractions = get_geoapify_attractions(
-                destination_coords["latitude"], 
-                destination_coords["longitude"], 
-                limit=6
-            )
-            
-            # 3. Merge and deduplicate
-            # We prefer OpenAI for descriptions, but want Geoapify's variety
-            seen_names = {a["name"].lower() for a in openai_attractions}
-            attractions = openai_attractions.copy()
-            
-            for ga in geoapify_attractions:
-                # Simple dedupe: if name not roughly in existing list
-                is_duplicate = False
-                ga_name = ga["name"].lower()
-                for seen in seen_names:
-                    if ga_name in seen or seen in ga_name:
-                        is_duplicate = True
-                        break
-                
-                if not is_duplicate:
-                    attractions.append(ga)
-                    seen_names.add(ga_name)
-                    
-            # Limit total
-            attractions = attractions[:10]
-            
-            # Step 4: Get Activities
-            status_text.text("🏄 Finding exciting activities...")
-            progress_bar.progress(50)
-            
-            activities = get_activities(to_place_name, limit=6)
-            
-            # Step 5: Get Hotels (Strict Budget Logic)
-            status_text.text("🏨 finding best hotels in your budget...")
-            progress_bar.progress(60)
-            
-            hotels = get_hotels(to_place_name, budget, num_days, num_people)
-            
-            if not hotels:
-                st.warning(f"No hotels found strictly between ₹{int((budget/num_days)*0.5)} and ₹{int((budget/num_days)*0.75)}/night. Try adjusting your budget!")
-            
-            # Step 6: Get Images (Attractions + Activities)
-            status_text.text("📸 Fetching beautiful images...")
-            progress_bar.progress(75)
-            
-            # Fetch images for both lists
-            attraction_images = get_images(attractions)
-            activity_images = get_images(activities) # get_images works for any list with 'name' key
-            
-            # Combine for itinerary data
-            all_images = {**attraction_images, **activity_images}
-            
-            # Step 7: Generate Recommendations
-            status_text.text("🎯 Generating personalized recommendations...")
-            progress_bar.progress(85)
-            
-            clothing_tips = get_clothing_recommendation(weather_data, num_days)
-            
-            # Step 8: Get Latest News
-            status_text.text("📰 Checking latest news...")
-            progress_bar.progress(90)
-            
-            news_data = get_latest_news(to_place_name)
-            
-            # Step 9: Create Itinerary
-            status_text.text("✍️ Creating your itinerary...")
-            progress_bar.progress(95)
-            
-            daily_plans = ""
-            daily_plans_list = []
-            
-            if weather_data and weather_data.get("daily"):
-                for i in range(min(num_days, len(weather_data["daily"]["time"]))):
-                    weather_code = weather_data["daily"]["weather_code"][i]
-                    weather_desc = format_weather_code(weather_code)
-                    
-                    # Highlight activity for image gen
-                    day_attraction = attractions[i % len(attractions)]['name']
-                    
-                    day_plan_text = generate_day_plan(i+1, attractions[i % len(attractions):], weather_desc)
-                    daily_plans += day_plan_text + "\n"
-                    
-                    daily_plans_list.append({
-                        "day": i+1,
-                        "text": day_plan_text,
-                        "highlight": f"visiting {day_attraction}",
-                        "location": to_place_name
-                    })
-            
-            progress_bar.progress(100)
-            status_text.text("✅ Itinerary ready!")
-            
-            # Display Results
-            st.success("🎉 Your itinerary has been created! Scroll down to view and download.")
-            
-            # Store itinerary data in session state
-            st.session_state.itinerary_data = {
-                'from_place': from_place,
-                'to_place': to_place_name,
-                'num_days': num_days,
-                'num_people': num_people,
-                'budget': budget,
-                'attractions': attractions,
-                'activities': activities,
-                'hotels': hotels,
-                'clothing_tips': clothing_tips,
-                'daily_plans': daily_plans,
-                'daily_plans_list': daily_plans_list,
-                'images': all_images,
-                'weather': weather_data,
-                'news': news_data
-            }
+            # Stage outputs kept per destination, so the next Generate only recomputes what changed
+            stage_outputs = st.session_state.setdefault("stage_outputs", {})
+            
+            if multi_city:
+                # Every city runs the full pipeline at the same time
+                job = jobs.start_job(
+                    " → ".join(leg["destination"]["name"] for leg in legs),
+                    build_trip, legs, from_place, travel_dates, num_people, budget, stage_outputs
+                )
+            else:
+                job = jobs.start_job(
+                    selected_destination["name"],
+                    build_itinerary, selected_destination, from_place, travel_dates, num_days, num_people, budget,
+                    stage_outputs
+                )
+            st.session_state.generation_job = job.id
+            st.query_params["job"] = job.id
+    
+    if job is not None:
+        show_generation_job(job.id)
+    
+    notice = st.session_state.pop("generation_notice", None)
+    if notice is not None:
+        if notice.get("error"):
+            st.error(f"❌ Couldn't create your itinerary: {notice['error']}")
+        elif 'itinerary_data' in st.session_state:
+            itinerary = st.session_state.itinerary_data
+            generation = itinerary['generation']
+            
+            st.success(f"🎉 Your itinerary was created in {generation['seconds']:.1f}s! Scroll down to view and download.")
+            if not itinerary.get('legs') and not itinerary['hotels']:
+                min_price, max_price = hotel_budget_band(itinerary['budget'], itinerary['num_days'])
+                st.warning(f"No hotels found strictly between ₹{int(min_price)} and ₹{int(max_price)}/night. Try adjusting your budget!")
+            if generation['degraded']:
+                st.info(f"⏱️ To keep things fast, these sections use cached or placeholder data: {', '.join(generation['degraded'])}. Generate again later for fresh results.")
+            if generation['reused']:
+                st.caption(f"♻️ Unchanged since your last itinerary, reused: {', '.join(generation['reused'])}")
             
     # DISPLAY RESULTS FROM SESSION STATE
     if 'itinerary_data' in st.session_state:
         data = st.session_state.itinerary_data
-        
-        # Unpack commonly used variables for easier access in display code
-        weather_data = data['weather']
-        hotels = data['hotels']
-        attractions = data['attractions']
-        activities = data['activities']
-        daily_plans_list = data['daily_plans_list']
-        all_images = data['images']
-        clothing_tips = data['clothing_tips']
-        daily_plans = data['daily_plans']
-        to_place = data['to_place']
-        to_place_name = to_place
+        to_place = data['to_place'].replace(" → ", "-")  # used in file names
         itinerary_data = data
-
-        # Display Weather
-        if weather_data and weather_data.get("current"):
-            st.markdown("---")
-            st.header("🌤️ Weather Forecast")
-            
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                st.metric(
-                    "Temperature",
-                    f"{weather_data['current']['temperature_2m']}°C"
-                )
-            
-            with col2:
-                st.metric(
-                    "Humidity",
-                    f"{weather_data['current']['relative_humidity_2m']}%"
-                )
-            
-            with col3:
-                st.metric(
-                    "Wind Speed",
-                    f"{weather_data['current']['wind_speed_10m']} km/h"
-                )
-            
-            with col4:
-                st.metric(
-                    "Conditions",
-                    format_weather_code(weather_data['current']['weather_code'])
-                )
-                
-            # Daily forecast
-            st.subheader("Daily Forecast")
-            # Calculate dates based on user START date
-            start_date = travel_dates
-            date_list = [(start_date + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(min(num_days, len(weather_data['daily']['time'])))]
-            
-            forecast_df = pd.DataFrame({
-                'Date': date_list,
-                'Max Temp': weather_data['daily']['temperature_2m_max'][:len(date_list)],
-                'Min Temp': weather_data['daily']['temperature_2m_min'][:len(date_list)],
-                'Conditions': [format_weather_code(code) for code in weather_data['daily']['weather_code'][:len(date_list)]]
-            })
-            st.dataframe(forecast_df, use_container_width=True)
-            
-            # Display Hotels (Modern Cards with Images)
-            st.markdown("---")
-            st.header("🏨 Recommended Hotels")
-            
-            if hotels:
-                # Display in a grid
-                hotel_cols = st.columns(3)
-                for idx, hotel in enumerate(hotels):
-                    with hotel_cols[idx % 3]:
-                        # Use a container for card-like styling
-                        with st.container():
-                            st.markdown(f"""
-                            <div style="background-color: white; border-radius: 10px; padding: 0; box-shadow: 0 4px 8px rgba(0,0,0,0.1); margin-bottom: 20px; overflow: hidden; border: 1px solid #ddd;">
-                                <img src="{hotel['image']}" style="width: 100%; height: 150px; object-fit: cover;">
-                                <div style="padding: 15px;">
-                                    <h4 style="margin: 0 0 5px 0;">
-                                        <a href="{hotel['link']}" target="_blank" style="text-decoration: none; color: #333;">{hotel['name']} 🔗</a>
-                                    </h4>
-                                    <div style="font-size: 14px; color: #666; margin-bottom: 5px;">
-                                        ⭐ <b>{hotel['rating']}</b> ({hotel['reviews']} reviews)
-                                    </div>
-                                    <div style="font-size: 18px; color: #28a745; font-weight: bold; margin-bottom: 10px;">
-                                        ₹{hotel['price']}/night
-                                    </div>
-                                    <p style="font-size: 12px; color: #555; margin: 0;">
-                                        {hotel['address']}
-                                    </p>
-                                </div>
-                            </div>
-                            """, unsafe_allow_html=True)
-            else:
-                st.info("No hotels matched your strict budget criteria.")
-            
-            # Display Attractions
-            st.markdown("---")
-            st.header("🎭 Top Attractions")
-
-            # Prepare HTML for carousel
-            cards_html = ""
-            for attraction in attractions:
-                image_url = all_images.get(attraction['name'], "https://source.unsplash.com/400x300/?travel,landmark")
-                wiki_url = f"https://en.wikipedia.org/wiki/{attraction['name'].replace(' ', '_')}"
-                
-                cards_html += f"""
-                <div style="min-width: 300px; max-width: 300px; background: white; border-radius: 10px; padding: 15px; box-shadow: 0 4px 6px rgba(0,0,0,0.1); border: 1px solid #e0e0e0; display: flex; flex-direction: column;">
-                    <img src="{image_url}" style="width: 100%; height: 180px; object-fit: cover; border-radius: 8px; margin-bottom: 10px;">
-                    <a href="{wiki_url}" target="_blank" style="text-decoration: none; color: inherit;">
-                        <h3 style="margin: 0 0 5px 0; font-size: 1.2rem; color: #333; cursor: pointer; transition: color 0.2s;">
-                            {attraction['name']} 🔗
-                        </h3>
-                    </a>
-                    <div style="font-size: 0.8rem; color: #e91e63; margin-bottom: 8px; text-transform: uppercase; font-weight: bold;">{attraction['type']}</div>
-                    <p style="font-size: 0.9rem; color: #555; line-height: 1.4; flex-grow: 1; overflow: hidden; text-overflow: ellipsis; display: -webkit-box; -webkit-line-clamp: 3; -webkit-box-orient: vertical; margin: 0;">
-                        {attraction.get('summary', '')}
-                    </p>
-                </div>
-                """
-            
-            # Render scrollable container
-            st.markdown(f"""
-                <style>
-                .carousel-container {{
-                    display: flex;
-                    overflow-x: auto;
-                    gap: 20px;
-                    padding: 20px 0 40px 0; /* Extra bottom padding for scrollbar */
-                    scroll-behavior: smooth;
-                    scrollbar-width: thin;
-                    scrollbar-color: #667eea #f0f2f6;
-                }}
-                .carousel-container::-webkit-scrollbar {{
-                    height: 8px;
-                }}
-                .carousel-container::-webkit-scrollbar-track {{
-                    background: #f0f2f6;
-                    border-radius: 4px;
-                }}
-                .carousel-container::-webkit-scrollbar-thumb {{
-                    background-color: #667eea;
-                    border-radius: 4px;
-                }}
-                </style>
-                <div class="carousel-container">
-                    {cards_html}
-                </div>
-            """, unsafe_allow_html=True)
-
-            # Display Activities Carousel
-            st.markdown("---")
-            st.header("🏄 Exciting Activities")
-            
-            activity_cards_html = ""
-            for activity in activities:
-                # Use same image logic
-                image_url = all_images.get(activity['name'], "https://source.unsplash.com/400x300/?travel,fun")
-                
-                activity_cards_html += f"""
-                <div style="min-width: 300px; max-width: 300px; background: white; border-radius: 10px; padding: 15px; box-shadow: 0 4px 6px rgba(0,0,0,0.1); border: 1px solid #e0e0e0; display: flex; flex-direction: column;">
-                    <img src="{image_url}" style="width: 100%; height: 180px; object-fit: cover; border-radius: 8px; margin-bottom: 10px;">
-                    <h3 style="margin: 0 0 5px 0; font-size: 1.2rem; color: #333;">{activity['name']}</h3>
-                    <div style="font-size: 0.8rem; color: #e91e63; margin-bottom: 8px; text-transform: uppercase; font-weight: bold;">{activity['type']}</div>
-                    <p style="font-size: 0.9rem; color: #555; line-height: 1.4; flex-grow: 1; overflow: hidden; text-overflow: ellipsis; display: -webkit-box; -webkit-line-clamp: 3; -webkit-box-orient: vertical; margin: 0;">
-                        {activity.get('summary', '')}
-                    </p>
-                </div>
-                """
-            
-            st.markdown(f"""
-                <div class="carousel-container">
-                    {activity_cards_html}
-                </div>
-            """, unsafe_allow_html=True)
-            
-            # Display Clothing Tips
-            st.markdown("---")
-            st.header("👕 What to Pack")
-            
-            st.info(clothing_tips)
-            
-            # Display Daily Plans
-            st.markdown("---")
-            st.header("📅 Daily Itineraries")
-            
-            # Initialize session keys for images if not exist
-            if 'daily_images' not in st.session_state:
-                st.session_state.daily_images = {}
-
-            # Render each day
-            for day_info in daily_plans_list:
-                day_num = day_info['day']
-                
-                # Use columns for layout
-                d_col1, d_col2 = st.columns([1.5, 1])
-                
-                with d_col1:
-                    st.markdown(day_info['text'])
-                
-                with d_col2:
-                    st.write("") # Spacer
-                    st.write("")
-                    
-                    img_key = f"img_{to_place_name}_{day_num}"
-                    
-                    # Check if we already have an image
-                    if img_key in st.session_state.daily_images:
-                        st.image(st.session_state.daily_images[img_key], use_column_width=True, caption=f"Day {day_num} Vibes ✨")
-                    else:
-                        st.info("🎨 Visualize this day!")
-                        if st.button(f"✨ Generate Day {day_num} Visual", key=f"btn_{day_num}"):
-                            with st.spinner("Creating unique visual..."):
-                                img_url, error_msg = generate_daily_image(day_info['location'], day_info['highlight'])
-                                if img_url:
-                                    st.session_state.daily_images[img_key] = img_url
-                                    st.rerun()
-                                else:
-                                    st.error(f"Image Generation Failed: {error_msg}")
-            
-            # Display News Section
-            if itinerary_data.get('news'):
+        
+        if st.session_state.get('itinerary_id'):
+            st.caption(f"🔗 Saved as `{st.session_state.itinerary_id}`. This page's link reopens it anytime, on any device.")
+        
+        if data.get('legs'):
+            for number, leg in enumerate(data['legs'], 1):
                 st.markdown("---")
-                st.header("📰 Latest News & Updates")
-                
-                # Show metadata as requested
-                with st.expander("🔍 View News Metadata (Source Data)"):
-                    st.json(itinerary_data['news'])
-                    
-                for article in itinerary_data['news']:
-                    with st.container():
-                        cols = st.columns([1, 4])
-                        with cols[0]:
-                            if article.get('urlToImage'):
-                                st.image(article['urlToImage'], use_column_width=True)
-                            else:
-                                st.write("📰")
-                        with cols[1]:
-                            st.markdown(f"**[{article['title']}]({article['url']})**")
-                            st.caption(f"{article.get('source', {}).get('name')} • {article.get('publishedAt', '')[:10]}")
-                            st.write(article.get('description', ''))
-            
-            # Download Section
-            st.markdown("---")
-            st.header("📥 Download Your Itinerary")
-            
-            col1, col2 = st.columns([1, 1])
-            
-            with col1:
-                # PDF Download
-                pdf_content = create_pdf_content(itinerary_data)
-                
+                st.title(f"🧭 Leg {number}: {leg['to_place']}")
+                st.caption(f"{leg['num_days']} days from {leg['start_date']}")
+                render_itinerary(leg, key_prefix=f"leg{number}_")
+        else:
+            render_itinerary(data)
+        
+        # Download Section
+        st.markdown("---")
+        st.header("📥 Download Your Itinerary")
+        
+        # Fast formats straight from the itinerary data (no images, no ReportLab),
+        # rendered before the PDF so they are clickable while it builds
+        file_stem = f"itinerary_{to_place}_{datetime.now().strftime('%Y%m%d')}"
+        fast_columns = st.columns(len(exports.FORMATS) + 1)
+        
+        with fast_columns[0]:
+            # Text Download
+            text_content = create_pdf_content(itinerary_data)
+            st.download_button(
+                label="📝 Text",
+                data=text_content,
+                file_name=f"{file_stem}.txt",
+                mime="text/plain",
+                use_container_width=True
+            )
+        
+        for column, (extension, (render, mime, label)) in zip(fast_columns[1:], exports.FORMATS.items()):
+            with column:
                 try:
-                    pdf_bytes = download_pdf_button(itinerary_data)
-                    if pdf_bytes:
-                        st.download_button(
-                            label="📄 Download as PDF",
-                            data=pdf_bytes,
-                            file_name=f"itinerary_{to_place}_{datetime.now().strftime('%Y%m%d')}.pdf",
-                            mime="application/pdf",
-                            use_container_width=True
-                        )
+                    st.download_button(
+                        label=label,
+                        data=render(itinerary_data),
+                        file_name=f"{file_stem}.{extension}",
+                        mime=mime,
+                        use_container_width=True
+                    )
                 except Exception as e:
-                    st.warning(f"PDF download temporarily unavailable. {str(e)}")
-            
-            with col2:
-                # Text Download
-                text_content = create_pdf_content(itinerary_data)
+                    print(f"{extension.upper()} export error: {e}")
+                    st.caption(f"{label} unavailable")
+        
+        # PDF Download
+        try:
+            pdf_bytes = download_pdf_button(itinerary_data)
+            if pdf_bytes:
                 st.download_button(
-                    label="📝 Download as Text",
-                    data=text_content,
-                    file_name=f"itinerary_{to_place}_{datetime.now().strftime('%Y%m%d')}.txt",
-                    mime="text/plain",
+                    label="📄 Download as PDF (with images)",
+                    data=pdf_bytes,
+                    file_name=f"{file_stem}.pdf",
+                    mime="application/pdf",
                     use_container_width=True
                 )
-
+        except Exception as e:
+            st.warning(f"PDF download temporarily unavailable. {str(e)}")
 
 if __name__ == "__main__":
     main()
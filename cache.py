@@ -0,0 +1,187 @@
+"""
+Provider Response Cache
+SQLite-backed TTL cache shared by every Streamlit session and by the cache warmer.
+
+Entries are kept after they expire so callers can still fall back to stale
+data when a provider is down; `purge()` removes them for good.
+"""
+
+import functools
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Anchored next to this file so the app and the warmer share it regardless of cwd
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+CACHE_PATH = os.getenv("PROVIDER_CACHE_PATH", os.path.join(CACHE_DIR, "provider_cache.sqlite3"))
+
+MISS = object()
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _connect() -> sqlite3.Connection:
+    """
+    One connection per thread; WAL lets the app and the warmer write concurrently.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        directory = os.path.dirname(CACHE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        _local.conn = conn
+    return conn
+
+
+def _count(namespace: str, field: str) -> None:
+    with _stats_lock:
+        counters = _stats.setdefault(namespace, {"hits": 0, "stale_hits": 0, "misses": 0, "writes": 0})
+        counters[field] += 1
+
+
+def make_key(args: tuple, kwargs: Dict, fn: Optional[Callable] = None) -> str:
+    """
+    Stable key for a call. With `fn`, arguments are bound to its signature so
+    get_weather(1, 2) and get_weather(latitude=1, longitude=2) share an entry.
+    """
+    if fn is not None:
+        try:
+            bound = inspect.signature(fn).bind(*args, **kwargs)
+            bound.apply_defaults()
+            return json.dumps(bound.arguments, sort_keys=True, default=str)
+        except TypeError:
+            pass
+    return json.dumps([args, kwargs], sort_keys=True, default=str)
+
+
+def get(namespace: str, key: str, allow_stale: bool = False) -> Any:
+    """
+    Return the cached value, or MISS. Expired entries only count with allow_stale.
+    """
+    try:
+        row = _connect().execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"Cache read error: {e}")
+        return MISS
+
+    if row is None:
+        _count(namespace, "misses")
+        return MISS
+    if row[1] < time.time():
+        if not allow_stale:
+            _count(namespace, "misses")
+            return MISS
+        _count(namespace, "stale_hits")
+    else:
+        _count(namespace, "hits")
+    return json.loads(row[0])
+
+
+def put(namespace: str, key: str, value: Any, ttl: float) -> None:
+    now = time.time()
+    try:
+        conn = _connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, stored_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, json.dumps(value, default=str), now, now + ttl)
+            )
+        _count(namespace, "writes")
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        print(f"Cache write error: {e}")
+
+
+def expires_in(namespace: str, key: str) -> Optional[float]:
+    """
+    Seconds until the entry expires (negative once expired), None if absent.
+    """
+    try:
+        row = _connect().execute(
+            "SELECT expires_at FROM cache WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+    except sqlite3.Error:
+        return None
+    return None if row is None else row[0] - time.time()
+
+
+def purge(older_than: float = 0) -> int:
+    """
+    Delete entries that expired more than `older_than` seconds ago.
+    """
+    conn = _connect()
+    with conn:
+        cursor = conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time() - older_than,))
+    return cursor.rowcount
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    with _stats_lock:
+        return {namespace: dict(counters) for namespace, counters in _stats.items()}
+
+
+def dont_cache() -> None:
+    """
+    Call from inside a @cached function to keep its current (fallback) result out of the cache.
+    """
+    _local.skip = True
+
+
+def cached(ttl: float, namespace: Optional[str] = None) -> Callable:
+    """
+    Decorator: serve results from the shared cache for `ttl` seconds.
+
+    Empty results and anything flagged with dont_cache() are returned but not
+    stored. The wrapped function also gets:
+      - .refresh(*args)     always call upstream and overwrite the entry
+      - .expires_in(*args)  seconds left on the entry (None if absent)
+      - .stale(*args)       the entry even if expired, or MISS
+    """
+    def decorator(fn: Callable) -> Callable:
+        name = namespace or fn.__name__
+
+        def fill(key: str, args: tuple, kwargs: Dict) -> Any:
+            _local.skip = False
+            result = fn(*args, **kwargs)
+            if result and not _local.skip:
+                put(name, key, result, ttl)
+            _local.skip = False
+            return result
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs, fn)
+            value = get(name, key)
+            if value is not MISS:
+                return value
+            return fill(key, args, kwargs)
+
+        wrapper.refresh = lambda *args, **kwargs: fill(make_key(args, kwargs, fn), args, kwargs)
+        wrapper.expires_in = lambda *args, **kwargs: expires_in(name, make_key(args, kwargs, fn))
+        wrapper.stale = lambda *args, **kwargs: get(name, make_key(args, kwargs, fn), allow_stale=True)
+        wrapper.cache_namespace = name
+        wrapper.ttl = ttl
+        return wrapper
+    return decorator
@@ -0,0 +1,428 @@
+"""
+Provider Cassettes
+Records every upstream provider call to a compact cassette file: its
+request, response and timing. Replay serves them back deterministically,
+so a slow or broken generation can be reproduced, benchmarked or
+regression-tested offline against real payloads.
+
+    PROVIDER_CASSETTE=runs/paris.cassette PROVIDER_CASSETTE_MODE=record streamlit run app.py
+    PROVIDER_CASSETTE=runs/paris.cassette PROVIDER_CASSETTE_MODE=replay streamlit run app.py
+    PROVIDER_CASSETTE=runs/paris.cassette PROVIDER_CASSETTE_MODE=replay-fast python load_test.py
+    python cassette.py runs/paris.cassette            # what's in it
+
+Modes:
+    record       pass calls through and append each one to the cassette
+    replay       serve recorded calls after their recorded latency (streams keep their chunk timing)
+    replay-fast  serve recorded calls immediately, without rate-limit pacing
+
+Every call goes through providers.py (limited_get, limited_call,
+limited_stream), so rate limits, deadlines and circuit breakers behave as
+they did live; image downloads for saved itineraries and PDFs are recorded
+under the "images" provider. A stream the caller abandoned (say, cut off
+by the generation deadline) is marked truncated and replays as cut off at
+the same chunk. The file is gzip-compressed JSON lines, one call per line,
+appended as calls finish. A call is matched by provider, kind and request.
+API keys, auth headers and timeouts are left out of the match and of the
+file. Identical requests replay in recorded order, and the last recording
+repeats once they run out. An unrecorded call raises ReplayMiss before it
+takes a rate-limit slot and counts as neither success nor failure, so a
+hedged race that went differently this time moves straight on to the next
+provider.
+"""
+
+import argparse
+import base64
+import functools
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import types
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RECORD, REPLAY, REPLAY_FAST = "record", "replay", "replay-fast"
+MODES = (RECORD, REPLAY, REPLAY_FAST)
+
+# Never written to a cassette, and ignored when matching
+SECRET_FIELDS = {"api_key", "apikey", "client_id", "key", "token", "access_key", "authorization"}
+VOLATILE_FIELDS = {"timeout"}
+
+# Response headers worth keeping (callers read these)
+KEPT_HEADERS = ("Content-Type", "Retry-After")
+
+
+class ReplayMiss(Exception):
+    """The request isn't in the cassette."""
+
+
+class ReplayedError(Exception):
+    """A provider error as it was recorded (status and headers kept for throttle handling)."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, headers: Optional[Dict] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = types.SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+# ============================================================================
+# ENCODING
+# ============================================================================
+
+def _redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _redact(v) for k, v in value.items()
+                if str(k).lower() not in SECRET_FIELDS and k not in VOLATILE_FIELDS}
+    if isinstance(value, (list, tuple)):
+        return [_redact(v) for v in value]
+    return value
+
+
+def _encode(value: Any) -> Any:
+    """
+    JSON-safe form of an SDK result. Objects (OpenAI models, namespaces)
+    become {"__obj__": fields} and replay with attribute access.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): _encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if hasattr(value, "model_dump"):
+        return {"__obj__": _encode(value.model_dump())}
+    if hasattr(value, "__dict__"):
+        return {"__obj__": {k: _encode(v) for k, v in vars(value).items() if not k.startswith("_")}}
+    return str(value)
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if isinstance(value, dict):
+        if set(value) == {"__obj__"}:
+            return types.SimpleNamespace(**{k: _decode(v) for k, v in value["__obj__"].items()})
+        return {k: _decode(v) for k, v in value.items()}
+    return value
+
+
+def _error(e: Exception) -> Dict[str, Any]:
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    return {
+        "type": type(e).__name__,
+        "message": str(e),
+        "status": getattr(e, "status_code", None) or getattr(response, "status_code", None),
+        "headers": {h: headers[h] for h in KEPT_HEADERS if h in headers},
+    }
+
+
+def _raise(error: Dict[str, Any]) -> None:
+    if "Timeout" in error["type"]:
+        raise requests.Timeout(error["message"])
+    if error["type"] == "ConnectionError":
+        raise requests.ConnectionError(error["message"])
+    raise ReplayedError(error["message"], error.get("status"), error.get("headers"))
+
+
+def _body(content: bytes) -> Dict[str, str]:
+    try:
+        return {"text": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(content).decode("ascii")}
+
+
+def _response(entry: Dict[str, Any]) -> requests.Response:
+    res = entry["response"]
+    response = requests.Response()
+    response.status_code = res["status"]
+    response.url = entry["request"]["url"]
+    response.headers.update(res.get("headers", {}))
+    response._content = res["text"].encode("utf-8") if "text" in res else base64.b64decode(res.get("base64", ""))
+    response.encoding = "utf-8"
+    return response
+
+
+# ============================================================================
+# CASSETTE
+# ============================================================================
+
+class Cassette:
+    def __init__(self, path: str, mode: str):
+        if mode not in MODES:
+            raise ValueError(f"cassette mode must be one of {', '.join(MODES)}, not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._recorded: Dict[str, List[Dict[str, Any]]] = {}
+        self._served: Dict[str, int] = {}
+        self.misses = 0
+        if mode != RECORD:
+            for entry in read_entries(path):
+                self._recorded.setdefault(entry["match"], []).append(entry)
+        elif os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    @staticmethod
+    def match_key(provider: str, kind: str, request: Dict[str, Any]) -> str:
+        blob = json.dumps([provider, kind, request], sort_keys=True, default=str)
+        return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:20]
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        line = (json.dumps(entry, default=str, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            # Each append is its own gzip member; readers see one continuous stream
+            with open(self.path, "ab") as f:
+                f.write(gzip.compress(line))
+
+    def require(self, match: str, provider: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = self._recorded.get(match)
+            if not entries:
+                self.misses += 1
+                raise ReplayMiss(f"{provider}: request not in cassette {self.path}")
+            return entries
+
+    def find(self, match: str, provider: str) -> Dict[str, Any]:
+        entries = self.require(match, provider)
+        with self._lock:
+            index = self._served.get(match, 0)
+            self._served[match] = index + 1
+            return entries[min(index, len(entries) - 1)]
+
+    def wait(self, seconds: float) -> None:
+        if self.mode == REPLAY and seconds > 0:
+            time.sleep(seconds)
+
+
+def read_entries(path: str) -> Iterator[Dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _from_env() -> Optional[Cassette]:
+    path = os.getenv("PROVIDER_CASSETTE")
+    if not path:
+        return None
+    mode = os.getenv("PROVIDER_CASSETTE_MODE", REPLAY)
+    if mode != RECORD and not os.path.exists(path):
+        print(f"Cassette {path} not found; provider calls go live")
+        return None
+    print(f"Provider cassette: {mode} {path}")
+    return Cassette(path, mode)
+
+
+_active: Optional[Cassette] = _from_env()
+
+
+def active() -> Optional[Cassette]:
+    return _active
+
+
+@contextmanager
+def use(path: str, mode: str):
+    """
+    Record to / replay from `path` for the duration of the block (process-wide).
+    """
+    global _active
+    previous, _active = _active, Cassette(path, mode)
+    try:
+        yield _active
+    finally:
+        _active = previous
+
+
+# ============================================================================
+# HOOKS (called from providers.py)
+# ============================================================================
+
+def replaying_fast() -> bool:
+    """
+    True while calls are served without their recorded latency; the rate
+    limiters then skip their token buckets, since nothing goes upstream.
+    """
+    return _active is not None and _active.mode == REPLAY_FAST
+
+
+def _call_name(fn: Callable) -> str:
+    return getattr(fn, "__qualname__", None) or type(fn).__name__
+
+
+def _http_request(url: str, params: Optional[Dict], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {"url": url, "params": _redact(params or {}), "headers": _redact(kwargs.get("headers") or {})}
+
+
+def _call_request(fn: Callable, args: tuple, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {"call": _call_name(fn), "args": _redact(list(args)), "kwargs": _redact(kwargs)}
+
+
+def expect_http(provider: str, url: str, params: Optional[Dict] = None, **kwargs) -> None:
+    """
+    When replaying, raise ReplayMiss for an unrecorded request before the
+    caller queues for a provider slot.
+    """
+    tape = _active
+    if tape is not None and tape.mode != RECORD:
+        tape.require(Cassette.match_key(provider, "http", _http_request(url, params, kwargs)), provider)
+
+
+def expect_call(provider: str, fn: Callable, args: tuple, kwargs: Dict[str, Any]) -> None:
+    """
+    expect_http() for a call wrapped by wrap_call() or wrap_stream().
+    """
+    tape = _active
+    kind = getattr(fn, "cassette_kind", None)
+    if tape is not None and tape.mode != RECORD and kind:
+        tape.require(Cassette.match_key(provider, kind, _call_request(fn.__wrapped__, args, kwargs)), provider)
+
+
+def http_get(provider: str, url: str, params: Optional[Dict] = None, timeout: Optional[float] = None,
+             **kwargs) -> requests.Response:
+    """
+    requests.get(), recorded or replayed when a cassette is active.
+    """
+    tape = _active
+    if tape is None:
+        return requests.get(url, params=params, timeout=timeout, **kwargs)
+
+    request = _http_request(url, params, kwargs)
+    match = Cassette.match_key(provider, "http", request)
+    if tape.mode != RECORD:
+        entry = tape.find(match, provider)
+        tape.wait(entry["seconds"])
+        if "error" in entry:
+            _raise(entry["error"])
+        return _response(entry)
+
+    started = time.monotonic()
+    entry = {"provider": provider, "kind": "http", "match": match, "request": request}
+    try:
+        response = requests.get(url, params=params, timeout=timeout, **kwargs)
+    except Exception as e:
+        tape.write({**entry, "seconds": round(time.monotonic() - started, 4), "error": _error(e)})
+        raise
+    headers = {h: response.headers[h] for h in KEPT_HEADERS if h in response.headers}
+    tape.write({**entry, "seconds": round(time.monotonic() - started, 4),
+                "response": {"status": response.status_code, "headers": headers, **_body(response.content)}})
+    return response
+
+
+def wrap_call(provider: str, fn: Callable) -> Callable:
+    """
+    An SDK call, recorded or replayed when a cassette is active.
+    """
+    tape = _active
+    if tape is None:
+        return fn
+
+    @functools.wraps(fn)
+    def call(*args, **kwargs):
+        request = _call_request(fn, args, kwargs)
+        match = Cassette.match_key(provider, "call", request)
+        if tape.mode != RECORD:
+            entry = tape.find(match, provider)
+            tape.wait(entry["seconds"])
+            if "error" in entry:
+                _raise(entry["error"])
+            return _decode(entry["result"])
+
+        started = time.monotonic()
+        entry = {"provider": provider, "kind": "call", "match": match, "request": _encode(request)}
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            tape.write({**entry, "seconds": round(time.monotonic() - started, 4), "error": _error(e)})
+            raise
+        tape.write({**entry, "seconds": round(time.monotonic() - started, 4), "result": _encode(result)})
+        return result
+
+    call.cassette_kind = "call"
+    return call
+
+
+def wrap_stream(provider: str, fn: Callable) -> Callable:
+    """
+    A streaming SDK call, recorded or replayed chunk by chunk with its timing.
+    """
+    tape = _active
+    if tape is None:
+        return fn
+
+    def replay(entry: Dict[str, Any]) -> Iterator[Any]:
+        previous = 0.0
+        for offset, chunk in entry["chunks"]:
+            tape.wait(offset - previous)
+            previous = offset
+            yield _decode(chunk)
+        if "error" in entry:
+            _raise(entry["error"])
+        if entry.get("truncated"):
+            # The recorded caller stopped here (e.g. out of time); the rest was never read
+            from providers import DeadlineExceeded  # providers imports this module
+            raise DeadlineExceeded(f"{provider}: stream was cut short when recorded")
+
+    def record(entry: Dict[str, Any], stream) -> Iterator[Any]:
+        started = time.monotonic()
+        chunks, error, finished = [], None, False
+        try:
+            for chunk in stream:
+                chunks.append([round(time.monotonic() - started, 4), _encode(chunk)])
+                yield chunk
+            finished = True
+        except Exception as e:
+            error = _error(e)
+            raise
+        finally:
+            # A stream the caller stopped early is kept as far as it was read, and marked as such
+            truncated = not finished and error is None
+            tape.write({**entry, "seconds": chunks[0][0] if chunks else round(time.monotonic() - started, 4),
+                        "chunks": chunks, **({"error": error} if error else {}),
+                        **({"truncated": True} if truncated else {})})
+            if hasattr(stream, "close"):
+                stream.close()
+
+    @functools.wraps(fn)
+    def call(*args, **kwargs):
+        request = _call_request(fn, args, kwargs)
+        match = Cassette.match_key(provider, "stream", request)
+        if tape.mode != RECORD:
+            return replay(tape.find(match, provider))
+        return record({"provider": provider, "kind": "stream", "match": match, "request": _encode(request)},
+                      fn(*args, **kwargs))
+
+    call.cassette_kind = "stream"
+    return call
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise a provider cassette.")
+    parser.add_argument("path")
+    args = parser.parse_args()
+    if not os.path.exists(args.path):
+        sys.exit(f"No cassette at {args.path}")
+
+    summary: Dict[str, Dict[str, Any]] = {}
+    for entry in read_entries(args.path):
+        row = summary.setdefault(entry["provider"], {"calls": 0, "errors": 0, "seconds": []})
+        row["calls"] += 1
+        row["errors"] += "error" in entry
+        row["seconds"].append(entry["seconds"])
+
+    print(f"{'provider':22}{'calls':>7}{'errors':>8}{'p50 s':>9}{'max s':>9}")
+    for provider, row in sorted(summary.items()):
+        seconds = sorted(row["seconds"])
+        print(f"{provider:22}{row['calls']:>7}{row['errors']:>8}{seconds[len(seconds) // 2]:>9.3f}{seconds[-1]:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Climate Normals
+Typical weather for any day of the year, used for trip days beyond the
+real forecast window. Each grid cell's history is fetched once from the
+Open-Meteo archive, reduced to per-day-of-year arrays and stored as a small
+memory-mapped file, so later lookups take microseconds and need no network.
+
+    python climate.py 48.85 2.35 2026-12-24 --days 5
+
+On-disk layout: one structured .npy per grid cell (366 rows, Feb 29 included),
+opened with mmap_mode="r":
+    tmax, tmin     float32  mean daily max/min temperature (°C)
+    precip_prob    float32  share of days with at least PRECIP_DAY_MM of precipitation
+    code           uint8    most frequent WMO weather code
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from providers import coalesce, limited_get, time_left
+
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+
+DEFAULT_CLIMATE_PATH = os.getenv(
+    "CLIMATE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "climate")
+)
+
+GRID_DEG = float(os.getenv("CLIMATE_GRID_DEG", "0.5"))   # ~55 km cells share one history
+NORMALS_YEARS = int(os.getenv("CLIMATE_YEARS", "10"))
+WINDOW_DAYS = 3        # pool +/- this many days around each day of year (10 years -> 70 samples)
+PRECIP_DAY_MM = 1.0    # a "wet day" in the usual climatological sense
+
+NORMALS_DTYPE = np.dtype([("tmax", "f4"), ("tmin", "f4"), ("precip_prob", "f4"), ("code", "u1")])
+
+
+def day_of_year(day: date) -> int:
+    """
+    Row for a date on a 366-day calendar, so Feb 29 has its own row and
+    March 1 is the same row in leap and common years.
+    """
+    return (date(2000, day.month, day.day) - date(2000, 1, 1)).days
+
+
+def grid_cell(latitude: float, longitude: float) -> tuple:
+    return (round(round(latitude / GRID_DEG) * GRID_DEG, 4), round(round(longitude / GRID_DEG) * GRID_DEG, 4))
+
+
+def normals_path(latitude: float, longitude: float, path: str = DEFAULT_CLIMATE_PATH) -> str:
+    lat, lon = grid_cell(latitude, longitude)
+    return os.path.join(path, f"{lat:+09.4f}_{lon:+010.4f}.npy")
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def _window_sum(per_day: np.ndarray) -> np.ndarray:
+    """
+    Circular sum over +/- WINDOW_DAYS along the first axis (Dec 31 neighbours Jan 1).
+    """
+    total = per_day.copy()
+    for shift in range(1, WINDOW_DAYS + 1):
+        total += np.roll(per_day, shift, axis=0) + np.roll(per_day, -shift, axis=0)
+    return total
+
+
+def build_normals(daily: Dict[str, List[Any]]) -> np.ndarray:
+    """
+    Reduce Open-Meteo archive `daily` data to one NORMALS_DTYPE row per day of year.
+    """
+    days = np.fromiter((day_of_year(date.fromisoformat(t)) for t in daily["time"]), dtype=np.int64)
+
+    def column(name: str) -> np.ndarray:
+        return np.array([np.nan if v is None else v for v in daily[name]], dtype=np.float64)
+
+    tmax, tmin = column("temperature_2m_max"), column("temperature_2m_min")
+    precip, codes = column("precipitation_sum"), column("weather_code")
+
+    def mean(values: np.ndarray) -> np.ndarray:
+        ok = ~np.isnan(values)
+        sums = _window_sum(np.bincount(days[ok], weights=values[ok], minlength=366))
+        counts = _window_sum(np.bincount(days[ok], minlength=366).astype(np.float64))
+        return np.divide(sums, counts, out=np.full(366, np.nan), where=counts > 0)
+
+    normals = np.zeros(366, dtype=NORMALS_DTYPE)
+    normals["tmax"] = mean(tmax)
+    normals["tmin"] = mean(tmin)
+    wet = np.where(np.isnan(precip), np.nan, (precip >= PRECIP_DAY_MM).astype(np.float64))
+    normals["precip_prob"] = mean(wet)
+
+    # Most frequent weather code per day of year (WMO codes are 0-99)
+    ok = ~np.isnan(codes)
+    counts = np.zeros((366, 100))
+    np.add.at(counts, (days[ok], codes[ok].astype(np.int64).clip(0, 99)), 1)
+    normals["code"] = _window_sum(counts).argmax(axis=1)
+    return normals
+
+
+@coalesce
+def fetch_normals(latitude: float, longitude: float, path: str = DEFAULT_CLIMATE_PATH) -> Optional[str]:
+    """
+    Download NORMALS_YEARS of daily history for the grid cell and store its normals.
+    Returns the file path, or None if the archive couldn't be read.
+    """
+    lat, lon = grid_cell(latitude, longitude)
+    last_year = date.today().year - 1
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "start_date": f"{last_year - NORMALS_YEARS + 1}-01-01",
+        "end_date": f"{last_year}-12-31",
+        "daily": "weather_code,temperature_2m_max,temperature_2m_min,precipitation_sum",
+        "timezone": "auto",
+    }
+    response = limited_get("open_meteo_archive", ARCHIVE_URL, params=params, timeout=time_left(20))
+    response.raise_for_status()
+    daily = response.json().get("daily")
+    if not daily or not daily.get("time"):
+        return None
+
+    normals = build_normals(daily)
+    target = normals_path(latitude, longitude, path)
+    os.makedirs(path, exist_ok=True)
+    # Write then rename, so a concurrent reader never maps a half-written file
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, normals)
+    os.replace(tmp, target)
+    return target
+
+
+# ============================================================================
+# QUERY
+# ============================================================================
+
+_normals: Dict[str, np.ndarray] = {}
+_normals_lock = threading.Lock()
+
+
+def load_normals(latitude: float, longitude: float, fetch: bool = True,
+                 path: str = DEFAULT_CLIMATE_PATH) -> Optional[np.ndarray]:
+    """
+    The grid cell's normals (memory-mapped, opened once per process).
+    Fetches and builds them first if missing and `fetch` is set.
+    """
+    target = normals_path(latitude, longitude, path)
+    with _normals_lock:
+        if target in _normals:
+            return _normals[target]
+
+    if not os.path.exists(target):
+        if not fetch or fetch_normals(latitude, longitude, path) is None:
+            return None
+
+    normals = np.load(target, mmap_mode="r").view(np.ndarray)
+    with _normals_lock:
+        _normals[target] = normals
+    return normals
+
+
+def typical_day(normals: np.ndarray, day: date) -> Optional[Dict[str, Any]]:
+    row = normals[day_of_year(day)]
+    if np.isnan(row["tmax"]) or np.isnan(row["precip_prob"]):
+        return None  # no history for this part of the year
+    return {
+        "date": day.isoformat(),
+        "source": "normals",
+        "weather_code": int(row["code"]),
+        "temperature_2m_max": round(float(row["tmax"]), 1),
+        "temperature_2m_min": round(float(row["tmin"]), 1),
+        "precipitation_probability": int(round(float(row["precip_prob"]) * 100)),
+    }
+
+
+def trip_days(forecast: Optional[Dict[str, Any]], normals: Optional[np.ndarray],
+              start_date: date, num_days: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    One weather record per trip day: the real forecast where it covers the
+    date, climate normals beyond it, None when neither is available.
+    """
+    daily = (forecast or {}).get("daily") or {}
+    by_date = {t: i for i, t in enumerate(daily.get("time", []))}
+
+    days = []
+    for offset in range(num_days):
+        day = start_date + timedelta(days=offset)
+        i = by_date.get(day.isoformat())
+        if i is not None:
+            days.append({
+                "date": day.isoformat(),
+                "source": "forecast",
+                "weather_code": daily["weather_code"][i],
+                "temperature_2m_max": daily["temperature_2m_max"][i],
+                "temperature_2m_min": daily["temperature_2m_min"][i],
+                "precipitation_sum": daily["precipitation_sum"][i],
+            })
+        elif normals is not None:
+            days.append(typical_day(normals, day))
+        else:
+            days.append(None)
+    return days
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Typical weather for a place and date from climate normals.")
+    parser.add_argument("latitude", type=float)
+    parser.add_argument("longitude", type=float)
+    parser.add_argument("date", help="First day, YYYY-MM-DD")
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--path", default=DEFAULT_CLIMATE_PATH)
+    args = parser.parse_args()
+
+    start = time.time()
+    normals = load_normals(args.latitude, args.longitude, path=args.path)
+    if normals is None:
+        sys.exit("Couldn't fetch climate history for this location.")
+    print(f"(normals ready in {time.time() - start:.2f}s: {normals_path(args.latitude, args.longitude, args.path)})")
+
+    start = time.perf_counter()
+    days = trip_days(None, normals, date.fromisoformat(args.date), args.days)
+    elapsed_us = (time.perf_counter() - start) * 1e6
+    for day in filter(None, days):
+        print(f"{day['date']}  {day['temperature_2m_min']:5.1f} – {day['temperature_2m_max']:5.1f} °C  "
+              f"rain {day['precipitation_probability']:3d}%  code {day['weather_code']}")
+    print(f"({len(days)} days in {elapsed_us:.0f} µs)")
+
+
+if __name__ == "__main__":
+    main()
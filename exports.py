@@ -0,0 +1,557 @@
+"""
+Fast Exports
+HTML, Markdown, iCalendar (.ics) and JSON versions of an itinerary, built
+straight from the itinerary data: no image downloads and no ReportLab, so
+every format is ready in a few milliseconds, even for long multi-city trips.
+
+All four formats are rendered from one normalized document (itinerary_document),
+which is also what the JSON export contains. JSON schema, version 1
+(the full JSON Schema is in ITINERARY_JSON_SCHEMA):
+
+    {
+      "schema": "iteration-planner/itinerary",
+      "version": 1,
+      "generated_at": "2026-10-19T09:30:00+00:00",
+      "trip": {"from": str, "to": str, "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD",
+               "num_days": int, "num_people": int, "budget": number, "currency": "INR"},
+      "legs": [{                                   # one per city, in travel order
+        "destination": {"name": str, "country": str|null, "latitude": number|null,
+                        "longitude": number|null, "timezone": str|null},
+        "start_date": "YYYY-MM-DD", "num_days": int,
+        "days": [{
+          "day": int,                              # counts across legs
+          "date": "YYYY-MM-DD",
+          "title": str,
+          "weather": {"summary": str, "source": "forecast"|"normals"|null,
+                      "temperature_max": number|null, "temperature_min": number|null,
+                      "precipitation_probability": int|null},
+          "slots": [{"slot": "morning"|"afternoon"|"evening",
+                     "start": "HH:MM", "end": "HH:MM", "activities": [str]}],
+          "tip": str|null
+        }],
+        "hotels": [{"name": str, "price_per_night": number, "rating": number,
+                    "reviews": int, "address": str, "link": str}],
+        "attractions": [{"name": str, "type": str, "summary": str, "latitude": number|null, "longitude": number|null}],
+        "activities": [...same as attractions...],
+        "packing_tips": str,
+        "news": [{"title": str, "url": str, "source": str, "published_at": str}]
+      }]
+    }
+"""
+
+import hashlib
+import html
+import json
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9: calendar events stay in floating local time
+    ZoneInfo = None
+
+SCHEMA_NAME = "iteration-planner/itinerary"
+SCHEMA_VERSION = 1
+CURRENCY = "INR"   # get_hotels() asks SerpAPI for INR prices
+
+ITINERARY_JSON_SCHEMA: Dict[str, Any] = {
+    "$schema": "https://json-schema.org/draft/2020-12/schema",
+    "title": "Iteration Planner itinerary",
+    "type": "object",
+    "required": ["schema", "version", "generated_at", "trip", "legs"],
+    "properties": {
+        "schema": {"const": SCHEMA_NAME},
+        "version": {"const": SCHEMA_VERSION},
+        "generated_at": {"type": "string", "format": "date-time"},
+        "trip": {
+            "type": "object",
+            "required": ["from", "to", "start_date", "end_date", "num_days", "num_people", "budget", "currency"],
+            "properties": {
+                "from": {"type": "string"},
+                "to": {"type": "string"},
+                "start_date": {"type": "string", "format": "date"},
+                "end_date": {"type": "string", "format": "date"},
+                "num_days": {"type": "integer"},
+                "num_people": {"type": "integer"},
+                "budget": {"type": "number"},
+                "currency": {"type": "string"},
+            },
+        },
+        "legs": {"type": "array", "items": {"$ref": "#/$defs/leg"}},
+    },
+    "$defs": {
+        "place": {
+            "type": "object",
+            "required": ["name", "type", "summary"],
+            "properties": {
+                "name": {"type": "string"},
+                "type": {"type": "string"},
+                "summary": {"type": "string"},
+                "latitude": {"type": ["number", "null"]},
+                "longitude": {"type": ["number", "null"]},
+            },
+        },
+        "day": {
+            "type": "object",
+            "required": ["day", "date", "title", "weather", "slots", "tip"],
+            "properties": {
+                "day": {"type": "integer"},
+                "date": {"type": "string", "format": "date"},
+                "title": {"type": "string"},
+                "weather": {
+                    "type": "object",
+                    "required": ["summary", "source"],
+                    "properties": {
+                        "summary": {"type": "string"},
+                        "source": {"enum": ["forecast", "normals", None]},
+                        "temperature_max": {"type": ["number", "null"]},
+                        "temperature_min": {"type": ["number", "null"]},
+                        "precipitation_probability": {"type": ["integer", "null"]},
+                    },
+                },
+                "slots": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "required": ["slot", "start", "end", "activities"],
+                        "properties": {
+                            "slot": {"enum": ["morning", "afternoon", "evening"]},
+                            "start": {"type": "string", "pattern": "^\\d{2}:\\d{2}$"},
+                            "end": {"type": "string", "pattern": "^\\d{2}:\\d{2}$"},
+                            "activities": {"type": "array", "items": {"type": "string"}},
+                        },
+                    },
+                },
+                "tip": {"type": ["string", "null"]},
+            },
+        },
+        "leg": {
+            "type": "object",
+            "required": ["destination", "start_date", "num_days", "days", "hotels",
+                         "attractions", "activities", "packing_tips", "news"],
+            "properties": {
+                "destination": {
+                    "type": "object",
+                    "required": ["name"],
+                    "properties": {
+                        "name": {"type": "string"},
+                        "country": {"type": ["string", "null"]},
+                        "latitude": {"type": ["number", "null"]},
+                        "longitude": {"type": ["number", "null"]},
+                        "timezone": {"type": ["string", "null"]},
+                    },
+                },
+                "start_date": {"type": "string", "format": "date"},
+                "num_days": {"type": "integer"},
+                "days": {"type": "array", "items": {"$ref": "#/$defs/day"}},
+                "hotels": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "required": ["name", "price_per_night", "rating"],
+                        "properties": {
+                            "name": {"type": "string"},
+                            "price_per_night": {"type": "number"},
+                            "rating": {"type": "number"},
+                            "reviews": {"type": "integer"},
+                            "address": {"type": "string"},
+                            "link": {"type": "string"},
+                        },
+                    },
+                },
+                "attractions": {"type": "array", "items": {"$ref": "#/$defs/place"}},
+                "activities": {"type": "array", "items": {"$ref": "#/$defs/place"}},
+                "packing_tips": {"type": "string"},
+                "news": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "required": ["title", "url"],
+                        "properties": {
+                            "title": {"type": "string"},
+                            "url": {"type": "string"},
+                            "source": {"type": "string"},
+                            "published_at": {"type": "string"},
+                        },
+                    },
+                },
+            },
+        },
+    },
+}
+
+
+# ============================================================================
+# NORMALIZED DOCUMENT
+# ============================================================================
+
+# Day plan text comes from app.format_day_plan / app.generate_day_plan:
+#   ### Day 3 - Title 🌟
+#   **Morning (9:00 AM - 12:00 PM)**
+#   - bullet
+#   **Weather:** ...
+#   **Tips:** ...
+_TITLE = re.compile(r"^#+\s*Day\s+\d+\s*-\s*(.*?)\s*🌟?\s*$")
+_SLOT = re.compile(r"^\*\*(Morning|Afternoon|Evening)\s*\(([\d:]+\s*[AP]M)\s*-\s*([\d:]+\s*[AP]M)\)\*\*$", re.I)
+_FIELD = re.compile(r"^\*\*(Weather|Tips):\*\*\s*(.*)$")
+
+
+def _clock(text: str) -> str:
+    return datetime.strptime(text.replace(" ", "").upper(), "%I:%M%p").strftime("%H:%M")
+
+
+def parse_day_plan(text: str) -> Dict[str, Any]:
+    """
+    Title, time slots (with their bullets), weather line and tip of one day plan.
+    """
+    plan: Dict[str, Any] = {"title": "", "slots": [], "weather": "", "tip": None}
+    slot = None
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = _TITLE.match(line)
+        if match:
+            plan["title"] = match.group(1)
+            continue
+        match = _SLOT.match(line)
+        if match:
+            slot = {"slot": match.group(1).lower(), "start": _clock(match.group(2)),
+                    "end": _clock(match.group(3)), "activities": []}
+            plan["slots"].append(slot)
+            continue
+        match = _FIELD.match(line)
+        if match:
+            slot = None
+            if match.group(1) == "Weather":
+                plan["weather"] = match.group(2)
+            else:
+                plan["tip"] = match.group(2) or None
+            continue
+        if slot is not None and line.startswith("- "):
+            slot["activities"].append(line[2:].strip())
+    return plan
+
+
+def _place(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": item.get("name") or "",
+        "type": item.get("type") or "",
+        "summary": item.get("summary") or "",
+        "latitude": item.get("lat") or None,
+        "longitude": item.get("lon") or None,
+    }
+
+
+def _leg_document(leg: Dict[str, Any]) -> Dict[str, Any]:
+    destination = leg.get("destination") or {}
+    trip_weather = leg.get("trip_weather") or []
+
+    days = []
+    for i, entry in enumerate(leg.get("daily_plans_list", [])):
+        plan = parse_day_plan(entry.get("text", ""))
+        weather = trip_weather[i] if i < len(trip_weather) else None
+        days.append({
+            "day": entry["day"],
+            "date": entry.get("date"),
+            "title": plan["title"],
+            "weather": {
+                "summary": plan["weather"],
+                "source": (weather or {}).get("source"),
+                "temperature_max": (weather or {}).get("temperature_2m_max"),
+                "temperature_min": (weather or {}).get("temperature_2m_min"),
+                "precipitation_probability": (weather or {}).get("precipitation_probability"),
+            },
+            "slots": plan["slots"],
+            "tip": plan["tip"],
+        })
+
+    return {
+        "destination": {
+            "name": leg.get("to_place") or destination.get("name", ""),
+            "country": destination.get("country"),
+            "latitude": destination.get("latitude"),
+            "longitude": destination.get("longitude"),
+            "timezone": destination.get("timezone"),
+        },
+        "start_date": leg.get("start_date"),
+        "num_days": leg.get("num_days"),
+        "days": days,
+        "hotels": [{
+            "name": hotel.get("name", ""),
+            "price_per_night": hotel.get("price", 0),
+            "rating": hotel.get("rating", 0),
+            "reviews": hotel.get("reviews", 0),
+            "address": hotel.get("address", ""),
+            "link": hotel.get("link", ""),
+        } for hotel in leg.get("hotels", [])],
+        "attractions": [_place(a) for a in leg.get("attractions", [])],
+        "activities": [_place(a) for a in leg.get("activities", [])],
+        "packing_tips": leg.get("clothing_tips") or "",
+        "news": [{
+            "title": article.get("title") or "",
+            "url": article.get("url") or "",
+            "source": (article.get("source") or {}).get("name") or "",
+            "published_at": article.get("publishedAt") or "",
+        } for article in leg.get("news") or []],
+    }
+
+
+def itinerary_document(itinerary_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The itinerary (single city or multi-city) in the documented export schema.
+    """
+    legs = itinerary_data.get("legs") or [itinerary_data]
+    start = date.fromisoformat(itinerary_data["start_date"])
+    return {
+        "schema": SCHEMA_NAME,
+        "version": SCHEMA_VERSION,
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "trip": {
+            "from": itinerary_data.get("from_place", ""),
+            "to": itinerary_data.get("to_place", ""),
+            "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=itinerary_data["num_days"] - 1)).isoformat(),
+            "num_days": itinerary_data["num_days"],
+            "num_people": itinerary_data.get("num_people"),
+            "budget": itinerary_data.get("budget"),
+            "currency": CURRENCY,
+        },
+        "legs": [_leg_document(leg) for leg in legs],
+    }
+
+
+# ============================================================================
+# FORMATS
+# ============================================================================
+
+def to_json(itinerary_data: Dict[str, Any]) -> str:
+    return json.dumps(itinerary_document(itinerary_data), ensure_ascii=False, indent=2)
+
+
+def to_markdown(itinerary_data: Dict[str, Any]) -> str:
+    doc = itinerary_document(itinerary_data)
+    trip = doc["trip"]
+    lines = [
+        f"# 🌍 {trip['from']} → {trip['to']}",
+        "",
+        f"- **Dates:** {trip['start_date']} to {trip['end_date']} ({trip['num_days']} days)",
+        f"- **Travelers:** {trip['num_people']}",
+        f"- **Budget:** ₹{trip['budget']}",
+    ]
+    multi_city = len(doc["legs"]) > 1
+    for number, leg in enumerate(doc["legs"], 1):
+        heading = "##" if multi_city else "#"
+        if multi_city:
+            lines += ["", f"## 🧭 Leg {number}: {leg['destination']['name']} ({leg['num_days']} days from {leg['start_date']})"]
+
+        lines += ["", f"{heading}# 🏨 Hotels", ""]
+        lines += [f"- [{h['name']}]({h['link']}) - ₹{h['price_per_night']}/night, rated {h['rating']}/5"
+                  if h["link"] else f"- {h['name']} - ₹{h['price_per_night']}/night, rated {h['rating']}/5"
+                  for h in leg["hotels"]] or ["- No hotels found"]
+
+        lines += ["", f"{heading}# 📅 Daily Plans"]
+        for day in leg["days"]:
+            lines += ["", f"{heading}## Day {day['day']} ({day['date']}) - {day['title']}", ""]
+            for slot in day["slots"]:
+                lines.append(f"**{slot['slot'].title()} ({slot['start']}-{slot['end']})**")
+                lines += [f"- {activity}" for activity in slot["activities"]]
+                lines.append("")
+            lines.append(f"*Weather:* {day['weather']['summary']}  ")
+            if day["tip"]:
+                lines.append(f"*Tip:* {day['tip']}")
+
+        lines += ["", f"{heading}# 🏛️ Attractions", ""]
+        lines += [f"{i}. **{a['name']}** ({a['type']}) - {a['summary']}" for i, a in enumerate(leg["attractions"], 1)]
+        if leg["activities"]:
+            lines += ["", f"{heading}# 🎯 Activities", ""]
+            lines += [f"- **{a['name']}** - {a['summary']}" for a in leg["activities"]]
+        if leg["packing_tips"]:
+            lines += ["", f"{heading}# 🎒 What to Pack", "", leg["packing_tips"].strip()]
+        if leg["news"]:
+            lines += ["", f"{heading}# 📰 Latest News", ""]
+            lines += [f"- [{n['title']}]({n['url']}) - {n['source']}, {n['published_at'][:10]}" for n in leg["news"]]
+
+    lines += ["", "---", "Generated with ❤️ by Iteration Planner Agent", ""]
+    return "\n".join(lines)
+
+
+_HTML_STYLE = """
+body{font-family:-apple-system,Segoe UI,Roboto,Helvetica,Arial,sans-serif;max-width:860px;margin:2em auto;padding:0 1em;color:#222;line-height:1.5}
+h1{color:#1f4e79}h2{color:#1f4e79;border-bottom:2px solid #dde6f0;padding-bottom:.2em}
+table{border-collapse:collapse;width:100%;margin:.5em 0}th,td{border:1px solid #dde6f0;padding:.4em .6em;text-align:left}
+th{background:#f2f6fa}.day{border:1px solid #dde6f0;border-radius:8px;padding:.6em 1em;margin:1em 0}
+.day h3{margin:.2em 0}.slot{margin:.4em 0}.muted{color:#666;font-size:.9em}
+@media print{.day{break-inside:avoid}}
+"""
+
+
+def to_html(itinerary_data: Dict[str, Any]) -> str:
+    """
+    Self-contained page: inline CSS, no scripts, no external images.
+    """
+    doc = itinerary_document(itinerary_data)
+    trip = doc["trip"]
+    e = html.escape
+    parts = [
+        "<!DOCTYPE html>",
+        '<html lang="en"><head><meta charset="utf-8">',
+        '<meta name="viewport" content="width=device-width, initial-scale=1">',
+        f"<title>Itinerary: {e(trip['to'])}</title>",
+        f"<style>{_HTML_STYLE}</style></head><body>",
+        f"<h1>🌍 {e(trip['from'])} → {e(trip['to'])}</h1>",
+        "<table>",
+        f"<tr><th>Dates</th><td>{e(trip['start_date'])} to {e(trip['end_date'])} ({trip['num_days']} days)</td></tr>",
+        f"<tr><th>Travelers</th><td>{e(str(trip['num_people']))}</td></tr>",
+        f"<tr><th>Budget</th><td>₹{e(str(trip['budget']))}</td></tr>",
+        "</table>",
+    ]
+
+    multi_city = len(doc["legs"]) > 1
+    for number, leg in enumerate(doc["legs"], 1):
+        if multi_city:
+            parts.append(f"<h1>🧭 Leg {number}: {e(leg['destination']['name'])}</h1>"
+                         f"<p class=\"muted\">{leg['num_days']} days from {e(leg['start_date'])}</p>")
+
+        parts.append("<h2>🏨 Hotels</h2>")
+        if leg["hotels"]:
+            parts.append("<table><tr><th>Hotel</th><th>Price / night</th><th>Rating</th></tr>")
+            for hotel in leg["hotels"]:
+                name = e(hotel["name"])
+                if hotel["link"]:
+                    name = f'<a href="{e(hotel["link"])}">{name}</a>'
+                parts.append(f"<tr><td>{name}</td><td>₹{e(str(hotel['price_per_night']))}</td>"
+                             f"<td>{e(str(hotel['rating']))}/5</td></tr>")
+            parts.append("</table>")
+        else:
+            parts.append("<p class=\"muted\">No hotels found.</p>")
+
+        parts.append("<h2>📅 Daily Plans</h2>")
+        for day in leg["days"]:
+            parts.append(f'<div class="day"><h3>Day {day["day"]} · {e(day["date"] or "")} · {e(day["title"])}</h3>')
+            for slot in day["slots"]:
+                activities = "".join(f"<li>{e(a)}</li>" for a in slot["activities"])
+                parts.append(f'<div class="slot"><strong>{slot["slot"].title()} ({slot["start"]}–{slot["end"]})</strong>'
+                             f"<ul>{activities}</ul></div>")
+            parts.append(f'<p class="muted">Weather: {e(day["weather"]["summary"])}</p>')
+            if day["tip"]:
+                parts.append(f"<p>💡 {e(day['tip'])}</p>")
+            parts.append("</div>")
+
+        parts.append("<h2>🏛️ Attractions</h2><ol>")
+        parts += [f"<li><strong>{e(a['name'])}</strong> ({e(a['type'])}) – {e(a['summary'])}</li>" for a in leg["attractions"]]
+        parts.append("</ol>")
+        if leg["activities"]:
+            parts.append("<h2>🎯 Activities</h2><ul>")
+            parts += [f"<li><strong>{e(a['name'])}</strong> – {e(a['summary'])}</li>" for a in leg["activities"]]
+            parts.append("</ul>")
+        if leg["packing_tips"]:
+            tips = "<br>".join(e(line) for line in leg["packing_tips"].strip().splitlines())
+            parts.append(f"<h2>🎒 What to Pack</h2><p>{tips}</p>")
+        if leg["news"]:
+            parts.append("<h2>📰 Latest News</h2><ul>")
+            parts += [f'<li><a href="{e(n["url"])}">{e(n["title"])}</a> '
+                      f'<span class="muted">{e(n["source"])}, {e(n["published_at"][:10])}</span></li>'
+                      for n in leg["news"]]
+            parts.append("</ul>")
+
+    parts.append('<p class="muted">Generated with ❤️ by Iteration Planner Agent</p></body></html>')
+    return "\n".join(parts)
+
+
+# ============================================================================
+# ICALENDAR
+# ============================================================================
+
+def _ics_escape(text: str) -> str:
+    return (text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _ics_fold(line: str) -> str:
+    """
+    Fold a content line at 75 octets (RFC 5545 §3.1) without splitting UTF-8 characters.
+    """
+    folded, current, size = [], "", 0
+    for char in line:
+        width = len(char.encode("utf-8"))
+        if size + width > 75:
+            folded.append(current)
+            current, size = " ", 1
+        current += char
+        size += width
+    folded.append(current)
+    return "\r\n".join(folded)
+
+
+def _zone(name: Optional[str]):
+    if not name or ZoneInfo is None:
+        return None
+    try:
+        return ZoneInfo(name)
+    except Exception:
+        return None
+
+
+def _ics_time(day: str, clock: str, zone) -> str:
+    local = datetime.strptime(f"{day} {clock}", "%Y-%m-%d %H:%M")
+    if zone is None:
+        return local.strftime("%Y%m%dT%H%M%S")  # floating: local time wherever the calendar is
+    return local.replace(tzinfo=zone).astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def to_ics(itinerary_data: Dict[str, Any]) -> str:
+    """
+    iCalendar file with one event per day-plan slot, in the destination's time zone.
+    """
+    doc = itinerary_document(itinerary_data)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    trip_id = hashlib.sha1(json.dumps(doc["trip"], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Iteration Planner Agent//Itinerary//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_ics_escape('Trip to ' + doc['trip']['to'])}",
+    ]
+    for leg in doc["legs"]:
+        place = leg["destination"]
+        zone = _zone(place["timezone"])
+        location = ", ".join(filter(None, [place["name"], place["country"]]))
+        for day in leg["days"]:
+            if not day["date"]:
+                continue
+            for slot in day["slots"]:
+                summary = f"Day {day['day']} {slot['slot']}: {day['title'] or place['name']}"
+                description = "\n".join(
+                    [f"- {a}" for a in slot["activities"]]
+                    + [f"Weather: {day['weather']['summary']}"]
+                    + ([f"Tip: {day['tip']}"] if day["tip"] else [])
+                )
+                lines += [
+                    "BEGIN:VEVENT",
+                    f"UID:{trip_id}-{day['day']}-{slot['slot']}@iteration-planner",
+                    f"DTSTAMP:{stamp}",
+                    f"DTSTART:{_ics_time(day['date'], slot['start'], zone)}",
+                    f"DTEND:{_ics_time(day['date'], slot['end'], zone)}",
+                    f"SUMMARY:{_ics_escape(summary)}",
+                    f"DESCRIPTION:{_ics_escape(description)}",
+                    f"LOCATION:{_ics_escape(location)}",
+                ]
+                if place["latitude"] is not None and place["longitude"] is not None:
+                    lines.append(f"GEO:{place['latitude']:.6f};{place['longitude']:.6f}")
+                lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_ics_fold(line) for line in lines) + "\r\n"
+
+
+# file extension -> (renderer, MIME type, button label)
+FORMATS = {
+    "html": (to_html, "text/html", "🌐 HTML"),
+    "md": (to_markdown, "text/markdown", "📝 Markdown"),
+    "ics": (to_ics, "text/calendar", "📅 Calendar (.ics)"),
+    "json": (to_json, "application/json", "🧾 JSON"),
+}
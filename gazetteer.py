@@ -0,0 +1,302 @@
+"""
+Offline Gazetteer
+Prefix search over a GeoNames cities dump for instant, offline destination autocomplete.
+Returns the same record shape as geocode_location() in app.py. GeoNames ids are
+the ids Open-Meteo returns, so cached data is shared between both sources.
+
+Build once (files from https://download.geonames.org/export/dump/):
+    python gazetteer.py build cities15000.txt --countries countryInfo.txt --admin1 admin1CodesASCII.txt
+    python gazetteer.py query "par"
+
+On-disk layout (all .npy, opened with mmap_mode="r"):
+    keys.npy / key_off.npy    sorted, accent-folded lowercase UTF-8 search keys
+    key_rec.npy    uint32     record each key points to
+    geonameid.npy  uint32     per record
+    coords.npy     float32    (N, 2) lat/lon
+    population.npy uint32
+    country.npy / admin1.npy / timezone.npy  uint16/uint32 indexes into meta.json tables
+    names.npy / name_off.npy  display names string table
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_GAZETTEER_PATH = os.getenv(
+    "GAZETTEER_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "gazetteer")
+)
+
+
+def fold(text: str) -> str:
+    """
+    Lowercase and strip accents so "São Paulo" matches "sao p".
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+
+def names_match(query: str, place: Dict[str, Any]) -> bool:
+    """
+    Whether `place` is named what `query` asks for (not just a name it starts),
+    ignoring case, accents and a ", country" qualifier.
+    """
+    return fold(place.get("name") or "") == fold(query.partition(",")[0])
+
+
+def _string_table(strings: List[str]):
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    np.cumsum(np.fromiter((len(b) for b in encoded), dtype=np.uint32, count=len(encoded)), out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _read_table(path: Optional[str], key_col: int, value_col: int) -> Dict[str, str]:
+    table: Dict[str, str] = {}
+    if not path:
+        return table
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) > max(key_col, value_col):
+                table[cols[key_col]] = cols[value_col]
+    return table
+
+
+# ============================================================================
+# IMPORT
+# ============================================================================
+
+def build_gazetteer(source: str, out_dir: str, countries_path: Optional[str] = None,
+                    admin1_path: Optional[str] = None, alternates: bool = False) -> Dict[str, Any]:
+    """
+    Build the gazetteer from a GeoNames cities*.txt dump.
+    countryInfo.txt and admin1CodesASCII.txt turn codes into display names.
+    """
+    country_names = _read_table(countries_path, 0, 4)   # ISO -> Country
+    admin1_names = _read_table(admin1_path, 0, 1)       # "FR.11" -> "Île-de-France"
+
+    ids, lats, lons, pops, names = [], [], [], [], []
+    countries, admin1s, timezones = [], [], []
+    keys = []  # (folded key, record index)
+
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) < 18 or not cols[1]:
+                continue
+            try:
+                lat, lon = float(cols[4]), float(cols[5])
+                population = int(cols[14] or 0)
+            except ValueError:
+                continue
+
+            record = len(ids)
+            ids.append(int(cols[0]))
+            lats.append(lat)
+            lons.append(lon)
+            pops.append(min(population, 2 ** 32 - 1))
+            names.append(cols[1])
+            countries.append(country_names.get(cols[8], cols[8]))
+            admin1s.append(admin1_names.get(f"{cols[8]}.{cols[10]}", ""))
+            timezones.append(cols[17] or "UTC")
+
+            variants = {fold(cols[1]), fold(cols[2])}
+            if alternates and cols[3]:
+                variants.update(fold(alt) for alt in cols[3].split(",") if alt)
+            keys.extend((variant, record) for variant in variants if variant)
+
+    keys.sort()
+    country_table = sorted(set(countries))
+    admin1_table = sorted(set(admin1s))
+    timezone_table = sorted(set(timezones))
+    country_ids = {c: i for i, c in enumerate(country_table)}
+    admin1_ids = {a: i for i, a in enumerate(admin1_table)}
+    timezone_ids = {t: i for i, t in enumerate(timezone_table)}
+
+    os.makedirs(out_dir, exist_ok=True)
+    save = lambda name, arr: np.save(os.path.join(out_dir, name), arr)
+
+    key_bytes, key_off = _string_table([k for k, _ in keys])
+    save("keys.npy", key_bytes)
+    save("key_off.npy", key_off)
+    save("key_rec.npy", np.asarray([r for _, r in keys], dtype=np.uint32))
+
+    save("geonameid.npy", np.asarray(ids, dtype=np.uint32))
+    save("coords.npy", np.stack([np.asarray(lats), np.asarray(lons)], axis=1).astype(np.float32)
+         if ids else np.zeros((0, 2), np.float32))
+    save("population.npy", np.asarray(pops, dtype=np.uint32))
+    save("country.npy", np.asarray([country_ids[c] for c in countries], dtype=np.uint16))
+    save("admin1.npy", np.asarray([admin1_ids[a] for a in admin1s], dtype=np.uint32))
+    save("timezone.npy", np.asarray([timezone_ids[t] for t in timezones], dtype=np.uint16))
+    name_bytes, name_off = _string_table(names)
+    save("names.npy", name_bytes)
+    save("name_off.npy", name_off)
+
+    meta = {
+        "count": len(ids),
+        "keys": len(keys),
+        "countries": country_table,
+        "admin1": admin1_table,
+        "timezones": timezone_table,
+        "source": os.path.basename(source),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return meta
+
+
+# ============================================================================
+# QUERY
+# ============================================================================
+
+class Gazetteer:
+    """
+    Read-only, memory-mapped view over a built gazetteer.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r").view(np.ndarray)
+        self.keys = load("keys.npy")
+        self.key_off = load("key_off.npy")
+        self.key_rec = load("key_rec.npy")
+        self.geonameid = load("geonameid.npy")
+        self.coords = load("coords.npy")
+        self.population = load("population.npy")
+        self.country = load("country.npy")
+        self.admin1 = load("admin1.npy")
+        self.timezone = load("timezone.npy")
+        self.names = load("names.npy")
+        self.name_off = load("name_off.npy")
+        self.n_keys = len(self.key_rec)
+
+    def _key(self, i: int) -> bytes:
+        return self.keys[self.key_off[i]:self.key_off[i + 1]].tobytes()
+
+    def _lower_bound(self, target: bytes) -> int:
+        """
+        First key >= target. UTF-8 byte order equals code point order, so bytes compare directly.
+        """
+        lo, hi = 0, self.n_keys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def record(self, i: int) -> Dict[str, Any]:
+        return {
+            "id": int(self.geonameid[i]),
+            "latitude": round(float(self.coords[i, 0]), 5),
+            "longitude": round(float(self.coords[i, 1]), 5),
+            "name": self.names[self.name_off[i]:self.name_off[i + 1]].tobytes().decode("utf-8"),
+            "country": self.meta["countries"][int(self.country[i])],
+            "admin1": self.meta["admin1"][int(self.admin1[i])],
+            "timezone": self.meta["timezones"][int(self.timezone[i])],
+        }
+
+    def search(self, query: str, limit: int = 10, exact: bool = False) -> List[Dict[str, Any]]:
+        """
+        Places whose name starts with `query` (or, with `exact`, is `query`),
+        most populous first. "Paris, France" / "Springfield, Illinois" narrow
+        by country or region.
+        """
+        place, _, qualifier = query.partition(",")
+        prefix = fold(place).encode("utf-8")
+        qualifier = fold(qualifier)
+        if not prefix:
+            return []
+
+        start = self._lower_bound(prefix)
+        # Every longer key starting with the prefix sorts at or after prefix + NUL
+        end = self._lower_bound(prefix + (b"\x00" if exact else b"\xff"))
+        if end <= start:
+            return []
+
+        records = np.unique(self.key_rec[start:end])
+        if qualifier:
+            keep = [r for r in records
+                    if fold(self.meta["countries"][int(self.country[r])]).startswith(qualifier)
+                    or fold(self.meta["admin1"][int(self.admin1[r])]).startswith(qualifier)]
+            records = np.asarray(keep, dtype=np.int64)
+            if records.size == 0:
+                return []
+
+        pops = self.population[records]
+        if records.size > limit:
+            top = np.argpartition(-pops.astype(np.int64), limit - 1)[:limit]
+            records, pops = records[top], pops[top]
+        order = np.argsort(-pops.astype(np.int64), kind="stable")
+        return [self.record(int(r)) for r in records[order]]
+
+
+_gazetteers: Dict[str, Optional[Gazetteer]] = {}
+_gazetteers_lock = threading.Lock()
+
+
+def load_gazetteer(path: str = DEFAULT_GAZETTEER_PATH) -> Optional[Gazetteer]:
+    """
+    Open (once per process) the gazetteer at `path`, or None if it hasn't been built.
+    """
+    with _gazetteers_lock:
+        if path not in _gazetteers:
+            try:
+                _gazetteers[path] = Gazetteer(path) if os.path.exists(os.path.join(path, "meta.json")) else None
+            except Exception as e:
+                print(f"Gazetteer load error: {e}")
+                _gazetteers[path] = None
+        return _gazetteers[path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the offline destination gazetteer.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Build from a GeoNames cities*.txt dump")
+    build.add_argument("source")
+    build.add_argument("--out", default=DEFAULT_GAZETTEER_PATH)
+    build.add_argument("--countries", help="GeoNames countryInfo.txt (country names)")
+    build.add_argument("--admin1", help="GeoNames admin1CodesASCII.txt (region names)")
+    build.add_argument("--alternates", action="store_true", help="Also index alternate names (bigger index)")
+
+    query = sub.add_parser("query", help="Prefix search")
+    query.add_argument("text")
+    query.add_argument("--limit", type=int, default=10)
+    query.add_argument("--index", default=DEFAULT_GAZETTEER_PATH)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.time()
+        meta = build_gazetteer(args.source, args.out, args.countries, args.admin1, args.alternates)
+        print(f"✅ Indexed {meta['count']} places ({meta['keys']} keys) into {args.out} in {time.time() - start:.1f}s")
+        return
+
+    gazetteer = load_gazetteer(args.index)
+    if gazetteer is None:
+        sys.exit(f"No gazetteer at {args.index}. Build one first with: python gazetteer.py build <cities.txt>")
+    start = time.perf_counter()
+    results = gazetteer.search(args.text, args.limit)
+    elapsed_us = (time.perf_counter() - start) * 1e6
+    for place in results:
+        region = f" ({place['admin1']})" if place["admin1"] else ""
+        print(f"{place['name']}, {place['country']}{region}  [{place['id']}]")
+    print(f"({len(results)} results in {elapsed_us:.0f} µs)")
+
+
+if __name__ == "__main__":
+    main()
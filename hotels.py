@@ -0,0 +1,336 @@
+"""
+Hotel Ranking
+Every property from every fetched SerpAPI page goes into columnar arrays.
+Prices are parsed in bulk, and each hotel gets a weighted score in one
+vectorized pass:
+    rating       Bayesian average, shrunk toward the mean of the fetched hotels
+    confidence   how many reviews back that rating (log scale)
+    price fit    1 at the middle of the budget band, falling off past its edges
+    distance     closeness to the centroid of the trip's attractions
+Hotels inside the budget band are ranked for the main list. Hotels just
+outside it are kept as alternatives, so a tight budget still has something
+to show.
+
+Searches use the trip's real stay dates. When the stay search fails
+outright or leaves most properties unpriced, one search per night runs
+concurrently (stays of up to HOTEL_NIGHTLY_MAX nights), and the results
+form a per-property price calendar. Each
+(property, night) price is cached, so trips with overlapping dates reuse
+each other's nightly lookups.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import cache
+from providers import limited_call, submit, time_left
+
+MAX_PAGES = int(os.getenv("HOTEL_PAGES", "3"))
+
+# Score weights (sum to 1)
+W_RATING = 0.40
+W_CONFIDENCE = 0.15
+W_PRICE = 0.30
+W_DISTANCE = 0.15
+
+REVIEW_PRIOR = 50          # reviews at which a hotel's own rating counts as much as the mean
+CONFIDENT_REVIEWS = 2000   # review count that earns full confidence
+DISTANCE_SCALE_KM = 3.0    # score falls to ~37% at this distance from the centroid
+NEAR_BAND = 0.2            # alternatives may be up to 20% outside the budget band
+
+PLACEHOLDER_IMAGE = "https://source.unsplash.com/400x300/?hotel"
+
+NIGHT_TTL_S = float(os.getenv("HOTEL_NIGHT_TTL_S", str(6 * 3600)))   # nightly prices move quickly
+MAX_NIGHTLY_SEARCHES = int(os.getenv("HOTEL_NIGHTLY_MAX", "14"))     # longer stays aren't priced night by night
+NIGHTLY_UNPRICED_SHARE = 0.5   # price night by night only when more of the stay results than this lack a price
+
+_NIGHT_NAMESPACE = "hotel_nights"            # (property, night) -> nightly price, or None if unavailable
+_NIGHT_SEARCH_NAMESPACE = "hotel_night_search"  # (search, night) -> the listings that search returned
+
+# Nightly searches run here so the hotel stage can wait on all of them at once
+_night_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hotel-night")
+
+
+def _google_hotels(params: Dict[str, Any]) -> Dict[str, Any]:
+    from serpapi import GoogleSearch
+    return GoogleSearch(params).get_dict()
+
+
+def fetch_properties(params: Dict[str, Any], max_pages: int = MAX_PAGES) -> List[Dict[str, Any]]:
+    """
+    Raw properties from up to `max_pages` Google Hotels result pages.
+    Pages after the first are best-effort: if one fails or the time budget
+    runs out, the properties already fetched are returned.
+    """
+    properties: List[Dict[str, Any]] = []
+    page_params = dict(params)
+    for page in range(max_pages):
+        try:
+            results = limited_call("serpapi", _google_hotels, page_params)
+        except Exception:  # includes DeadlineExceeded
+            if page == 0:
+                raise
+            break
+        properties.extend(results.get("properties") or [])
+        token = (results.get("serpapi_pagination") or {}).get("next_page_token")
+        if not token:
+            break
+        page_params = {**params, "next_page_token": token}
+    return properties
+
+
+def property_id(prop: Dict[str, Any]) -> str:
+    return prop.get("property_token") or prop.get("name", "")
+
+
+def _search_id(params: Dict[str, Any]) -> str:
+    return "|".join(str(params.get(k, "")) for k in ("q", "adults", "currency", "gl"))
+
+
+def _nightly_price(prop: Dict[str, Any]) -> Optional[float]:
+    rate = prop.get("rate_per_night") or {}
+    price = rate.get("extracted_lowest")
+    if price is None and rate.get("lowest"):
+        price = parse_prices([rate["lowest"]])[0]
+    return None if price is None or np.isnan(price) else float(price)
+
+
+_LISTING_FIELDS = ("name", "property_token", "overall_rating", "reviews", "link", "description", "gps_coordinates")
+
+
+def _listing(prop: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The property without its (night-specific) rates, small enough to cache per search.
+    """
+    listing = {k: prop[k] for k in _LISTING_FIELDS if k in prop}
+    if prop.get("images"):
+        listing["images"] = prop["images"][:1]
+    return listing
+
+
+def search_night(params: Dict[str, Any], night: date) -> Tuple[List[Dict[str, Any]], Dict[str, Optional[float]]]:
+    """
+    (listings, {property id: price}) for a one-night stay from `night`, with
+    None where a property showed up without a price. Served from the
+    (property, night) cache when this search already ran for that night.
+    """
+    search_key = f"{_search_id(params)}|{night.isoformat()}"
+    listings = cache.get(_NIGHT_SEARCH_NAMESPACE, search_key)
+    if listings is not cache.MISS:
+        prices = {}
+        for listing in listings:
+            price = cache.get(_NIGHT_NAMESPACE, f"{property_id(listing)}|{night.isoformat()}")
+            prices[property_id(listing)] = None if price is cache.MISS else price
+        return listings, prices
+
+    night_params = {**params, "check_in_date": night.isoformat(),
+                    "check_out_date": (night + timedelta(days=1)).isoformat()}
+    properties = fetch_properties(night_params, max_pages=1)
+    prices = {property_id(p): _nightly_price(p) for p in properties}
+    for pid, price in prices.items():
+        cache.put(_NIGHT_NAMESPACE, f"{pid}|{night.isoformat()}", price, NIGHT_TTL_S)
+    listings = [_listing(p) for p in properties]
+    cache.put(_NIGHT_SEARCH_NAMESPACE, search_key, listings, NIGHT_TTL_S)
+    return listings, prices
+
+
+def price_calendars(params: Dict[str, Any], check_in: date,
+                    nights: int) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Optional[float]]]]:
+    """
+    ({property id: listing}, {property id: {night: price}}) from one search
+    per night, run concurrently. Nights whose search failed or ran out of
+    time are left out. Callers keep `nights` within MAX_NIGHTLY_SEARCHES.
+    """
+    days = [check_in + timedelta(days=i) for i in range(nights)]
+    searches = {night: submit(_night_pool, search_night, params, night) for night in days}
+
+    listings: Dict[str, Dict[str, Any]] = {}
+    calendars: Dict[str, Dict[str, Optional[float]]] = {}
+    for night, job in searches.items():
+        try:
+            night_listings, prices = job.result(timeout=time_left())
+        except Exception as e:  # includes DeadlineExceeded
+            print(f"SerpAPI Hotels night {night} error: {e}")
+            continue
+        for listing in night_listings:
+            listings.setdefault(property_id(listing), listing)
+        for pid, price in prices.items():
+            calendars.setdefault(pid, {})[night.isoformat()] = price
+    return listings, calendars
+
+
+def fetch_stay(params: Dict[str, Any], check_in: date, nights: int) -> List[Dict[str, Any]]:
+    """
+    Properties for the real stay, check_in to check_in + nights.
+    The whole stay is searched first. If that search fails, or leaves most
+    properties unpriced, the unpriced ones (or all of them) are priced from
+    nightly calendars. They count only if every night is available, at the
+    average nightly rate. Stays longer than MAX_NIGHTLY_SEARCHES nights are
+    never priced night by night, since they could never be fully covered.
+    """
+    nightly = 1 < nights <= MAX_NIGHTLY_SEARCHES
+    stay_params = {**params, "check_in_date": check_in.isoformat(),
+                   "check_out_date": (check_in + timedelta(days=nights)).isoformat()}
+    try:
+        properties = fetch_properties(stay_params)
+    except Exception as e:
+        if not nightly:
+            raise
+        print(f"SerpAPI Hotels stay search error, pricing night by night: {e}")
+        properties = []
+
+    unpriced = [p for p in properties if _nightly_price(p) is None]
+    if nightly and (not properties or len(unpriced) > NIGHTLY_UNPRICED_SHARE * len(properties)):
+        listings, calendars = price_calendars(params, check_in, nights)
+        if not properties:
+            properties = unpriced = [dict(listing) for listing in listings.values()]
+        for prop in unpriced:
+            calendar = calendars.get(property_id(prop), {})
+            prices = [calendar.get((check_in + timedelta(days=i)).isoformat()) for i in range(nights)]
+            if all(price is not None for price in prices):
+                average = sum(prices) / nights
+                prop["rate_per_night"] = {"extracted_lowest": round(average), "lowest": f"₹{round(average):,}"}
+                prop["price_calendar"] = {night: calendar[night] for night in sorted(calendar)}
+    return properties
+
+
+def parse_prices(raw: List[Any]) -> np.ndarray:
+    """
+    Nightly prices as floats, NaN where missing or unparseable.
+    Accepts numbers or strings like "₹1,200".
+    """
+    series = pd.Series(raw, dtype="object")
+    numeric = pd.to_numeric(series, errors="coerce")
+    # Display strings: keep the digits ("₹1,200" -> 1200), as INR prices have no decimals
+    digits = series.astype("string").str.replace(r"\D", "", regex=True).replace("", pd.NA)
+    parsed = numeric.fillna(pd.to_numeric(digits, errors="coerce"))
+    return parsed.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def to_columns(properties: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Columnar view of the fetched properties: price, rating, reviews, lat, lon.
+    """
+    rates = [p.get("rate_per_night") or {} for p in properties]
+    # SerpAPI usually sends a numeric `extracted_lowest`; parse the display string otherwise
+    raw_prices = [r.get("extracted_lowest") if r.get("extracted_lowest") is not None else r.get("lowest")
+                  for r in rates]
+    gps = [p.get("gps_coordinates") or {} for p in properties]
+
+    def numbers(values) -> np.ndarray:
+        return pd.to_numeric(pd.Series(list(values), dtype="object"), errors="coerce").to_numpy(
+            dtype=np.float64, na_value=np.nan)
+
+    return {
+        "price": parse_prices(raw_prices),
+        "rating": numbers(p.get("overall_rating") for p in properties),
+        "reviews": np.nan_to_num(numbers(p.get("reviews") for p in properties), nan=0.0),
+        "lat": numbers(g.get("latitude") for g in gps),
+        "lon": numbers(g.get("longitude") for g in gps),
+    }
+
+
+def _distance_km(lat: np.ndarray, lon: np.ndarray, centroid: Tuple[float, float]) -> np.ndarray:
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(centroid[0]), np.radians(centroid[1])
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 6371.0 * 2 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def score(columns: Dict[str, np.ndarray], min_price: float, max_price: float,
+          centroid: Optional[Tuple[float, float]] = None) -> np.ndarray:
+    """
+    Weighted score in [0, 1] for every property (NaN where the price is unknown).
+    """
+    rating, reviews, price = columns["rating"], columns["reviews"], columns["price"]
+
+    rated = ~np.isnan(rating) & (reviews > 0)
+    mean_rating = float(np.average(rating[rated], weights=reviews[rated])) if rated.any() else 3.5
+    own = np.where(np.isnan(rating), 0.0, reviews)
+    bayes = (np.nan_to_num(rating) * own + mean_rating * REVIEW_PRIOR) / (own + REVIEW_PRIOR)
+    rating_score = np.clip(bayes / 5.0, 0, 1)
+
+    confidence = np.clip(np.log1p(reviews) / np.log1p(CONFIDENT_REVIEWS), 0, 1)
+
+    middle = (min_price + max_price) / 2
+    half = max((max_price - min_price) / 2, 1.0)
+    off = np.abs(price - middle) / half
+    # 1 -> 0.5 across the band, then exponential decay beyond the edges
+    price_fit = np.where(off <= 1, 1 - 0.5 * off, 0.5 * np.exp(-(off - 1)))
+
+    if centroid is not None:
+        distance = _distance_km(columns["lat"], columns["lon"], centroid)
+        distance_score = np.where(np.isnan(distance), 0.5, np.exp(-distance / DISTANCE_SCALE_KM))
+    else:
+        distance_score = np.full(len(price), 0.5)
+
+    return (W_RATING * rating_score + W_CONFIDENCE * confidence
+            + W_PRICE * price_fit + W_DISTANCE * distance_score)
+
+
+def _top(scores: np.ndarray, mask: np.ndarray, limit: int) -> np.ndarray:
+    """
+    Indices of the `limit` best scores where `mask` holds, best first.
+    """
+    candidates = np.flatnonzero(mask)
+    if len(candidates) > limit:
+        candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def _record(prop: Dict[str, Any], price: float, rank_score: float, location: str) -> Dict[str, Any]:
+    images = prop.get("images") or []
+    return {
+        "name": prop.get("name", "Hotel"),
+        "price": int(price),
+        "rating": prop.get("overall_rating", 0.0),
+        "reviews": prop.get("reviews", 0),
+        "address": prop.get("description", location),
+        "link": prop.get("link", f"https://www.google.com/search?q=hotel+{prop.get('name')}+{location}"),
+        "image": images[0].get("thumbnail", PLACEHOLDER_IMAGE) if images else PLACEHOLDER_IMAGE,
+        "score": round(float(rank_score), 3),
+        **({"price_calendar": prop["price_calendar"]} if prop.get("price_calendar") else {}),
+    }
+
+
+def rank_hotels(properties: List[Dict[str, Any]], min_price: float, max_price: float,
+                location: str = "", centroid: Optional[Tuple[float, float]] = None,
+                limit: int = 10, alternatives: int = 3) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    (top `limit` hotels inside the budget band, best `alternatives` up to
+    NEAR_BAND outside it), each list best first.
+    """
+    if not properties:
+        return [], []
+
+    columns = to_columns(properties)
+    scores = score(columns, min_price, max_price, centroid)
+    price = columns["price"]
+    # NaN prices fail every comparison, so unpriced hotels fall out of both masks
+    in_band = (price >= min_price) & (price <= max_price)
+    near_band = ~in_band & (price >= min_price * (1 - NEAR_BAND)) & (price <= max_price * (1 + NEAR_BAND))
+
+    top = [_record(properties[i], price[i], scores[i], location) for i in _top(scores, in_band, limit)]
+    near = [_record(properties[i], price[i], scores[i], location) for i in _top(scores, near_band, alternatives)]
+    return top, near
+
+
+def attraction_centroid(attractions: List[Dict[str, Any]],
+                        fallback: Optional[Tuple[float, float]] = None) -> Optional[Tuple[float, float]]:
+    """
+    Mean position of the attractions. LLM-supplied coordinates may be junk
+    ("48.8N") or the 0/0 of a placeholder attraction, so only finite, non-zero
+    points count. With none left, `fallback` (the destination itself).
+    """
+    lat = pd.to_numeric(pd.Series([a.get("lat") for a in attractions], dtype="object"), errors="coerce")
+    lon = pd.to_numeric(pd.Series([a.get("lon") for a in attractions], dtype="object"), errors="coerce")
+    lat, lon = lat.to_numpy(np.float64, na_value=np.nan), lon.to_numpy(np.float64, na_value=np.nan)
+    valid = np.isfinite(lat) & np.isfinite(lon) & ~((lat == 0) & (lon == 0))
+    if not valid.any():
+        return fallback
+    return float(lat[valid].mean()), float(lon[valid].mean())
@@ -0,0 +1,142 @@
+"""
+Generation Jobs
+Itinerary generation runs on a small worker pool instead of inside the
+Streamlit script run. The session keeps only a job id, in session state and
+in the page URL. Each rerun polls the job's status and stage progress, so
+the UI stays responsive however slow the providers are. A page refresh
+reattaches to the job that's already running instead of starting over.
+Finished itineraries are saved under the job id (see saved.py), so they
+outlive the job itself.
+
+GENERATION_WORKERS (default 4) caps how many generations run at once in
+this server process; later ones wait in the queue.
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import saved
+from providers import submit
+
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "4"))
+JOB_RETENTION_S = float(os.getenv("JOB_RETENTION_S", "3600"))   # finished jobs kept for reattach
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_pool = ThreadPoolExecutor(max_workers=GENERATION_WORKERS, thread_name_prefix="job")
+_jobs: Dict[str, "Job"] = {}
+_jobs_lock = threading.Lock()
+
+
+class Job:
+    """
+    One background generation: status, latest progress and the stage log.
+    """
+
+    def __init__(self, label: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.status = QUEUED
+        self.percent = 0
+        self.message = "Waiting for a free worker..."
+        self.stages: List[Dict[str, Any]] = []
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def report(self, percent: int, text: str) -> None:
+        """
+        Progress callback handed to the generation (same shape as the UI's).
+        """
+        with self._lock:
+            self.percent = percent
+            self.message = text
+            self.stages.append({"t": round(time.time() - (self.started or self.created), 2),
+                                "percent": percent, "message": text})
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "id": self.id,
+                "label": self.label,
+                "status": self.status,
+                "percent": self.percent,
+                "message": self.message,
+                "stages": list(self.stages),
+                "error": self.error,
+                "queued_ahead": queued_ahead(self) if self.status == QUEUED else 0,
+                "elapsed": round((self.finished or time.time()) - (self.started or self.created), 1),
+            }
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    def _run(self, fn: Callable, args: tuple, kwargs: Dict[str, Any]) -> None:
+        with self._lock:
+            self.status = RUNNING
+            self.started = time.time()
+            self.message = f"📍 Planning {self.label}..."
+        try:
+            result = fn(*args, progress=self.report, **kwargs)
+        except Exception as e:
+            print(f"Generation job {self.id} failed: {e}")
+            with self._lock:
+                self.status, self.error, self.finished = FAILED, str(e), time.time()
+            return
+        # Saved before it's marked done, so whoever sees DONE can share the id.
+        # Saving is a bonus: the job finishes either way.
+        try:
+            saved.save(self.id, result)
+        except Exception as e:
+            print(f"Generation job {self.id} couldn't be saved: {e}")
+        with self._lock:
+            self.status, self.result, self.finished = DONE, result, time.time()
+
+
+def _forget_old_jobs() -> None:
+    cutoff = time.time() - JOB_RETENTION_S
+    with _jobs_lock:
+        for job_id in [i for i, job in _jobs.items() if job.finished and job.finished < cutoff]:
+            del _jobs[job_id]
+
+
+def start_job(label: str, fn: Callable, *args, **kwargs) -> Job:
+    """
+    Queue fn(*args, progress=job.report, **kwargs) on the worker pool.
+    The caller's context (deadline, LLM fast mode) carries over.
+    """
+    _forget_old_jobs()
+    job = Job(label)
+    with _jobs_lock:
+        _jobs[job.id] = job
+    submit(_pool, job._run, fn, args, kwargs)
+    return job
+
+
+def get_job(job_id: Optional[str]) -> Optional[Job]:
+    if not job_id:
+        return None
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def queued_ahead(job: Job) -> int:
+    with _jobs_lock:
+        return sum(1 for other in _jobs.values() if other.status == QUEUED and other.created < job.created)
+
+
+def job_stats() -> Dict[str, int]:
+    """
+    Jobs per status in this server process, plus the worker limit.
+    """
+    with _jobs_lock:
+        statuses = [job.status for job in _jobs.values()]
+    return {"workers": GENERATION_WORKERS, **{s: statuses.count(s) for s in (QUEUED, RUNNING, DONE, FAILED)}}
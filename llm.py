@@ -0,0 +1,235 @@
+"""
+LLM Routing
+Every chat completion and image generation goes through here. Call sites pick a latency tier
+("fast", "balanced", "quality") and an output token cap; each call's tokens,
+latency and cost are recorded for the Provider Metrics panel. Fast mode
+(sidebar toggle) sends every call to the "fast" tier.
+
+Models and prices can be overridden in .env:
+    LLM_MODEL_FAST=gpt-4o-mini
+    LLM_COST_FAST=0.15,0.60      # USD per 1M prompt, completion tokens
+    LLM_COST_IMAGE=0.04          # USD per generated image
+"""
+
+import contextvars
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from providers import limited_call, limited_stream, time_left
+
+# tier -> (default model, USD per 1M prompt tokens, USD per 1M completion tokens)
+_DEFAULT_TIERS = {
+    "fast": ("gpt-4o-mini", 0.15, 0.60),
+    "balanced": ("gpt-3.5-turbo", 0.50, 1.50),
+    "quality": ("gpt-4o", 2.50, 10.00),
+}
+
+FAST_TIER = "fast"
+
+# Images are billed per image, not per token (DALL-E 3, 1024x1024 standard)
+IMAGE_MODEL = os.getenv("LLM_MODEL_IMAGE", "dall-e-3")
+try:
+    IMAGE_COST = float(os.getenv("LLM_COST_IMAGE", "0.04"))
+except ValueError:
+    print(f"Ignoring malformed LLM_COST_IMAGE={os.getenv('LLM_COST_IMAGE')!r}")
+    IMAGE_COST = 0.04
+
+
+def _tier_spec(tier: str) -> Dict[str, Any]:
+    model, prompt_cost, completion_cost = _DEFAULT_TIERS[tier]
+    costs = os.getenv(f"LLM_COST_{tier.upper()}")
+    if costs:
+        try:
+            prompt_cost, completion_cost = (float(v) for v in costs.split(","))
+        except ValueError:
+            print(f"Ignoring malformed LLM_COST_{tier.upper()}={costs!r}")
+    return {
+        "model": os.getenv(f"LLM_MODEL_{tier.upper()}", model),
+        "prompt_cost": prompt_cost,
+        "completion_cost": completion_cost,
+    }
+
+
+TIERS: Dict[str, Dict[str, Any]] = {tier: _tier_spec(tier) for tier in _DEFAULT_TIERS}
+
+_fast_mode: contextvars.ContextVar = contextvars.ContextVar("llm_fast_mode", default=False)
+
+
+def set_fast_mode(enabled: bool) -> None:
+    """
+    Route every LLM call in the current context (and stages started from it) to the fast tier.
+    """
+    _fast_mode.set(bool(enabled))
+
+
+def resolve_tier(tier: str) -> str:
+    if _fast_mode.get():
+        return FAST_TIER
+    return tier if tier in TIERS else "balanced"
+
+
+# ============================================================================
+# ACCOUNTING
+# ============================================================================
+
+_usage: Dict[str, Dict[str, Any]] = {}
+_usage_lock = threading.Lock()
+
+
+def _record(label: str, tier: str, prompt_tokens: int, completion_tokens: int,
+            latency: float, first_token: Optional[float] = None, estimated: bool = False,
+            model: Optional[str] = None, cost: Optional[float] = None) -> None:
+    """
+    Add one call to its call site's totals. Token-priced calls pass their tier;
+    others (images) pass their own model and cost.
+    """
+    if cost is None:
+        spec = TIERS[tier]
+        cost = (prompt_tokens * spec["prompt_cost"] + completion_tokens * spec["completion_cost"]) / 1e6
+    with _usage_lock:
+        row = _usage.setdefault(label, {
+            "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+            "total_latency_s": 0.0, "max_latency_s": 0.0, "first_token_s": 0.0, "streamed": 0, "estimated": 0,
+        })
+        row["calls"] += 1
+        row["tier"] = tier
+        row["model"] = model or TIERS[tier]["model"]
+        row["prompt_tokens"] += prompt_tokens
+        row["completion_tokens"] += completion_tokens
+        row["cost_usd"] += cost
+        row["total_latency_s"] += latency
+        row["max_latency_s"] = max(row["max_latency_s"], latency)
+        if first_token is not None:
+            row["streamed"] += 1
+            row["first_token_s"] += first_token
+        row["estimated"] += int(estimated)
+
+
+def llm_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Per call site: calls, tier/model last used, tokens, cost and latency.
+    """
+    with _usage_lock:
+        stats = {}
+        for label, row in _usage.items():
+            stats[label] = {
+                "tier": row["tier"],
+                "model": row["model"],
+                "calls": row["calls"],
+                "prompt_tokens": row["prompt_tokens"],
+                "completion_tokens": row["completion_tokens"],
+                "cost_usd": round(row["cost_usd"], 5),
+                "avg_latency_s": round(row["total_latency_s"] / row["calls"], 2),
+                "max_latency_s": round(row["max_latency_s"], 2),
+                "avg_first_token_s": round(row["first_token_s"] / row["streamed"], 2) if row["streamed"] else None,
+                "estimated_calls": row["estimated"],
+            }
+        return stats
+
+
+def _estimate_tokens(text: str) -> int:
+    # ~4 characters per token; only used when the API didn't report usage
+    return max(1, len(text) // 4) if text else 0
+
+
+# ============================================================================
+# CALLS
+# ============================================================================
+
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _client():
+    """
+    One OpenAI client per API key, so connections are reused between calls.
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    with _clients_lock:
+        if api_key not in _clients:
+            from openai import OpenAI
+            _clients[api_key] = OpenAI(api_key=api_key)
+        return _clients[api_key]
+
+
+def _request(prompt: str, tier: str, max_tokens: int, temperature: float, timeout: float) -> Tuple[str, Dict[str, Any]]:
+    tier = resolve_tier(tier)
+    return tier, {
+        "model": TIERS[tier]["model"],
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "timeout": time_left(timeout),
+    }
+
+
+def chat(prompt: str, label: str, tier: str = "balanced", max_tokens: int = 500,
+         temperature: float = 0.7, timeout: float = 60) -> str:
+    """
+    One chat completion on the given tier; returns the message text.
+    """
+    tier, request = _request(prompt, tier, max_tokens, temperature, timeout)
+    start = time.perf_counter()
+    response = limited_call("openai", _client().chat.completions.create, **request)
+    latency = time.perf_counter() - start
+
+    content = response.choices[0].message.content or ""
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        _record(label, tier, usage.prompt_tokens, usage.completion_tokens, latency)
+    else:
+        _record(label, tier, _estimate_tokens(prompt), _estimate_tokens(content), latency, estimated=True)
+    return content
+
+
+def stream_chat(prompt: str, label: str, tier: str = "balanced", max_tokens: int = 500,
+                temperature: float = 0.7, timeout: float = 60) -> Iterator[str]:
+    """
+    Streamed chat completion on the given tier, yielding text as it arrives.
+    Usage is recorded even if the caller stops early (estimated in that case).
+    """
+    tier, request = _request(prompt, tier, max_tokens, temperature, timeout)
+    start = time.perf_counter()
+    first_token = None
+    usage = None
+    received = []
+
+    try:
+        stream = limited_stream(
+            "openai", _client().chat.completions.create,
+            stream=True, stream_options={"include_usage": True}, **request
+        )
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content or ""
+            if text:
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                received.append(text)
+                yield text
+    finally:
+        latency = time.perf_counter() - start
+        if usage is not None:
+            _record(label, tier, usage.prompt_tokens, usage.completion_tokens, latency, first_token)
+        elif received or first_token is not None:
+            _record(label, tier, _estimate_tokens(prompt), _estimate_tokens("".join(received)),
+                    latency, first_token, estimated=True)
+
+
+def generate_image(prompt: str, label: str, size: str = "1024x1024", quality: str = "standard",
+                   timeout: float = 60) -> str:
+    """
+    One generated image; returns its URL. Recorded at IMAGE_COST per image.
+    """
+    start = time.perf_counter()
+    response = limited_call(
+        "openai", _client().images.generate,
+        model=IMAGE_MODEL, prompt=prompt[:1000], size=size, quality=quality, n=1, timeout=time_left(timeout)
+    )
+    _record(label, "image", 0, 0, time.perf_counter() - start, model=IMAGE_MODEL, cost=IMAGE_COST)
+    return response.data[0].url
@@ -0,0 +1,611 @@
+"""
+Load Test
+Drives N concurrent simulated sessions through the real UI flow with
+Streamlit's headless app testing (AppTest): search, select destination,
+generate, click a day visual, download the PDF. Every provider is replaced
+by a local stand-in with configurable latency, so no keys or network are
+needed. Reports throughput, per-interaction latency percentiles, CPU and
+memory per session as N grows, as capacity numbers for sizing replicas.
+
+    python load_test.py                              # 1, 2, 4, 8 sessions
+    python load_test.py --sessions 1,8,16,32 --latency 0.3
+    python load_test.py --sessions 8 --warm --json capacity.json
+
+Sessions are cold by default: each one plans a different destination, so
+nothing is served from the cache. --warm sends every session to the same
+few destinations instead, like a popular-destination mix.
+
+All sessions share this process, like the sessions of one `streamlit run app.py`
+server. Stand-in images come from a local HTTP server, so the PDF worker
+processes download them the way they would download real ones.
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import types
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:  # CPU/memory then come from /proc (Linux) or getrusage
+    psutil = None
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+CITIES = ["Paris", "Rome", "Tokyo", "Lisbon", "Prague", "Kyoto", "Istanbul", "Cusco",
+          "Hanoi", "Seville", "Vienna", "Marrakesh", "Reykjavik", "Cape Town", "Havana", "Bruges"]
+
+INTERACTIONS = ["load", "search", "select", "generate", "day visual", "pdf"]
+
+
+# ============================================================================
+# STAND-IN PROVIDERS
+# ============================================================================
+
+def _png(width: int = 96, height: int = 64, rgb=(70, 130, 180)) -> bytes:
+    """
+    A solid-colour PNG, so the PDF has real images to download and embed.
+    """
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = b"".join(b"\x00" + bytes(rgb) * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows))
+            + chunk(b"IEND", b""))
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    image = _png()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(self.image)))
+        self.end_headers()
+        self.wfile.write(self.image)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Response:
+    def __init__(self, data: Dict[str, Any], status_code: int = 200):
+        self._data = data
+        self.status_code = status_code
+        self.headers: Dict[str, str] = {}
+        self.content = json.dumps(data).encode("utf-8")
+
+    def json(self) -> Dict[str, Any]:
+        return self._data
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class StandIns:
+    """
+    In-process replacements for every external API the app calls. Calls still
+    go through providers.py (rate limits, health, deadlines), only the network
+    round trip is replaced by `latency` seconds of sleep.
+    """
+
+    def __init__(self, latency: float, llm_latency: float):
+        self.latency = latency
+        self.llm_latency = llm_latency
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _ImageHandler)
+        self.image_url = f"http://127.0.0.1:{self._server.server_address[1]}/image.png"
+
+    def _count(self, provider: str) -> None:
+        with self._lock:
+            self.calls[provider] = self.calls.get(provider, 0) + 1
+
+    # -- HTTP (requests.get) ------------------------------------------------
+
+    def http_get(self, real_get: Callable) -> Callable:
+        def get(url, params=None, **kwargs):
+            if url.startswith("http://127.0.0.1"):
+                return real_get(url, params=params, **kwargs)
+            params = params or {}
+            host = url.split("/")[2]
+            self._count(host)
+            time.sleep(self.latency)
+            if "geocoding-api" in host:
+                name = params.get("name", "Somewhere").split(",")[0].strip().title()
+                return _Response({"results": [{
+                    "id": zlib.crc32(name.encode("utf-8")), "name": name, "country": "Standinland",
+                    "admin1": "", "latitude": 48.85, "longitude": 2.35, "timezone": "Europe/Paris",
+                }]})
+            if "archive-api" in host:
+                return _Response({"daily": {"time": [], "weather_code": [], "temperature_2m_max": [],
+                                            "temperature_2m_min": [], "precipitation_sum": []}})
+            if "open-meteo" in host:
+                days = [time.strftime("%Y-%m-%d", time.localtime(time.time() + 86400 * i)) for i in range(16)]
+                return _Response({
+                    "current": {"temperature_2m": 18, "weather_code": 1, "wind_speed_10m": 9, "relative_humidity_2m": 60},
+                    "daily": {"time": days, "weather_code": [0, 2, 61, 3] * 4, "temperature_2m_max": [21] * 16,
+                              "temperature_2m_min": [12] * 16, "precipitation_sum": [0, 0, 4, 1] * 4},
+                })
+            if "geoapify" in host:
+                # Places spread over the requested tile (filter=rect:west,south,east,north)
+                west, south, east, north = map(float, params["filter"].split(":")[1].split(","))
+                count = min(int(params.get("limit", 6)), 8)
+                return _Response({"features": [{"properties": {
+                    "name": f"Stand-in Landmark {south:.3f}/{west:.3f}/{i}", "categories": ["tourism.attraction"],
+                    "lat": south + (north - south) * (i + 0.5) / count, "lon": (west + east) / 2,
+                    "formatted": f"{i} Stand-in Street",
+                }} for i in range(count)]})
+            if "newsapi" in host:
+                return _Response({"status": "ok", "articles": [{
+                    "title": f"Festival {i} opens this weekend", "description": "Music and culture events.",
+                    "url": f"https://news.example/{zlib.crc32(str(params).encode())}/{i}",
+                    "publishedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "source": {"name": "Stand-in Times"}, "urlToImage": None,
+                } for i in range(5)]})
+            if "unsplash" in host:
+                return _Response({"results": [{"urls": {"regular": self.image_url}}]})
+            if "wikipedia" in host:
+                return _Response({"query": {"pages": {"1": {"thumbnail": {"source": self.image_url}}}}})
+            return _Response({}, status_code=404)
+        return get
+
+    # -- SDKs (OpenAI, SerpAPI, DuckDuckGo) ------------------------------------
+
+    def _completion(self, prompt: str) -> str:
+        if "tourist attractions" in prompt or "activities/experiences" in prompt:
+            kind = "Attraction" if "tourist attractions" in prompt else "Activity"
+            return "[\n" + ",\n".join(json.dumps({
+                "name": f"Stand-in {kind} {i}", "type": "Museum", "lat": 48.85, "lon": 2.35,
+                "summary": f"A lovely stand-in {kind.lower()}.", "description": "Fun for everyone.",
+            }) for i in range(6)) + "\n]"
+        if "Plan these days" in prompt:
+            days = [int(line.split(":")[0].split()[1]) for line in prompt.splitlines() if line.strip().startswith("Day ")]
+            return "[\n" + ",\n".join(json.dumps({
+                "day": day, "title": "Stand-in Day", "morning": "Museum visit", "afternoon": "Old town walk",
+                "evening": "Dinner by the river", "tip": "Book ahead.",
+            }) for day in days) + "\n]"
+        return "Pack layers, comfortable shoes and a light rain jacket."
+
+    def openai_module(self) -> types.ModuleType:
+        stand_ins = self
+
+        class Usage:
+            def __init__(self, prompt: str, text: str):
+                self.prompt_tokens = len(prompt) // 4
+                self.completion_tokens = len(text) // 4
+
+        def chunk(text: Optional[str], usage=None):
+            choices = [types.SimpleNamespace(delta=types.SimpleNamespace(content=text))] if text is not None else []
+            return types.SimpleNamespace(choices=choices, usage=usage)
+
+        class Completions:
+            def create(self, messages, stream=False, **kwargs):
+                stand_ins._count("openai")
+                prompt = messages[-1]["content"]
+                text = stand_ins._completion(prompt)
+                time.sleep(stand_ins.llm_latency)
+                if not stream:
+                    message = types.SimpleNamespace(content=text)
+                    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)],
+                                                 usage=Usage(prompt, text))
+
+                def chunks():
+                    for line in text.splitlines(keepends=True):
+                        yield chunk(line)
+                    yield chunk(None, Usage(prompt, text))
+                return chunks()
+
+        class Images:
+            def generate(self, **kwargs):
+                stand_ins._count("openai images")
+                time.sleep(stand_ins.llm_latency)
+                return types.SimpleNamespace(data=[types.SimpleNamespace(url=stand_ins.image_url)])
+
+        class OpenAI:
+            def __init__(self, api_key=None, **kwargs):
+                self.chat = types.SimpleNamespace(completions=Completions())
+                self.images = Images()
+
+        module = types.ModuleType("openai")
+        module.OpenAI = OpenAI
+        return module
+
+    def serpapi_module(self) -> types.ModuleType:
+        stand_ins = self
+
+        class GoogleSearch:
+            def __init__(self, params: Dict[str, Any]):
+                self.params = params
+
+            def get_dict(self) -> Dict[str, Any]:
+                stand_ins._count("serpapi")
+                time.sleep(stand_ins.latency)
+                # Like Google Hotels, a few properties can't be priced for a multi-night stay
+                multi_night = self.params.get("check_in_date") != (
+                    date.fromisoformat(self.params["check_out_date"]) - timedelta(days=1)).isoformat()
+                return {"properties": [{
+                    "name": f"Stand-in Hotel {i}", "property_token": f"stand-in-{i}",
+                    "overall_rating": 3.5 + i / 10, "reviews": 100 * i,
+                    "link": "https://hotels.example", "description": "Near the centre",
+                    "images": [{"thumbnail": stand_ins.image_url}],
+                    **({} if multi_night and i % 4 == 3 else {"rate_per_night": {"lowest": f"₹{1000 * (i + 1):,}"}}),
+                } for i in range(12)]}
+
+        module = types.ModuleType("serpapi")
+        module.GoogleSearch = GoogleSearch
+        return module
+
+    def duckduckgo_module(self) -> types.ModuleType:
+        stand_ins = self
+
+        class DDGS:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def images(self, **kwargs):
+                stand_ins._count("duckduckgo")
+                time.sleep(stand_ins.latency)
+                return [{"image": stand_ins.image_url}]
+
+        module = types.ModuleType("duckduckgo_search")
+        module.DDGS = DDGS
+        return module
+
+    def install(self) -> None:
+        """
+        Patch the stand-ins in. Must run before the app modules are first imported.
+        """
+        import requests
+
+        threading.Thread(target=self._server.serve_forever, daemon=True, name="stand-in-images").start()
+        requests.get = self.http_get(requests.get)
+        sys.modules["openai"] = self.openai_module()
+        sys.modules["serpapi"] = self.serpapi_module()
+        sys.modules["duckduckgo_search"] = self.duckduckgo_module()
+
+
+def _isolated_env(workdir: str) -> None:
+    """
+    Dummy keys (so every provider path runs) and throwaway cache/index locations.
+    """
+    for key in ("OPENAI_API_KEY", "SERP_API_KEY", "GEOAPIFY_API_KEY", "NEWS_API_KEY", "UNSPLASH_API_KEY"):
+        os.environ[key] = "stand-in"
+    os.environ["CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["PROVIDER_CACHE_PATH"] = os.path.join(workdir, "cache", "provider_cache.sqlite3")
+    os.environ["CLIMATE_PATH"] = os.path.join(workdir, "climate")
+    os.environ["GAZETTEER_PATH"] = os.path.join(workdir, "gazetteer")
+    os.environ["POI_INDEX_PATH"] = os.path.join(workdir, "poi_index")
+
+
+# ============================================================================
+# SESSION FLOW
+# ============================================================================
+
+_pdf_latencies: List[float] = []
+_pdf_lock = threading.Lock()
+
+
+def _time_pdf_builds() -> None:
+    """
+    Record every PDF build (app.py imports submit_pdf on each rerun, so patching the module is enough).
+    """
+    import pdf_render
+
+    submit = pdf_render.submit_pdf
+
+    def timed_submit(*args, **kwargs):
+        start = time.perf_counter()
+        future = submit(*args, **kwargs)
+
+        def done(_):
+            with _pdf_lock:
+                _pdf_latencies.append(time.perf_counter() - start)
+        future.add_done_callback(done)
+        return future
+
+    pdf_render.submit_pdf = timed_submit
+
+
+def _serialize_script_compilation() -> None:
+    """
+    Each AppTest compiles app.py itself, and ast.parse from several threads at
+    once trips a CPython bug ("AST constructor recursion depth mismatch").
+    A real server compiles once; here the compiles just take turns.
+    """
+    from streamlit.runtime.scriptrunner import magic
+
+    add_magic = magic.add_magic
+    lock = threading.Lock()
+
+    def locked_add_magic(*args, **kwargs):
+        with lock:
+            return add_magic(*args, **kwargs)
+
+    magic.add_magic = locked_add_magic
+
+
+def _share_test_runtime() -> None:
+    """
+    AppTest installs a mock Runtime singleton for each run and clears it
+    afterwards, so concurrent sessions would unset it under each other.
+    Keep serving the last one installed, as a server shares one runtime.
+    """
+    from streamlit.runtime import Runtime
+
+    last: Dict[str, Any] = {}
+
+    def instance(cls):
+        runtime = cls._instance if cls._instance is not None else last.get("runtime")
+        if runtime is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        last["runtime"] = runtime
+        return runtime
+
+    def exists(cls):
+        return cls._instance is not None or "runtime" in last
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(exists)
+
+
+def _widget(widgets, label_start: str):
+    for widget in widgets:
+        if widget.label.startswith(label_start):
+            return widget
+    raise LookupError(f"no widget labelled {label_start!r}")
+
+
+def _wait_for_generation(at, _, timeout: float) -> None:
+    """
+    Generation runs as a background job; rerun (as the page's poll would) until it's handed over.
+    """
+    give_up = time.monotonic() + timeout
+    while "generation_job" in at.session_state and time.monotonic() < give_up:
+        time.sleep(0.05)
+        at.run()
+
+
+def run_session(destination: str, timeout: float) -> Dict[str, Any]:
+    """
+    One user's full flow. Returns per-interaction seconds and any errors.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    timings: Dict[str, float] = {}
+    errors: List[str] = []
+
+    def step(name: str, action: Callable[[], Any]) -> None:
+        start = time.perf_counter()
+        action()
+        timings[name] = time.perf_counter() - start
+        errors.extend(f"{name}: {e.value}" for e in at.exception)
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    try:
+        step("load", at.run)
+        _widget(at.text_input, "📍 From").input("Mumbai")
+        step("search", lambda: _widget(at.text_input, "✈️ Destination").input(destination).run())
+        step("select", lambda: _widget(at.selectbox, "✅ Confirm Destination").set_value(
+            _widget(at.selectbox, "✅ Confirm Destination").options[0]).run())
+        # Generate and every rerun after it also build the PDF and the fast exports
+        step("generate", lambda: _wait_for_generation(at, _widget(at.button, "🚀 Generate").click().run(), timeout))
+        step("day visual", lambda: _widget(at.button, "✨ Generate Day").click().run())
+        downloads = [b.label for b in at.get("download_button")]
+        if not any("PDF" in label for label in downloads):
+            errors.append("pdf: no PDF download offered")
+    except Exception as e:
+        errors.append(f"{type(e).__name__}: {e}")
+    return {"timings": timings, "errors": errors}
+
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+def _pdf_worker_pids() -> List[int]:
+    import pdf_render
+    pool = pdf_render._pool
+    return list(getattr(pool, "_processes", None) or {}) if pool is not None else []
+
+
+def _proc_cpu_seconds(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return 0.0
+
+
+def cpu_seconds() -> float:
+    """
+    CPU time of this process plus its live PDF workers.
+    """
+    if psutil is not None:
+        process = psutil.Process()
+        total = sum(process.cpu_times()[:2])
+        for child in process.children(recursive=True):
+            try:
+                total += sum(child.cpu_times()[:2])
+            except psutil.Error:
+                pass
+        return total
+    times = os.times()
+    return times.user + times.system + sum(_proc_cpu_seconds(pid) for pid in _pdf_worker_pids())
+
+
+def rss_mb() -> float:
+    """
+    Resident memory of this process (the sessions live here; PDF workers are reported apart).
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2 ** 20
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # peak, KiB on Linux
+
+
+class MemorySampler:
+    """
+    Peak RSS while a load level runs, sampled every `interval` seconds.
+    """
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="rss-sampler")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def run_level(sessions: int, rounds: int, timeout: float, warm: bool, level_id: int) -> Dict[str, Any]:
+    """
+    `rounds` waves of `sessions` concurrent sessions; the numbers cover all waves.
+    """
+    with _pdf_lock:
+        _pdf_latencies.clear()
+    destinations = [
+        CITIES[i % len(CITIES)] if warm else f"{CITIES[i % len(CITIES)]} {level_id}-{i}"
+        for i in range(sessions * rounds)
+    ]
+
+    baseline_mb = rss_mb()
+    cpu_start, wall_start = cpu_seconds(), time.perf_counter()
+    results = []
+    with MemorySampler() as memory, ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="session") as pool:
+        for wave in range(rounds):
+            batch = destinations[wave * sessions:(wave + 1) * sessions]
+            results += list(pool.map(lambda d: run_session(d, timeout), batch))
+    wall = time.perf_counter() - wall_start
+    cpu = cpu_seconds() - cpu_start
+
+    latencies: Dict[str, List[float]] = {name: [] for name in INTERACTIONS}
+    for result in results:
+        for name, seconds in result["timings"].items():
+            latencies[name].append(seconds)
+    with _pdf_lock:
+        latencies["pdf"] = list(_pdf_latencies)
+
+    completed = sum(1 for r in results if not r["errors"] and "day visual" in r["timings"])
+    interactions = sum(len(r["timings"]) for r in results)
+    return {
+        "sessions": sessions,
+        "rounds": rounds,
+        "completed": completed,
+        "errors": [e for r in results for e in r["errors"]][:10],
+        "wall_s": round(wall, 2),
+        "flows_per_min": round(60 * completed / wall, 1) if wall else None,
+        "interactions_per_s": round(interactions / wall, 2) if wall else None,
+        "cpu_s": round(cpu, 2),
+        "cpu_util_pct": round(100 * cpu / wall, 1) if wall else None,
+        "cores": os.cpu_count(),
+        "peak_rss_mb": round(memory.peak, 1),
+        "mb_per_session": round(max(0.0, memory.peak - baseline_mb) / sessions, 1),
+        "latency_s": {
+            name: {
+                "n": len(values),
+                "p50": None if not values else round(_percentile(values, 0.5), 3),
+                "p95": None if not values else round(_percentile(values, 0.95), 3),
+                "max": None if not values else round(max(values), 3),
+            }
+            for name, values in latencies.items()
+        },
+    }
+
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+def print_level(level: Dict[str, Any]) -> None:
+    print(f"\n👥 {level['sessions']} concurrent sessions × {level['rounds']} rounds: "
+          f"{level['completed']}/{level['sessions'] * level['rounds']} flows completed in {level['wall_s']}s")
+    print(f"   throughput {level['flows_per_min']} flows/min, {level['interactions_per_s']} interactions/s | "
+          f"CPU {level['cpu_util_pct']}% of one core ({level['cores']} cores) | "
+          f"peak RSS {level['peak_rss_mb']} MB, ~{level['mb_per_session']} MB/session")
+    print(f"   {'interaction':<12} {'n':>4} {'p50 s':>8} {'p95 s':>8} {'max s':>8}")
+    for name, row in level["latency_s"].items():
+        cells = [f"{row[k]:>8.3f}" if row[k] is not None else f"{'-':>8}" for k in ("p50", "p95", "max")]
+        print(f"   {name:<12} {row['n']:>4} {' '.join(cells)}")
+    for error in level["errors"]:
+        print(f"   ❌ {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test against local stand-in providers.")
+    parser.add_argument("--sessions", default="1,2,4,8", help="Comma-separated concurrency levels (default: 1,2,4,8)")
+    parser.add_argument("--rounds", type=int, default=1, help="Waves of sessions per level (default: 1)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stand-in API latency in seconds (default: 0.2)")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Stand-in OpenAI latency in seconds (default: 0.8)")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-interaction timeout in seconds (default: 120)")
+    parser.add_argument("--warm", action="store_true", help="Reuse a few destinations so sessions hit the cache")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+    levels = [int(n) for n in args.sessions.split(",") if n.strip()]
+
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    _isolated_env(workdir)
+    StandIns(args.latency, args.llm_latency).install()
+    sys.path.insert(0, os.path.dirname(APP_PATH))
+    _time_pdf_builds()
+    _serialize_script_compilation()
+    _share_test_runtime()
+
+    print(f"🧪 Load test: levels {levels}, stand-in latency {args.latency}s (LLM {args.llm_latency}s), "
+          f"{'warm' if args.warm else 'cold'} cache in {workdir}")
+    # One throwaway session so imports, the PDF pool and ReportLab are warm before measuring
+    run_session("Warmup", args.timeout)
+
+    report = []
+    for level_id, sessions in enumerate(levels, 1):
+        level = run_level(sessions, args.rounds, args.timeout, args.warm, level_id)
+        print_level(level)
+        report.append(level)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"latency_s": args.latency, "llm_latency_s": args.llm_latency, "warm": args.warm,
+                       "levels": report}, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Destination News
+Per-destination article store kept in the shared cache. Refreshes only ask
+NewsAPI for articles newer than the latest one stored, syndicated copies of
+the same story are collapsed with MinHash signatures, and the top articles
+are picked locally with a small TF-IDF scorer over the event keywords.
+"""
+
+import os
+import re
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+import cache
+from providers import limited_get
+
+NEWS_URL = "https://newsapi.org/v2/everything"
+
+# The same keywords drive the NewsAPI query and the local ranking
+EVENT_KEYWORDS = ["events", "festival", "concert", "exhibition", "things to do", "culture", "nightlife"]
+
+REFRESH_INTERVAL_S = float(os.getenv("NEWS_REFRESH_S", "1800"))
+STORE_TTL_S = 30 * 24 * 3600
+MAX_STORED = 100            # newest articles kept per destination
+FIRST_PAGE_SIZE = 30        # first fetch for a destination
+INCREMENTAL_PAGE_SIZE = 15  # later fetches only see articles newer than the store
+
+DUPLICATE_THRESHOLD = 0.6   # estimated Jaccard similarity of word 3-shingles
+NUM_PERM = 64
+RECENCY_HALF_LIFE_DAYS = 7.0
+
+_STORE_NAMESPACE = "news_store"
+
+# Fixed seed: signatures must agree between processes and runs
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, 2 ** 31 - 1, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, 2 ** 31 - 1, size=NUM_PERM).astype(np.uint64)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def build_query(destination: str) -> str:
+    keywords = " OR ".join(f'"{k}"' if " " in k else k for k in EVENT_KEYWORDS)
+    return f'"{destination}" AND ({keywords})'
+
+
+def _tokens(text: str) -> List[str]:
+    # Crude plural folding so "festivals" matches "festival"
+    return [w[:-1] if len(w) > 3 and w.endswith("s") else w for w in _WORD.findall(text.lower())]
+
+
+def _text(article: Dict[str, Any]) -> str:
+    return f"{article.get('title') or ''} {article.get('description') or ''}"
+
+
+def _published(article: Dict[str, Any]) -> str:
+    return article.get("publishedAt") or ""
+
+
+# ============================================================================
+# NEAR-DUPLICATE COLLAPSE
+# ============================================================================
+
+def minhash(text: str) -> np.ndarray:
+    """
+    MinHash signature of the word 3-shingles of `text`.
+    """
+    words = _WORD.findall(text.lower())
+    shingles = {" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))} if words else {""}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # (a*x + b) mod p for every permutation at once; operands stay below 2^63
+    return ((np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME).min(axis=0)
+
+
+def collapse_duplicates(articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Keep the earliest copy of each story. Later copies only fill in a missing
+    image/description and bump `_copies`, which the ranker treats as reach.
+    """
+    kept: List[Dict[str, Any]] = []
+    signatures = np.zeros((0, NUM_PERM), dtype=np.uint64)
+
+    for article in sorted(articles, key=_published):
+        signature = minhash(_text(article))
+        if len(kept):
+            similarity = (signatures == signature).mean(axis=1)
+            best = int(similarity.argmax())
+            if similarity[best] >= DUPLICATE_THRESHOLD:
+                original = kept[best]
+                original["_copies"] = original.get("_copies", 1) + article.get("_copies", 1)
+                for field in ("urlToImage", "description"):
+                    if not original.get(field) and article.get(field):
+                        original[field] = article[field]
+                continue
+        kept.append(article)
+        signatures = np.vstack([signatures, signature])
+
+    return kept
+
+
+# ============================================================================
+# RANKING
+# ============================================================================
+
+def rank_articles(articles: List[Dict[str, Any]], limit: int = 5) -> List[Dict[str, Any]]:
+    """
+    TF-IDF over the event keywords (titles count double), decayed by age and
+    boosted a little for stories that were syndicated widely.
+    """
+    if not articles:
+        return []
+
+    terms = sorted({t for keyword in EVENT_KEYWORDS for t in _tokens(keyword)})
+    term_index = {t: i for i, t in enumerate(terms)}
+    counts = np.zeros((len(articles), len(terms)))
+    lengths = np.ones(len(articles))
+
+    for row, article in enumerate(articles):
+        tokens = _tokens(article.get("title") or "") * 2 + _tokens(article.get("description") or "")
+        lengths[row] = max(1, len(tokens))
+        for token in tokens:
+            col = term_index.get(token)
+            if col is not None:
+                counts[row, col] += 1
+
+    tf = counts / lengths[:, None]
+    df = (counts > 0).sum(axis=0)
+    idf = np.log((1 + len(articles)) / (1 + df)) + 1
+    relevance = (tf * idf).sum(axis=1)
+
+    now = time.time()
+    ages = np.array([now - _timestamp(a) for a in articles]) / 86400
+    recency = np.power(0.5, np.clip(ages, 0, None) / RECENCY_HALF_LIFE_DAYS)
+    reach = 1 + 0.3 * np.log([a.get("_copies", 1) for a in articles])
+
+    scores = (0.05 + relevance) * recency * reach
+    order = np.argsort(-scores, kind="stable")[:limit]
+    return [{k: v for k, v in articles[i].items() if not k.startswith("_")} for i in order]
+
+
+def _timestamp(article: Dict[str, Any]) -> float:
+    try:
+        return datetime.fromisoformat(_published(article).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0.0
+
+
+# ============================================================================
+# STORE & REFRESH
+# ============================================================================
+
+def _store_key(destination: str) -> str:
+    return destination.strip().lower()
+
+
+def _load_store(destination: str) -> Optional[Dict[str, Any]]:
+    store = cache.get(_STORE_NAMESPACE, _store_key(destination), allow_stale=True)
+    return None if store is cache.MISS else store
+
+
+def news_age(destination: str) -> Optional[float]:
+    """
+    Seconds since the destination's articles were last refreshed, None if never.
+    """
+    store = _load_store(destination)
+    return None if store is None else time.time() - store["fetched_at"]
+
+
+def _fetch(destination: str, since: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+    api_key = os.getenv("NEWS_API_KEY")
+    if not api_key:
+        return None
+
+    params = {
+        "q": build_query(destination),
+        "apiKey": api_key,
+        "language": "en",
+        "sortBy": "publishedAt",
+        "pageSize": INCREMENTAL_PAGE_SIZE if since else FIRST_PAGE_SIZE,
+    }
+    if since:
+        params["from"] = since
+
+    response = limited_get("newsapi", NEWS_URL, params=params, timeout=5)
+    data = response.json()
+    if data.get("status") == "ok":
+        return data.get("articles", [])
+    print(f"NewsAPI Error: {data.get('message')}")
+    return None
+
+
+def refresh_news(destination: str) -> Optional[Dict[str, Any]]:
+    """
+    Fetch articles newer than the store's latest and merge them in.
+    On failure the existing store is returned unchanged.
+    """
+    store = _load_store(destination)
+    articles = store["articles"] if store else []
+    since = max((_published(a) for a in articles), default=None)
+
+    try:
+        fetched = _fetch(destination, since)
+    except Exception as e:
+        print(f"News error: {e}")
+        return store
+    if fetched is None:
+        return store
+
+    # `from` is inclusive, so the newest stored article usually comes back again
+    known_urls = {a.get("url") for a in articles}
+    new_articles = [a for a in fetched if a.get("url") not in known_urls and a.get("title") != "[Removed]"]
+
+    merged = collapse_duplicates(articles + new_articles)
+    merged.sort(key=_published, reverse=True)
+    store = {"fetched_at": time.time(), "articles": merged[:MAX_STORED]}
+    cache.put(_STORE_NAMESPACE, _store_key(destination), store, ttl=STORE_TTL_S)
+    return store
+
+
+def get_ranked_news(destination: str, limit: int = 5) -> List[Dict[str, Any]]:
+    """
+    Top articles for a destination, refreshing the store if it's older than NEWS_REFRESH_S.
+    """
+    store = _load_store(destination)
+    if store is None or time.time() - store["fetched_at"] >= REFRESH_INTERVAL_S:
+        store = refresh_news(destination)
+    return rank_articles(store["articles"], limit) if store else []
@@ -0,0 +1,479 @@
+"""
+PDF Rendering
+Rich itinerary PDFs (ReportLab) rendered in a process pool, so a large PDF
+neither blocks the Streamlit script thread nor holds the GIL other sessions
+need. ReportLab, the paragraph styles and the table styles are set up once
+per worker process, and render_pdfs() renders many itineraries in parallel
+for bulk brochure exports:
+
+    python pdf_render.py itinerary1.json itinerary2.json --out brochures/
+
+This module must not import Streamlit or app.py: worker processes are
+spawned and only import what they need to render.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, Dict, List, Optional
+
+import cassette
+
+# Rendering is CPU-bound: one worker per core by default
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "0")) or os.cpu_count() or 1
+PDF_IMAGE_CACHE = 256   # downloaded images kept per worker (brochures reuse covers and attractions)
+
+
+# ============================================================================
+# STYLES (built once per process)
+# ============================================================================
+
+@lru_cache(maxsize=None)
+def pdf_styles() -> Dict[str, Any]:
+    """
+    Paragraph and table styles shared by every section of the itinerary PDF
+    """
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER, TA_LEFT
+    from reportlab.platypus import TableStyle
+
+    styles = getSampleStyleSheet()
+
+    # Custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=26,
+        textColor=colors.HexColor('#2c3e50'),
+        spaceAfter=20,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    )
+
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=18,
+        textColor=colors.HexColor('#e67e22'), # Accent color
+        spaceAfter=12,
+        spaceBefore=20,
+        fontName='Helvetica-Bold',
+        borderPadding=5,
+        borderWidth=0,
+
+    )
+
+    subheading_style = ParagraphStyle(
+        'CustomSubHeading',
+        parent=styles['Heading3'],
+        fontSize=14,
+        textColor=colors.HexColor('#34495e'),
+        spaceAfter=10,
+        fontName='Helvetica-Bold'
+    )
+
+    normal_style = ParagraphStyle(
+        'CustomNormal',
+        parent=styles['Normal'],
+        fontSize=11,
+        alignment=TA_LEFT,
+        spaceAfter=10,
+        leading=16,
+        textColor=colors.HexColor('#2c3e50')
+    )
+
+    center_style = ParagraphStyle(
+        'Center',
+        parent=styles['Normal'],
+        alignment=TA_CENTER
+    )
+
+    details_table = TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ecf0f1')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2c3e50')),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+        ('TOPPADDING', (0, 0), (-1, -1), 10),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.white),
+    ])
+
+    hotel_table = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f7f9f9')),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bdc3c7')),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f2f6')]),
+    ])
+
+    # ReportLab images don't have borders easily, so daily images sit in a single-cell table with a border
+    image_frame = TableStyle([
+        ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#bdc3c7')),
+        ('BACKGROUND', (0, 0), (-1, -1), colors.white),
+        ('ALIGN', (0,0), (-1,-1), 'CENTER')
+    ])
+
+    return {
+        'title': title_style,
+        'heading': heading_style,
+        'subheading': subheading_style,
+        'normal': normal_style,
+        'center': center_style,
+        'details_table': details_table,
+        'hotel_table': hotel_table,
+        'image_frame': image_frame,
+    }
+
+
+# ============================================================================
+# ELEMENTS
+# ============================================================================
+
+@lru_cache(maxsize=PDF_IMAGE_CACHE)
+def _image_bytes(url: str) -> Optional[bytes]:
+    # Through the cassette, so a replayed run renders without the network
+    response = cassette.http_get("images", url, timeout=5)
+    return response.content if response.status_code == 200 else None
+
+
+def fetch_image_for_pdf(url, width_in_inches: float = 4.0):
+    """
+    Fetch image from URL (or take the image bytes as given) and return ReportLab Image object
+    """
+    try:
+        from reportlab.platypus import Image as RLImage
+        from reportlab.lib.units import inch
+
+        content = url if isinstance(url, bytes) else _image_bytes(url)
+        if content:
+            img_data = BytesIO(content)
+            # Create RL Image
+            img = RLImage(img_data)
+            # Scale
+            aspect = img.imageHeight / float(img.imageWidth)
+            return RLImage(img_data, width=width_in_inches*inch, height=(width_in_inches*aspect)*inch)
+    except Exception as e:
+        print(f"PDF Image Fetch Error: {e}")
+        return None
+    return None
+
+
+def _pdf_details_table(rows: List[List[str]], styles: Dict[str, Any]):
+    """
+    Two-column "label: value" table used for the trip and leg summaries
+    """
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Table
+
+    trip_table = Table(rows, colWidths=[2.5*inch, 4*inch])
+    trip_table.setStyle(styles['details_table'])
+    return trip_table
+
+
+def _itinerary_pdf_elements(itinerary_data: Dict, styles: Dict[str, Any], session_images: Dict[str, Any]) -> List:
+    """
+    Hotels, packing, daily plans, gallery and news of one itinerary (or leg)
+    """
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Paragraph, Spacer, Table, PageBreak, KeepTogether
+
+    heading_style = styles['heading']
+    subheading_style = styles['subheading']
+    normal_style = styles['normal']
+    center_style = styles['center']
+    all_images = itinerary_data.get('images', {})
+    elements = []
+
+    # Hotels Section
+    elements.append(Paragraph("🏨 Recommended Hotels", heading_style))
+    hotel_data = [['Hotel Name', 'Price/Night', 'Rating']]
+    for hotel in itinerary_data.get('hotels', []):
+        hotel_data.append([
+            hotel['name'],
+            f"Rs. {hotel['price']}",
+            f"{hotel['rating']}/5"
+        ])
+
+    if len(hotel_data) > 1:
+        hotel_table = Table(hotel_data, colWidths=[3*inch, 1.5*inch, 1.5*inch])
+        hotel_table.setStyle(styles['hotel_table'])
+        elements.append(hotel_table)
+
+    elements.append(Spacer(1, 0.2*inch))
+
+    # Clothing Tips
+    elements.append(Paragraph("🎒 What to Pack", heading_style))
+    elements.append(Paragraph(itinerary_data.get('clothing_tips', ''), normal_style))
+    elements.append(Spacer(1, 0.2*inch))
+
+    # Daily Itineraries with Images
+    elements.append(PageBreak())
+    elements.append(Paragraph("📅 Daily Itinerary", heading_style))
+
+    daily_plans_list = itinerary_data.get('daily_plans_list', [])
+
+    for plan in daily_plans_list:
+        day_num = plan['day']
+
+        # Container for Day Header
+        elements.append(Paragraph(f"Day {day_num}: {plan.get('location', '')}", subheading_style))
+
+        # Text content
+        clean_text = plan['text'].replace('#', '').replace('*', '')
+        elements.append(Paragraph(clean_text, normal_style))
+
+        # Try to find specific daily image
+        img_key = f"img_{itinerary_data['to_place']}_{day_num}"
+        if img_key in session_images:
+            img_url = session_images[img_key]
+            pdf_img = fetch_image_for_pdf(img_url, width_in_inches=5.5)
+            if pdf_img:
+                elements.append(Spacer(1, 0.1*inch))
+                img_table = Table([[pdf_img]], colWidths=[5.5*inch])
+                img_table.setStyle(styles['image_frame'])
+                elements.append(img_table)
+                elements.append(Paragraph(f"<i>AI Visual for Day {day_num}</i>", center_style))
+
+        elements.append(Spacer(1, 0.4*inch))
+
+    # Attractions Gallery
+    elements.append(PageBreak())
+    elements.append(Paragraph("📸 Attractions Gallery", heading_style))
+
+    # Create a flow of images
+    attractions = itinerary_data.get('attractions', [])
+
+    for attr in attractions:
+        img_url = all_images.get(attr['name'])
+        if img_url:
+            pdf_img = fetch_image_for_pdf(img_url, width_in_inches=4.0)
+            if pdf_img:
+                # Keep image and title together in a nice formatted block
+                items = [
+                    Paragraph(f"<b>{attr['name']}</b>", subheading_style),
+                    Paragraph(f"<font color='gray'>{attr['type']}</font>", normal_style),
+                    Spacer(1, 0.05*inch),
+                    pdf_img,
+                    Spacer(1, 0.05*inch),
+                    Paragraph(attr.get('summary', '')[:200] + "...", normal_style),
+                    Spacer(1, 0.3*inch)
+                ]
+                elements.append(KeepTogether(items))
+
+    # Latest News Section
+    news_items = itinerary_data.get('news', [])
+    if news_items:
+        elements.append(PageBreak())
+        elements.append(Paragraph("📰 Latest News & Updates", heading_style))
+
+        for article in news_items:
+            source_name = article.get('source', {}).get('name', 'Source')
+            pub_date = article.get('publishedAt', '')[:10]
+
+            # Title as link if possible (ReportLab supports <a href="...">)
+            article_url = article.get('url', '#')
+            title_text = f'<u><a href="{article_url}" color="blue">{article["title"]}</a></u>'
+
+            items = [
+                Paragraph(title_text, subheading_style),
+                Paragraph(f"<font color='gray' size=9>{source_name} • {pub_date}</font>", normal_style),
+                Spacer(1, 0.05*inch),
+                Paragraph(f"<i>{article.get('description', '') or ''}</i>", normal_style),
+                Spacer(1, 0.2*inch)
+            ]
+            elements.append(KeepTogether(items))
+
+    return elements
+
+
+def render_pdf(itinerary_data: Dict, session_images: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    Rich itinerary PDF with images, as bytes.
+    Multi-city trips get one section per leg after the trip summary.
+    Day visuals in `session_images` are URLs or image bytes.
+    Raises ImportError if ReportLab isn't installed.
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+
+    # Create PDF in memory
+    pdf_buffer = BytesIO()
+    doc = SimpleDocTemplate(pdf_buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
+
+    # Container for PDF elements
+    elements = []
+    styles = pdf_styles()
+    legs = itinerary_data.get('legs') or []
+    session_images = session_images or {}
+
+    # --- CONTENT GENERATION ---
+
+    # Title
+    elements.append(Paragraph(f"✈️ Trip to {itinerary_data['to_place']} 🌍", styles['title']))
+    elements.append(Spacer(1, 0.1*inch))
+    elements.append(Paragraph("<i>Your Personalized Itinerary</i>", styles['center']))
+    elements.append(Spacer(1, 0.3*inch))
+
+    # Cover Image (Try to get one from the attractions or generic)
+    all_images = legs[0].get('images', {}) if legs else itinerary_data.get('images', {})
+    # Find first available image
+    cover_url = None
+    if all_images:
+        cover_url = list(all_images.values())[0]
+
+    if cover_url:
+        cover_img = fetch_image_for_pdf(cover_url, width_in_inches=6.0)
+        if cover_img:
+            elements.append(cover_img)
+            elements.append(Spacer(1, 0.3*inch))
+
+    # Trip Details Section
+    elements.append(Paragraph("Trip Summary", styles['heading']))
+    trip_details = [
+        ['📍 From:', itinerary_data['from_place']],
+        ['📍 To:', itinerary_data['to_place']],
+        ['📅 Duration:', f"{itinerary_data['num_days']} days"],
+        ['👥 Travelers:', f"{itinerary_data['num_people']} people"],
+        ['💰 Budget:', f"INR {itinerary_data['budget']}"], # Safe currency text
+    ]
+    for number, leg in enumerate(legs, 1):
+        trip_details.append([f"🧭 Leg {number}:", f"{leg['to_place']} · {leg['num_days']} days from {leg['start_date']}"])
+    elements.append(_pdf_details_table(trip_details, styles))
+    elements.append(Spacer(1, 0.2*inch))
+
+    if legs:
+        for number, leg in enumerate(legs, 1):
+            elements.append(PageBreak())
+            elements.append(Paragraph(f"🧭 Leg {number}: {leg['to_place']}", styles['title']))
+            elements.append(_pdf_details_table([
+                ['📅 Dates:', f"{leg['num_days']} days from {leg['start_date']}"],
+                ['💰 Budget:', f"INR {leg['budget']}"],
+            ], styles))
+            elements.extend(_itinerary_pdf_elements(leg, styles, session_images))
+    else:
+        elements.extend(_itinerary_pdf_elements(itinerary_data, styles, session_images))
+
+    # Build PDF
+    doc.build(elements)
+
+    # Return PDF bytes
+    return pdf_buffer.getvalue()
+
+
+# ============================================================================
+# PROCESS POOL
+# ============================================================================
+
+def _warm_worker() -> None:
+    # Import ReportLab and build the styles before the first job arrives
+    try:
+        pdf_styles()
+    except ImportError:
+        pass
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def pdf_pool() -> ProcessPoolExecutor:
+    """
+    The process-wide PDF worker pool (PDF_WORKERS processes, default one per core).
+    Workers are spawned rather than forked: the Streamlit server is multi-threaded.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+            )
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def submit_pdf(itinerary_data: Dict, session_images: Optional[Dict[str, Any]] = None) -> Future:
+    """
+    Render in the worker pool; the Future resolves to the PDF bytes.
+    """
+    try:
+        return pdf_pool().submit(render_pdf, itinerary_data, session_images)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM on a huge PDF): start a fresh pool once
+        _reset_pool()
+        return pdf_pool().submit(render_pdf, itinerary_data, session_images)
+
+
+def render_pdfs(itineraries: List[Dict], session_images: Optional[List[Optional[Dict[str, Any]]]] = None,
+                timeout: Optional[float] = None) -> List[Optional[bytes]]:
+    """
+    Bulk API: render many itineraries in parallel across the worker pool.
+    Results are in input order; an itinerary that fails to render gives None.
+    """
+    session_images = session_images or [None] * len(itineraries)
+    jobs = [submit_pdf(itinerary, images) for itinerary, images in zip(itineraries, session_images)]
+    results = []
+    for itinerary, job in zip(itineraries, jobs):
+        try:
+            results.append(job.result(timeout=timeout))
+        except Exception as e:
+            print(f"PDF render error ({itinerary.get('to_place', '?')}): {e}")
+            results.append(None)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render itinerary PDFs in parallel.")
+    parser.add_argument("itineraries", nargs="+", help="JSON files holding itinerary data (as kept in the app session)")
+    parser.add_argument("--out", default=".", help="Output directory (default: current directory)")
+    args = parser.parse_args()
+
+    itineraries = []
+    for path in args.itineraries:
+        with open(path, encoding="utf-8") as f:
+            itineraries.append(json.load(f))
+
+    start = time.time()
+    pdfs = render_pdfs(itineraries)
+    elapsed = time.time() - start
+
+    os.makedirs(args.out, exist_ok=True)
+    failed = 0
+    for path, pdf in zip(args.itineraries, pdfs):
+        if pdf is None:
+            failed += 1
+            continue
+        target = os.path.join(args.out, os.path.splitext(os.path.basename(path))[0] + ".pdf")
+        with open(target, "wb") as f:
+            f.write(pdf)
+    print(f"{len(pdfs) - failed} PDFs in {elapsed:.2f}s with {PDF_WORKERS} workers"
+          + (f" ({failed} failed)" if failed else ""))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Geoapify Places, Tiled
+Places results are cached per geohash tile and category set instead of per
+exact query point, so "Paris" and "Paris 1er" share what's already been
+fetched. A circle query reads the overlapping tiles nearest-first. It stops
+as soon as no unread tile could hold a closer place than the `limit`
+already found, and only fetches the tiles missing from the cache.
+
+Tiles live in the shared provider cache (namespace "geoapify_tiles") for
+PLACES_TILE_TTL_S, 30 days by default, since points of interest change
+slowly. Expired tiles are still used if a refetch fails.
+"""
+
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import cache
+from providers import coalesce, limited_get, submit, time_left
+
+PLACES_URL = "https://api.geoapify.com/v2/places"
+DEFAULT_CATEGORIES = "tourism.attraction,entertainment.museum,religion.place_of_worship"
+
+TILE_PRECISION = int(os.getenv("PLACES_TILE_PRECISION", "5"))   # ~4.9 km x 4.9 km at the equator
+TILE_TTL_S = float(os.getenv("PLACES_TILE_TTL_S", str(30 * 24 * 3600)))
+TILE_LIMIT = 50        # places kept per tile
+FETCH_BATCH = 4        # missing tiles fetched at once (Geoapify's concurrency limit)
+
+_NAMESPACE = "geoapify_tiles"
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_EARTH_RADIUS_M = 6371000.0
+
+# Tile fetches run here so a stage thread can wait on several at once
+_tile_pool = ThreadPoolExecutor(max_workers=FETCH_BATCH * 2, thread_name_prefix="tile")
+
+_stats_lock = threading.Lock()
+_stats = {"queries": 0, "tiles_read": 0, "cache_hits": 0, "stale_hits": 0, "fetched": 0, "failed": 0}
+
+
+# ============================================================================
+# GEOHASH
+# ============================================================================
+
+def _bits(precision: int) -> Tuple[int, int]:
+    """
+    (latitude bits, longitude bits) of a geohash; longitude gets the odd bit.
+    """
+    total = 5 * precision
+    return total // 2, total - total // 2
+
+
+def encode(latitude: float, longitude: float, precision: int = TILE_PRECISION) -> str:
+    lat_bits, lon_bits = _bits(precision)
+    row = min(int((latitude + 90) / 180 * (1 << lat_bits)), (1 << lat_bits) - 1)
+    col = min(int((longitude + 180) / 360 * (1 << lon_bits)), (1 << lon_bits) - 1)
+    return _from_cell(row, col, precision)
+
+
+def _from_cell(row: int, col: int, precision: int) -> str:
+    lat_bits, lon_bits = _bits(precision)
+    value = 0
+    for i in range(5 * precision):
+        # Bits alternate lon, lat, lon, ... starting from the most significant
+        if i % 2 == 0:
+            lon_bits -= 1
+            bit = (col >> lon_bits) & 1
+        else:
+            lat_bits -= 1
+            bit = (row >> lat_bits) & 1
+        value = (value << 1) | bit
+    return "".join(_BASE32[(value >> (5 * (precision - 1 - i))) & 31] for i in range(precision))
+
+
+def bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """
+    (south, west, north, east) of a geohash tile.
+    """
+    precision = len(geohash)
+    lat_bits, lon_bits = _bits(precision)
+    value = 0
+    for char in geohash:
+        value = (value << 5) | _BASE32.index(char)
+    row = col = 0
+    for i in range(5 * precision):
+        bit = (value >> (5 * precision - 1 - i)) & 1
+        if i % 2 == 0:
+            col = (col << 1) | bit
+        else:
+            row = (row << 1) | bit
+    lat_step, lon_step = 180 / (1 << lat_bits), 360 / (1 << lon_bits)
+    south, west = row * lat_step - 90, col * lon_step - 180
+    return south, west, south + lat_step, west + lon_step
+
+
+def _distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((p2 - p1) / 2) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * _EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _tile_distance_m(latitude: float, longitude: float, geohash: str) -> float:
+    """
+    Distance from a point to the nearest edge of a tile (0 inside it).
+    """
+    south, west, north, east = bounds(geohash)
+    return _distance_m(latitude, longitude, min(max(latitude, south), north), min(max(longitude, west), east))
+
+
+def covering_tiles(latitude: float, longitude: float, radius_m: float,
+                   precision: int = TILE_PRECISION) -> List[Tuple[float, str]]:
+    """
+    (distance, geohash) of every tile overlapping the circle, nearest first.
+    """
+    lat_bits, lon_bits = _bits(precision)
+    lat_step, lon_step = 180 / (1 << lat_bits), 360 / (1 << lon_bits)
+    dlat = math.degrees(radius_m / _EARTH_RADIUS_M)
+    dlon = dlat / max(math.cos(math.radians(latitude)), 0.01)
+
+    first_row = max(int((latitude - dlat + 90) / lat_step), 0)
+    last_row = min(int((latitude + dlat + 90) / lat_step), (1 << lat_bits) - 1)
+    first_col, last_col = int((longitude - dlon + 180) // lon_step), int((longitude + dlon + 180) // lon_step)
+
+    tiles = []
+    for row in range(first_row, last_row + 1):
+        for col in range(first_col, last_col + 1):
+            geohash = _from_cell(row, col % (1 << lon_bits), precision)  # wraps at the antimeridian
+            distance = _tile_distance_m(latitude, longitude, geohash)
+            if distance <= radius_m:
+                tiles.append((distance, geohash))
+    return sorted(tiles)
+
+
+# ============================================================================
+# TILE CACHE
+# ============================================================================
+
+def _count(**increments: int) -> None:
+    with _stats_lock:
+        for field, n in increments.items():
+            _stats[field] += n
+
+
+def tile_key(geohash: str, categories: str) -> str:
+    return f"{','.join(sorted(categories.split(',')))}|{geohash}"
+
+
+def tile_expires_in(geohash: str, categories: str = DEFAULT_CATEGORIES) -> Optional[float]:
+    return cache.expires_in(_NAMESPACE, tile_key(geohash, categories))
+
+
+@coalesce
+def fetch_tile(geohash: str, categories: str, api_key: str) -> Optional[List[list]]:
+    """
+    Download one tile's places and store them. Each place is a compact
+    [name, category, lat, lon, address] row. Returns None on failure.
+    """
+    south, west, north, east = bounds(geohash)
+    params = {
+        "categories": categories,
+        "filter": f"rect:{west},{south},{east},{north}",
+        "limit": TILE_LIMIT,
+        "apiKey": api_key,
+        "lang": "en",
+    }
+    response = limited_get("geoapify", PLACES_URL, params=params, timeout=time_left(5))
+    if response.status_code != 200:
+        return None
+
+    rows = []
+    for feature in response.json().get("features", []):
+        props = feature.get("properties", {})
+        lat, lon = props.get("lat"), props.get("lon")
+        # Skip unnamed places, and anything outside the tile so it's never stored twice
+        if not props.get("name") or lat is None or lon is None:
+            continue
+        if not (south <= lat < north and west <= lon < east):
+            continue
+        rows.append([
+            props["name"],
+            (props.get("categories") or ["landmark"])[0],
+            lat,
+            lon,
+            props.get("formatted", f"Located at {props.get('address_line2', 'city center')}"),
+        ])
+    # Empty tiles (sea, desert) are cached too, so they aren't asked for again
+    cache.put(_NAMESPACE, tile_key(geohash, categories), rows, TILE_TTL_S)
+    return rows
+
+
+def _fetch_or_stale(geohash: str, categories: str, api_key: str) -> Optional[List[list]]:
+    try:
+        rows = fetch_tile(geohash, categories, api_key)
+    except Exception as e:
+        print(f"Geoapify tile {geohash} error: {e}")
+        rows = None
+    if rows is not None:
+        _count(fetched=1)
+        return rows
+
+    stale = cache.get(_NAMESPACE, tile_key(geohash, categories), allow_stale=True)
+    if stale is cache.MISS:
+        _count(failed=1)
+        return None
+    _count(stale_hits=1)
+    return stale
+
+
+def _read_tiles(geohashes: List[str], categories: str, api_key: str) -> List[Optional[List[list]]]:
+    """
+    Each tile's rows: from the cache when fresh, otherwise fetched concurrently.
+    """
+    found: Dict[str, Any] = {g: cache.get(_NAMESPACE, tile_key(g, categories)) for g in geohashes}
+    hits = sum(rows is not cache.MISS for rows in found.values())
+    _count(tiles_read=len(geohashes), cache_hits=hits)
+
+    missing = [g for g, rows in found.items() if rows is cache.MISS]
+    if missing:
+        jobs = {g: submit(_tile_pool, _fetch_or_stale, g, categories, api_key) for g in missing}
+        for g, job in jobs.items():
+            try:
+                found[g] = job.result(timeout=time_left())
+            except Exception:
+                # Out of time: go on with the tiles that are already here
+                _count(failed=1)
+                found[g] = None
+    return [found[g] for g in geohashes]
+
+
+def nearby_places(latitude: float, longitude: float, api_key: str, radius_m: float = 10000,
+                  categories: str = DEFAULT_CATEGORIES, limit: int = 5) -> List[Dict[str, Any]]:
+    """
+    The `limit` places nearest to the point within `radius_m`, nearest first.
+    """
+    _count(queries=1)
+    tiles = covering_tiles(latitude, longitude, radius_m)
+    found: List[Tuple[float, list]] = []
+
+    i = 0
+    while i < len(tiles):
+        # Enough places closer than any tile not read yet
+        if len(found) >= limit and found[limit - 1][0] <= tiles[i][0]:
+            break
+        batch = [geohash for _, geohash in tiles[i:i + FETCH_BATCH]]
+        i += len(batch)
+        for rows in _read_tiles(batch, categories, api_key):
+            for row in rows or []:
+                distance = _distance_m(latitude, longitude, row[2], row[3])
+                if distance <= radius_m:
+                    found.append((distance, row))
+        found.sort(key=lambda item: item[0])
+
+    return [{
+        "name": name,
+        "category": category,
+        "lat": lat,
+        "lon": lon,
+        "address": address,
+        "distance_m": round(distance),
+    } for distance, (name, category, lat, lon, address) in found[:limit]]
+
+
+def tile_stats() -> Dict[str, Any]:
+    """
+    Tile cache counters for this process; `coverage` is the share of tile
+    reads answered from the cache without a fetch.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["coverage"] = round(stats["cache_hits"] / stats["tiles_read"], 3) if stats["tiles_read"] else None
+    return stats
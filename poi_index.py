@@ -0,0 +1,363 @@
+"""
+Offline POI Index
+Compact, memory-mapped spatial index of tourism points of interest, used as a
+local attraction source next to (or instead of) the Geoapify Places API.
+
+Build once from a GeoNames dump (allCountries.txt / <CC>.txt) or an OSM
+GeoJSON export (e.g. `osmium export` or an Overpass query):
+    python poi_index.py build allCountries.txt --out .cache/poi_index
+    python poi_index.py build goa_pois.geojson --out .cache/poi_index
+    python poi_index.py query 15.4909 73.8278 --radius 10 --limit 6
+
+On-disk layout (all .npy, opened with mmap_mode="r"):
+    cell.npy      uint32  grid cell of each POI, sorted ascending
+    coords.npy    float32 (N, 2) lat/lon
+    score.npy     float32 popularity score
+    kind.npy      uint8   index into meta.json "kinds"
+    name_off.npy  uint32  (N + 1) offsets into names.npy
+    names.npy     uint8   UTF-8 string table
+    meta.json     cell size, kinds, counts, source
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_INDEX_PATH = os.getenv(
+    "POI_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "poi_index")
+)
+
+CELL_DEG = 0.1  # ~11 km at the equator; a 10 km query touches a handful of cells
+EARTH_RADIUS_KM = 6371.0
+
+# GeoNames feature code -> (kind, base score)
+GEONAMES_KINDS = {
+    "MUS": ("Museum", 3.0),
+    "MNMT": ("Monument", 3.0),
+    "CSTL": ("Castle", 3.0),
+    "PAL": ("Palace", 3.0),
+    "HSTS": ("Historic Site", 2.5),
+    "ANS": ("Ancient Site", 2.5),
+    "RUIN": ("Ruins", 2.0),
+    "FT": ("Fort", 2.5),
+    "AMTH": ("Amphitheater", 2.0),
+    "TMPL": ("Temple", 2.0),
+    "MSQE": ("Mosque", 2.0),
+    "CH": ("Church", 1.5),
+    "CTRR": ("Religious Center", 1.5),
+    "SHRN": ("Shrine", 1.5),
+    "TOWR": ("Tower", 1.5),
+    "ZOO": ("Zoo", 2.0),
+    "GDN": ("Garden", 2.0),
+    "PRK": ("Park", 1.5),
+    "OBPT": ("Viewpoint", 2.0),
+    "BCH": ("Beach", 2.0),
+    "SQR": ("Square", 1.5),
+    "LTHSE": ("Lighthouse", 1.5),
+    "BDG": ("Bridge", 1.0),
+    "WALL": ("Wall", 1.0),
+}
+
+# OSM tag=value -> (kind, base score); checked in order
+OSM_KINDS = [
+    ("tourism", "museum", "Museum", 3.0),
+    ("tourism", "attraction", "Attraction", 2.5),
+    ("tourism", "gallery", "Gallery", 2.0),
+    ("tourism", "viewpoint", "Viewpoint", 2.0),
+    ("tourism", "zoo", "Zoo", 2.0),
+    ("tourism", "theme_park", "Theme Park", 2.0),
+    ("tourism", "aquarium", "Aquarium", 2.0),
+    ("historic", "castle", "Castle", 3.0),
+    ("historic", "monument", "Monument", 3.0),
+    ("historic", "fort", "Fort", 2.5),
+    ("historic", "ruins", "Ruins", 2.0),
+    ("historic", "archaeological_site", "Ancient Site", 2.5),
+    ("historic", "memorial", "Memorial", 1.0),
+    ("amenity", "place_of_worship", "Place Of Worship", 1.5),
+    ("amenity", "theatre", "Theatre", 1.5),
+    ("leisure", "park", "Park", 1.5),
+    ("leisure", "garden", "Garden", 2.0),
+    ("natural", "beach", "Beach", 2.0),
+]
+
+
+# ============================================================================
+# IMPORT
+# ============================================================================
+
+def _read_geonames(path: str) -> Iterator[Tuple[str, float, float, str, float]]:
+    """
+    Yield (name, lat, lon, kind, score) from a GeoNames tab-separated dump.
+    Alternate-name count is a decent fame proxy: famous places are translated a lot.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) < 8:
+                continue
+            feature = GEONAMES_KINDS.get(cols[7])
+            if not feature or not cols[1]:
+                continue
+            try:
+                lat, lon = float(cols[4]), float(cols[5])
+            except ValueError:
+                continue
+            alt_names = cols[3].count(",") + 1 if cols[3] else 0
+            yield cols[1], lat, lon, feature[0], feature[1] + math.log1p(alt_names)
+
+
+def _read_osm_geojson(path: str) -> Iterator[Tuple[str, float, float, str, float]]:
+    """
+    Yield (name, lat, lon, kind, score) from an OSM GeoJSON export.
+    Non-point features are reduced to the mean of their first ring/line.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    for feature in data.get("features", []):
+        props = feature.get("properties") or {}
+        tags = props.get("tags", props)
+        name = tags.get("name:en") or tags.get("name")
+        if not name:
+            continue
+
+        match = next(((kind, score) for key, value, kind, score in OSM_KINDS if tags.get(key) == value), None)
+        if not match:
+            continue
+
+        geometry = feature.get("geometry") or {}
+        coords = geometry.get("coordinates")
+        if not coords:
+            continue
+        # Drill down to a list of [lon, lat] points
+        while isinstance(coords[0], list) and isinstance(coords[0][0], list):
+            coords = coords[0]
+        points = coords if isinstance(coords[0], list) else [coords]
+        lon = sum(p[0] for p in points) / len(points)
+        lat = sum(p[1] for p in points) / len(points)
+
+        score = match[1]
+        if tags.get("wikidata") or tags.get("wikipedia"):
+            score += 2.0
+        yield name, lat, lon, match[0], score
+
+
+def _cell_of(lat: np.ndarray, lon: np.ndarray, cell_deg: float) -> np.ndarray:
+    n_cols = int(math.ceil(360 / cell_deg))
+    rows = np.floor((np.clip(lat, -90, 89.9999) + 90) / cell_deg).astype(np.int64)
+    cols = np.floor((np.mod(lon + 180, 360)) / cell_deg).astype(np.int64)
+    return rows * n_cols + cols
+
+
+def build_index(source: str, out_dir: str, cell_deg: float = CELL_DEG) -> Dict[str, Any]:
+    """
+    Build the index from a GeoNames .txt or OSM .geojson extract.
+    """
+    reader = _read_osm_geojson if source.endswith((".geojson", ".json")) else _read_geonames
+
+    names: List[bytes] = []
+    lats: List[float] = []
+    lons: List[float] = []
+    kinds: List[str] = []
+    scores: List[float] = []
+    for name, lat, lon, kind, score in reader(source):
+        names.append(name.encode("utf-8"))
+        lats.append(lat)
+        lons.append(lon)
+        kinds.append(kind)
+        scores.append(score)
+
+    kind_table = sorted(set(kinds))
+    kind_ids = {kind: i for i, kind in enumerate(kind_table)}
+
+    lat_arr = np.asarray(lats, dtype=np.float64)
+    lon_arr = np.asarray(lons, dtype=np.float64)
+    cells = _cell_of(lat_arr, lon_arr, cell_deg)
+    order = np.argsort(cells, kind="stable")
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "cell.npy"), cells[order].astype(np.uint32))
+    np.save(os.path.join(out_dir, "coords.npy"),
+            np.stack([lat_arr[order], lon_arr[order]], axis=1).astype(np.float32))
+    np.save(os.path.join(out_dir, "score.npy"), np.asarray(scores, dtype=np.float32)[order])
+    np.save(os.path.join(out_dir, "kind.npy"),
+            np.asarray([kind_ids[k] for k in kinds], dtype=np.uint8)[order] if kinds else np.zeros(0, np.uint8))
+
+    ordered_names = [names[i] for i in order]
+    lengths = np.fromiter((len(n) for n in ordered_names), dtype=np.uint32, count=len(ordered_names))
+    offsets = np.zeros(len(ordered_names) + 1, dtype=np.uint32)
+    np.cumsum(lengths, out=offsets[1:])
+    np.save(os.path.join(out_dir, "name_off.npy"), offsets)
+    np.save(os.path.join(out_dir, "names.npy"), np.frombuffer(b"".join(ordered_names), dtype=np.uint8))
+
+    meta = {
+        "count": len(ordered_names),
+        "cell_deg": cell_deg,
+        "kinds": kind_table,
+        "source": os.path.basename(source),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+# ============================================================================
+# QUERY
+# ============================================================================
+
+class POIIndex:
+    """
+    Read-only view over a built index. Arrays are memory-mapped, so opening
+    is instant and the OS page cache is shared between processes.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        # Plain ndarray views over the maps: same pages, without np.memmap's per-op overhead
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r").view(np.ndarray)
+        self.cell = load("cell.npy")
+        self.coords = load("coords.npy")
+        self.score = load("score.npy")
+        self.kind = load("kind.npy")
+        self.name_off = load("name_off.npy")
+        self.names = load("names.npy")
+        self.cell_deg = self.meta["cell_deg"]
+        self.n_cols = int(math.ceil(360 / self.cell_deg))
+        self.kinds = self.meta["kinds"]
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    def name(self, i: int) -> str:
+        return bytes(self.names[self.name_off[i]:self.name_off[i + 1]]).decode("utf-8")
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """
+        Indices of POIs in the grid cells overlapping the query's bounding box.
+        Each grid row is one contiguous cell-id range, so it costs two binary searches.
+        """
+        dlat = radius_km / 111.0
+        dlon = radius_km / max(1e-6, 111.0 * math.cos(math.radians(lat)))
+        row_lo = int((max(-90.0, lat - dlat) + 90) // self.cell_deg)
+        row_hi = int((min(89.9999, lat + dlat) + 90) // self.cell_deg)
+        col_lo = int((lon - dlon + 180) // self.cell_deg)
+        col_hi = int((lon + dlon + 180) // self.cell_deg)
+
+        # Split column spans that wrap around the antimeridian
+        if col_hi - col_lo + 1 >= self.n_cols:
+            spans = [(0, self.n_cols - 1)]
+        else:
+            lo, hi = col_lo % self.n_cols, col_hi % self.n_cols
+            spans = [(lo, hi)] if lo <= hi else [(lo, self.n_cols - 1), (0, hi)]
+
+        # Bounds must match the array dtype, otherwise numpy upcasts (copies) the whole map per search
+        bases = np.arange(row_lo, row_hi + 1, dtype=np.int64) * self.n_cols
+        lows = np.concatenate([bases + lo for lo, _ in spans]).astype(self.cell.dtype)
+        highs = np.concatenate([bases + hi for _, hi in spans]).astype(self.cell.dtype)
+        starts = np.searchsorted(self.cell, lows, side="left")
+        ends = np.searchsorted(self.cell, highs, side="right")
+
+        ranges = [np.arange(start, end) for start, end in zip(starts, ends) if end > start]
+        return np.concatenate(ranges) if ranges else np.zeros(0, dtype=np.int64)
+
+    def nearby(self, lat: float, lon: float, radius_km: float = 10.0, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Top `limit` POIs within `radius_km`, ranked by score then distance.
+        """
+        idx = self._candidates(lat, lon, radius_km)
+        if idx.size == 0:
+            return []
+
+        pts = np.asarray(self.coords[idx], dtype=np.float64)
+        plat, plon = np.radians(pts[:, 0]), np.radians(pts[:, 1])
+        qlat, qlon = math.radians(lat), math.radians(lon)
+        a = (np.sin((plat - qlat) / 2) ** 2
+             + math.cos(qlat) * np.cos(plat) * np.sin((plon - qlon) / 2) ** 2)
+        dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(1.0, a)))
+
+        inside = dist <= radius_km
+        idx, dist = idx[inside], dist[inside]
+        if idx.size == 0:
+            return []
+
+        # Primary key score (desc), secondary distance (asc)
+        order = np.lexsort((dist, -np.asarray(self.score[idx])))[:limit]
+        results = []
+        for j in order:
+            i = int(idx[j])
+            results.append({
+                "name": self.name(i),
+                "type": self.kinds[int(self.kind[i])],
+                "lat": float(self.coords[i, 0]),
+                "lon": float(self.coords[i, 1]),
+                "distance_km": round(float(dist[j]), 2),
+                "score": round(float(self.score[i]), 2),
+            })
+        return results
+
+
+_indexes: Dict[str, Optional[POIIndex]] = {}
+_indexes_lock = threading.Lock()
+
+
+def load_index(path: str = DEFAULT_INDEX_PATH) -> Optional[POIIndex]:
+    """
+    Open (once per process) the index at `path`, or None if it hasn't been built.
+    """
+    with _indexes_lock:
+        if path not in _indexes:
+            try:
+                _indexes[path] = POIIndex(path) if os.path.exists(os.path.join(path, "meta.json")) else None
+            except Exception as e:
+                print(f"POI index load error: {e}")
+                _indexes[path] = None
+        return _indexes[path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the offline POI index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Build the index from a GeoNames .txt or OSM .geojson file")
+    build.add_argument("source")
+    build.add_argument("--out", default=DEFAULT_INDEX_PATH)
+    build.add_argument("--cell-deg", type=float, default=CELL_DEG)
+
+    query = sub.add_parser("query", help="Top POIs around a point")
+    query.add_argument("lat", type=float)
+    query.add_argument("lon", type=float)
+    query.add_argument("--radius", type=float, default=10.0)
+    query.add_argument("--limit", type=int, default=5)
+    query.add_argument("--index", default=DEFAULT_INDEX_PATH)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.time()
+        meta = build_index(args.source, args.out, args.cell_deg)
+        print(f"✅ Indexed {meta['count']} POIs into {args.out} in {time.time() - start:.1f}s")
+        return
+
+    index = load_index(args.index)
+    if index is None:
+        sys.exit(f"No index at {args.index}. Build one first with: python poi_index.py build <file>")
+    start = time.perf_counter()
+    results = index.nearby(args.lat, args.lon, args.radius, args.limit)
+    elapsed_us = (time.perf_counter() - start) * 1e6
+    for poi in results:
+        print(f"{poi['score']:5.2f}  {poi['distance_km']:5.2f} km  {poi['type']:<16} {poi['name']}")
+    print(f"({len(results)} results in {elapsed_us:.0f} µs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,866 @@
+"""
+Provider Call Helpers
+Shared, process-wide coordination for every external API the planner talks to.
+
+Streamlit re-executes app.py on every rerun, so anything that must be shared
+between sessions (rate limiters, in-flight calls, worker pools, ...) lives in this module,
+which is imported once per process.
+"""
+
+import contextvars
+import copy
+import functools
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from dotenv import load_dotenv
+
+import cassette
+
+load_dotenv()
+
+# ============================================================================
+# DEADLINES
+# ============================================================================
+
+class DeadlineExceeded(Exception):
+    """Raised by provider calls once the current time budget is spent."""
+
+
+class Deadline:
+    """
+    Time budget shared by every provider call made inside `with deadline(...)`.
+    Nested scopes share their parent's expiry and report back when cut short.
+    """
+
+    def __init__(self, expires_at: float, parent: Optional["Deadline"] = None):
+        self.expires_at = expires_at
+        self.parent = parent
+        self.cut_short = False
+        self.degraded: List[str] = []
+
+    @property
+    def root(self) -> "Deadline":
+        return self.parent.root if self.parent else self
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def mark_cut_short(self) -> None:
+        self.cut_short = True
+        if self.parent:
+            self.parent.mark_cut_short()
+
+
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar("provider_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Optional[float] = None):
+    """
+    Open a deadline scope. Without `seconds` it inherits the enclosing scope
+    (handy to find out whether one particular call was cut short); a nested
+    scope can shorten the budget but never extend it. Yields None when there
+    is no deadline at all.
+    """
+    parent = _current_deadline.get()
+    expires_at = parent.expires_at if parent else None
+    if seconds is not None:
+        own = time.monotonic() + seconds
+        expires_at = own if expires_at is None else min(expires_at, own)
+
+    if expires_at is None:
+        yield None
+        return
+
+    scope = Deadline(expires_at, parent)
+    token = _current_deadline.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def time_left(default: Optional[float] = None) -> Optional[float]:
+    """
+    Seconds a call may take: the helper's own `default` timeout capped by the
+    current deadline. Raises DeadlineExceeded once the budget is spent.
+    """
+    scope = _current_deadline.get()
+    if scope is None:
+        return default
+    remaining = scope.remaining()
+    if remaining <= 0:
+        scope.mark_cut_short()
+        raise DeadlineExceeded("time budget spent")
+    return remaining if default is None else min(default, remaining)
+
+
+def _out_of_time() -> bool:
+    """
+    True (and the scope marked) if the current deadline has effectively run out.
+    """
+    scope = _current_deadline.get()
+    if scope is not None and scope.remaining() <= 0.05:
+        scope.mark_cut_short()
+        return True
+    return False
+
+
+def submit(pool: ThreadPoolExecutor, fn: Callable, *args, **kwargs) -> Future:
+    """
+    pool.submit() that carries the caller's context (and so its deadline) into the worker.
+    """
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+# Independent generation stages (weather, attractions, hotels, ...) run here concurrently
+stage_pool = ThreadPoolExecutor(max_workers=int(os.getenv("STAGE_POOL_SIZE", "32")),
+                                thread_name_prefix="stage")
+
+
+# ============================================================================
+# RATE LIMITING
+# ============================================================================
+
+# provider: (requests per second, burst size, max concurrent requests)
+# Override any of them with e.g. RATE_LIMIT_GEOAPIFY="5,10,4" in .env
+DEFAULT_QUOTAS = {
+    "open_meteo": (10.0, 20, 8),
+    "open_meteo_archive": (1.0, 2, 2),
+    "geoapify": (5.0, 10, 4),
+    "serpapi": (1.0, 2, 2),
+    "newsapi": (1.0, 3, 2),
+    "unsplash": (1.0, 5, 3),
+    "duckduckgo": (1.0, 3, 2),
+    "wikipedia": (10.0, 20, 6),
+    "openai": (3.0, 6, 4),
+}
+
+# How long a caller may queue for a slot before giving up (seconds)
+MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "10"))
+
+# Status codes that mean "slow down" rather than "your request is wrong"
+THROTTLE_STATUS = (429, 503)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a provider slot could not be obtained within the wait budget."""
+
+
+class ProviderLimiter:
+    """
+    Token bucket + adaptive concurrency limit for a single provider.
+
+    Tokens refill at `rate` per second up to `burst`. Concurrency follows
+    AIMD: every success nudges the limit up towards `max_concurrency`,
+    every throttle/error halves it. A Retry-After pauses the bucket entirely.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, max_concurrency: int):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.concurrency_limit = float(max_concurrency)
+
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._cond = threading.Condition()
+
+        self.stats = {"calls": 0, "throttled": 0, "errors": 0, "waited_s": 0.0, "rejected": 0}
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def acquire(self, timeout: Optional[float] = None, abandon: Optional[Callable[[], bool]] = None,
+                paced: bool = True) -> None:
+        """
+        Block until a token and a concurrency slot are available.
+        Raises RateLimitExceeded if that takes longer than `timeout`, or as
+        soon as `abandon()` turns true while waiting. paced=False needs only
+        the concurrency slot (nothing goes upstream, e.g. a fast replay).
+        """
+        timeout = MAX_WAIT if timeout is None else timeout
+        start = time.monotonic()
+        give_up_at = start + timeout
+
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+
+                if ((not paced or (now >= self._blocked_until and self._tokens >= 1))
+                        and self._in_flight < max(1, int(self.concurrency_limit))):
+                    self._tokens = max(0.0, self._tokens - 1)
+                    self._in_flight += 1
+                    self.stats["calls"] += 1
+                    self.stats["waited_s"] += now - start
+                    return
+
+                # Paused past our wait budget: fail fast instead of queueing for nothing
+                if now >= give_up_at or self._blocked_until > give_up_at or (abandon and abandon()):
+                    self.stats["rejected"] += 1
+                    raise RateLimitExceeded(f"{self.name}: no slot within {timeout:.1f}s")
+
+                # Sleep until the earliest moment something could change
+                wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.05
+                wait = max(wait, self._blocked_until - now, 0.01)
+                self._cond.wait(min(wait, give_up_at - now))
+
+    def release(self, ok: Optional[bool] = True) -> None:
+        """
+        Return a concurrency slot and feed the outcome into the AIMD controller
+        (ok=None: the call never went out, leave the limit alone).
+        """
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            if ok is None:
+                pass
+            elif ok:
+                # Additive increase: one full slot per `limit` successes
+                self.concurrency_limit = min(
+                    self.max_concurrency,
+                    self.concurrency_limit + 1.0 / max(1.0, self.concurrency_limit)
+                )
+            else:
+                self.stats["errors"] += 1
+                self.concurrency_limit = max(1.0, self.concurrency_limit / 2)
+            self._cond.notify_all()
+
+    def backoff(self, retry_after: Optional[float]) -> None:
+        """
+        Pause the whole provider after a throttle response.
+        """
+        # No hint from the server: exponential-ish pause based on how hard we are backing off
+        if retry_after is None:
+            retry_after = min(30.0, 1.0 * self.max_concurrency / self.concurrency_limit)
+        retry_after += random.uniform(0, 0.25)  # jitter so queued callers don't stampede
+
+        with self._cond:
+            self.stats["throttled"] += 1
+            self._tokens = 0
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self.stats,
+                "in_flight": self._in_flight,
+                "concurrency_limit": round(self.concurrency_limit, 2),
+                "blocked_for_s": round(max(0.0, self._blocked_until - time.monotonic()), 2),
+            }
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _load_quota(provider: str):
+    rate, burst, concurrency = DEFAULT_QUOTAS.get(provider, (2.0, 4, 2))
+    override = os.getenv(f"RATE_LIMIT_{provider.upper()}")
+    if override:
+        try:
+            parts = [p.strip() for p in override.split(",")]
+            rate = float(parts[0])
+            burst = int(parts[1]) if len(parts) > 1 else burst
+            concurrency = int(parts[2]) if len(parts) > 2 else concurrency
+        except ValueError:
+            print(f"Ignoring invalid RATE_LIMIT_{provider.upper()}={override!r}")
+    return rate, burst, concurrency
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """
+    Return the shared limiter for a provider, creating it on first use.
+    """
+    with _limiters_lock:
+        if provider not in _limiters:
+            _limiters[provider] = ProviderLimiter(provider, *_load_quota(provider))
+        return _limiters[provider]
+
+
+def rate_limit_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Current counters for every provider that has been used in this process.
+    """
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.snapshot() for limiter in limiters}
+
+
+# ============================================================================
+# PROVIDER HEALTH & CIRCUIT BREAKERS
+# ============================================================================
+
+# Rolling window of outcomes kept per provider
+HEALTH_WINDOW = int(os.getenv("HEALTH_WINDOW", "50"))
+# Consecutive failures that open a provider's circuit
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "3"))
+# First cooldown of an open circuit; doubles after every failed probe, up to the max
+BREAKER_COOLDOWN_S = float(os.getenv("BREAKER_COOLDOWN_S", "30"))
+BREAKER_MAX_COOLDOWN_S = float(os.getenv("BREAKER_MAX_COOLDOWN_S", "300"))
+# p95 latency at which a provider's health score is halved
+HEALTH_SLOW_S = float(os.getenv("HEALTH_SLOW_S", "2.0"))
+
+# Responses that mean the provider (or our key for it) is broken, not the request
+FAILURE_STATUS = (401, 403)
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+class ProviderHealth:
+    """
+    Rolling success rate and latency of one provider, plus its circuit breaker.
+
+    After BREAKER_FAILURES consecutive failures the circuit opens and calls
+    fail fast with CircuitOpen. Once the cooldown has passed a single probe
+    call is let through: success closes the circuit, failure re-opens it with
+    twice the cooldown. Throttles and spent deadlines are neutral outcomes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._outcomes = deque(maxlen=HEALTH_WINDOW)  # (ok, latency seconds)
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._cooldown = BREAKER_COOLDOWN_S
+        self._probing = False
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "failures": 0, "short_circuited": 0, "opened": 0}
+
+    def _state(self, now: float) -> str:
+        if self._open_until == 0.0:
+            return "closed"
+        return "open" if now < self._open_until or self._probing else "half_open"
+
+    def check(self) -> bool:
+        """
+        Let a call through, or raise CircuitOpen. In half-open state only one
+        call passes; True means that call is the recovery probe.
+        """
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == "closed":
+                return False
+            if state == "half_open":
+                self._probing = True
+                return True
+        self.reject()
+
+    def reject(self) -> None:
+        with self._lock:
+            self.stats["short_circuited"] += 1
+            retry_in = max(0.0, self._open_until - time.monotonic())
+        raise CircuitOpen(f"{self.name}: circuit open, next probe in {retry_in:.0f}s")
+
+    def record(self, ok: Optional[bool], latency: float = 0.0, probe: bool = False) -> None:
+        """
+        Feed one call's outcome in; None means neutral (throttled, out of time).
+        """
+        with self._lock:
+            if probe:
+                self._probing = False
+            if ok is None:
+                return
+            if ok and probe:
+                self._outcomes.clear()  # recovered: judge it on fresh calls, not the outage
+            self._outcomes.append((ok, latency))
+            self.stats["calls"] += 1
+            if ok:
+                self._consecutive_failures = 0
+                self._open_until = 0.0
+                self._cooldown = BREAKER_COOLDOWN_S
+                return
+
+            self.stats["failures"] += 1
+            self._consecutive_failures += 1
+            if probe:
+                self._cooldown = min(BREAKER_MAX_COOLDOWN_S, self._cooldown * 2)
+            if probe or (self._open_until == 0.0 and self._consecutive_failures >= BREAKER_FAILURES):
+                if self._open_until == 0.0:
+                    self.stats["opened"] += 1
+                self._open_until = time.monotonic() + self._cooldown
+
+    def probe_due(self) -> bool:
+        with self._lock:
+            return self._state(time.monotonic()) == "half_open"
+
+    def available(self) -> bool:
+        """
+        False while calls would be short-circuited (open circuit or probe in flight).
+        """
+        with self._lock:
+            return self._state(time.monotonic()) != "open"
+
+    def _latency_percentile(self, q: float) -> Optional[float]:
+        latencies = sorted(latency for ok, latency in self._outcomes if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def score(self) -> float:
+        """
+        Laplace-smoothed success rate, discounted for slow p95 latency (0..1).
+        """
+        with self._lock:
+            successes = sum(ok for ok, _ in self._outcomes)
+            success_rate = (successes + 1) / (len(self._outcomes) + 2)
+            p95 = self._latency_percentile(0.95)
+        return success_rate / (1 + (p95 or 0.0) / HEALTH_SLOW_S)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            outcomes = list(self._outcomes)
+            p50, p95 = self._latency_percentile(0.5), self._latency_percentile(0.95)
+            state = self._state(now)
+            open_for = max(0.0, self._open_until - now) if state == "open" else 0.0
+            stats = dict(self.stats)
+        return {
+            "state": state,
+            "success_rate": round(sum(ok for ok, _ in outcomes) / len(outcomes), 2) if outcomes else None,
+            "p50_s": None if p50 is None else round(p50, 2),
+            "p95_s": None if p95 is None else round(p95, 2),
+            "score": round(self.score(), 2),
+            "open_for_s": round(open_for, 1),
+            **stats,
+        }
+
+
+_health: Dict[str, ProviderHealth] = {}
+_health_lock = threading.Lock()
+
+
+def get_health(provider: str) -> ProviderHealth:
+    """
+    Return the shared health tracker for a provider, creating it on first use.
+    """
+    with _health_lock:
+        if provider not in _health:
+            _health[provider] = ProviderHealth(provider)
+        return _health[provider]
+
+
+def health_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Circuit state, success rate and latency percentiles for every provider used so far.
+    """
+    with _health_lock:
+        trackers = list(_health.values())
+    return {tracker.name: tracker.snapshot() for tracker in trackers}
+
+
+def by_health(calls: List[Tuple[str, Any]], skip_open: bool = True) -> List[Tuple[str, Any]]:
+    """
+    Order (provider, ...) fallbacks by observed health, dropping providers whose
+    circuit is open unless `skip_open` is False. Scores are compared to one
+    decimal so the given order (preference) still breaks ties between
+    similarly healthy providers. A provider due for its recovery probe goes
+    first, otherwise a working fallback would keep it from ever being retried.
+    """
+    ranked = []
+    for position, call in enumerate(calls):
+        health = get_health(call[0])
+        if skip_open and not health.available():
+            continue
+        bucket = -2.0 if health.probe_due() else -round(health.score(), 1)
+        ranked.append((bucket, position, call))
+    return [call for _, _, call in sorted(ranked, key=lambda item: item[:2])]
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header (delta-seconds or HTTP date) into seconds.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def limited_get(provider: str, url: str, params: Optional[Dict] = None,
+                timeout: float = 5, retries: int = 2, **kwargs) -> requests.Response:
+    """
+    requests.get() behind the provider's rate limiter and circuit breaker.
+
+    Throttle responses (429/503) pause the provider for Retry-After and are
+    retried while the wait fits in MAX_WAIT; the last response is returned
+    as-is so callers keep their existing status handling.
+    """
+    limiter = get_limiter(provider)
+    health = get_health(provider)
+    probe = health.check()
+    outcome, started = None, time.monotonic()
+
+    try:
+        cassette.expect_http(provider, url, params=params, **kwargs)
+        for attempt in range(retries + 1):
+            _acquire(limiter, health, probe)
+            started = time.monotonic()
+            try:
+                response = cassette.http_get(provider, url, params=params, timeout=time_left(timeout), **kwargs)
+            except Exception as e:
+                limiter.release(ok=False)
+                if isinstance(e, requests.Timeout) and _out_of_time():
+                    raise DeadlineExceeded(f"{provider}: time budget spent") from e
+                outcome = False
+                raise
+
+            if response.status_code not in THROTTLE_STATUS:
+                limiter.release(ok=response.status_code < 500)
+                outcome = response.status_code < 500 and response.status_code not in FAILURE_STATUS
+                return response
+
+            limiter.release(ok=False)
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            limiter.backoff(retry_after)
+            if attempt == retries or (retry_after or 0) > min(MAX_WAIT, time_left(MAX_WAIT)):
+                return response
+
+        return response
+    finally:
+        health.record(outcome, time.monotonic() - started, probe)
+
+
+def _throttle_info(error: Exception):
+    """
+    Work out whether an SDK exception is a throttle, and its Retry-After if any.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status not in THROTTLE_STATUS:
+        return False, None
+    headers = getattr(response, "headers", None) or {}
+    return True, parse_retry_after(headers.get("retry-after") or headers.get("Retry-After"))
+
+
+def _acquire(limiter: ProviderLimiter, health: Optional[ProviderHealth] = None, probe: bool = False) -> None:
+    """
+    Queue for a provider slot, for no longer than the current deadline allows.
+    With `health`, callers stop queueing (CircuitOpen) once the circuit opens:
+    calls queued behind the failures that opened it must not go out either.
+    """
+    abandon = None if health is None or probe else (lambda: not health.available())
+    try:
+        limiter.acquire(time_left(MAX_WAIT), abandon, paced=not cassette.replaying_fast())
+    except RateLimitExceeded as e:
+        if _out_of_time():
+            raise DeadlineExceeded(f"{limiter.name}: time budget spent") from e
+        if abandon and abandon():
+            health.reject()
+        raise
+    if abandon and abandon():
+        limiter.release(ok=None)
+        health.reject()
+
+
+# SDK calls that can't take a timeout run here while a deadline is active,
+# so the caller can stop waiting for them
+_call_pool = ThreadPoolExecutor(max_workers=int(os.getenv("CALL_POOL_SIZE", "16")),
+                                thread_name_prefix="provider-call")
+
+
+def _run_bounded(limiter: ProviderLimiter, fn: Callable, args: tuple, kwargs: Dict) -> Any:
+    scope = _current_deadline.get()
+    if scope is None:
+        return fn(*args, **kwargs)
+
+    started = time.monotonic()
+    future = submit(_call_pool, fn, *args, **kwargs)
+    try:
+        return future.result(timeout=time_left())
+    except FutureTimeout:
+        scope.mark_cut_short()
+        # The call keeps running; give its slot back (and score the provider) when it finally finishes
+        health = get_health(limiter.name)
+
+        def finished(f: Future) -> None:
+            ok = f.exception() is None
+            limiter.release(ok=ok)
+            health.record(ok if ok or not _throttle_info(f.exception())[0] else None, time.monotonic() - started)
+
+        future.add_done_callback(finished)
+        raise DeadlineExceeded(f"{limiter.name}: time budget spent")
+
+
+def limited_call(provider: str, fn: Callable, *args, retries: int = 2, **kwargs) -> Any:
+    """
+    Call an SDK function (OpenAI, SerpAPI, DuckDuckGo...) behind the provider's rate limiter
+    and circuit breaker. Inside a deadline scope the caller stops waiting once the budget is spent.
+    """
+    limiter = get_limiter(provider)
+    health = get_health(provider)
+    probe = health.check()
+    outcome, started = None, time.monotonic()
+    fn = cassette.wrap_call(provider, fn)
+
+    try:
+        cassette.expect_call(provider, fn, args, kwargs)
+        for attempt in range(retries + 1):
+            _acquire(limiter, health, probe)
+            started = time.monotonic()
+            try:
+                result = _run_bounded(limiter, fn, args, kwargs)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                limiter.release(ok=False)
+                throttled, retry_after = _throttle_info(e)
+                if not throttled:
+                    outcome = False
+                if not throttled or attempt == retries or (retry_after or 0) > min(MAX_WAIT, time_left(MAX_WAIT)):
+                    raise
+                limiter.backoff(retry_after)
+                continue
+
+            limiter.release(ok=True)
+            outcome = True
+            return result
+    finally:
+        health.record(outcome, time.monotonic() - started, probe)
+
+
+def limited_stream(provider: str, fn: Callable, *args, retries: int = 2, **kwargs) -> Iterator[Any]:
+    """
+    Like limited_call, for SDK calls that return a stream (e.g. OpenAI stream=True).
+    The provider slot is held until the stream is consumed, and consumption
+    stops with DeadlineExceeded once the current deadline has passed.
+    """
+    limiter = get_limiter(provider)
+    health = get_health(provider)
+    probe = health.check()
+    outcome, started = None, time.monotonic()
+    first_chunk_at = None  # stream latency is time to first chunk, not output length
+    fn = cassette.wrap_stream(provider, fn)
+
+    try:
+        cassette.expect_call(provider, fn, args, kwargs)
+        for attempt in range(retries + 1):
+            _acquire(limiter, health, probe)
+            started = time.monotonic()
+            yielded = failed = False
+            stream = None
+            try:
+                stream = fn(*args, **kwargs)
+                for chunk in stream:
+                    if not yielded:
+                        outcome, first_chunk_at = True, time.monotonic()
+                    yielded = True
+                    time_left()
+                    yield chunk
+                outcome = True
+                return
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                failed = True
+                throttled, retry_after = _throttle_info(e)
+                if not throttled:
+                    outcome = False
+                # Only retry before anything was yielded; the caller already has the rest
+                if yielded or not throttled or attempt == retries or (retry_after or 0) > min(MAX_WAIT, time_left(MAX_WAIT)):
+                    raise
+                limiter.backoff(retry_after)
+            finally:
+                if hasattr(stream, "close"):
+                    stream.close()  # stopped early: drop the connection instead of draining it
+                limiter.release(ok=not failed)
+    finally:
+        health.record(outcome, (first_chunk_at or time.monotonic()) - started, probe)
+
+
+# ============================================================================
+# IN-FLIGHT REQUEST COALESCING
+# ============================================================================
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Share one in-flight call between concurrent callers with the same key.
+
+    The first caller (the leader) runs the function; everyone who arrives
+    while it is running waits for, and receives a copy of, the same result
+    (or runs the function itself if the leader ran out of time).
+    Nothing is remembered once the call finishes - this is not a cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Any, _Flight] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def do(self, name: str, key: Any, fn: Callable, *args, **kwargs) -> Any:
+        flight_key = (name, key)
+        with self._lock:
+            counters = self.stats.setdefault(name, {"calls": 0, "coalesced": 0})
+            counters["calls"] += 1
+            flight = self._flights.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[flight_key] = _Flight()
+            else:
+                counters["coalesced"] += 1
+
+        if not leader:
+            # Wait for the leader, but not past our own deadline
+            if not flight.done.wait(time_left()):
+                time_left()  # marks the scope and raises DeadlineExceeded
+            if isinstance(flight.error, DeadlineExceeded):
+                # The leader ran out of *its* time budget; ours may allow the call
+                return fn(*args, **kwargs)
+            if flight.error is not None:
+                raise flight.error
+            # Each follower gets its own copy of the snapshot, so nobody shares
+            # objects with the leader (who may mutate its result) or each other
+            return copy.deepcopy(flight.result)
+
+        try:
+            result = fn(*args, **kwargs)
+            # Snapshot before anyone is woken, while the leader can't have touched it yet
+            flight.result = copy.deepcopy(result)
+            return result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(flight_key, None)
+            flight.done.set()
+
+
+_single_flight = SingleFlight()
+
+
+def _call_key(args: tuple, kwargs: Dict) -> str:
+    return json.dumps([args, kwargs], sort_keys=True, default=str)
+
+
+def coalesce(fn: Callable) -> Callable:
+    """
+    Decorator: concurrent calls with identical arguments share one upstream request.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return _single_flight.do(fn.__name__, _call_key(args, kwargs), fn, *args, **kwargs)
+    return wrapper
+
+
+def coalesce_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Per-function call and coalesced counts for this process.
+    """
+    with _single_flight._lock:
+        return {name: dict(counters) for name, counters in _single_flight.stats.items()}
+
+
+# ============================================================================
+# HEDGED REQUESTS
+# ============================================================================
+
+# Shared pool for racing providers; losers that are already running finish
+# here in the background and their results are dropped.
+_hedge_pool = ThreadPoolExecutor(max_workers=int(os.getenv("HEDGE_POOL_SIZE", "16")),
+                                 thread_name_prefix="hedge")
+_hedge_lock = threading.Lock()
+_hedge_wins: Dict[str, int] = {}
+
+
+def hedged(calls: List[Tuple[str, Callable[[], Any]]], delay: float,
+           accept: Callable[[Any], bool] = bool, timeout: Optional[float] = None) -> Any:
+    """
+    Race `calls` (name, fn) in preference order and return the first acceptable result.
+
+    The first call starts immediately; each next one starts when `delay`
+    seconds pass without an answer, or as soon as a running call fails.
+    Returns None when every call fails or `timeout` (default: the current
+    deadline) runs out.
+    """
+    scope = _current_deadline.get()
+    if scope is not None:
+        timeout = scope.remaining() if timeout is None else min(timeout, scope.remaining())
+    give_up_at = None if timeout is None else time.monotonic() + timeout
+    queue = list(calls)
+    running: Dict[Future, str] = {}
+
+    def launch_next() -> None:
+        name, fn = queue.pop(0)
+        running[submit(_hedge_pool, fn)] = name
+
+    launch_next()
+    while running:
+        wait_for = delay if queue else None
+        if give_up_at is not None:
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0:
+                break
+            wait_for = remaining if wait_for is None else min(wait_for, remaining)
+
+        done, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+        if not done:
+            if queue:
+                launch_next()  # hedge: the current leader is slow
+            continue
+
+        for future in done:
+            name = running.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Hedged {name} error: {e}")
+                result = None
+            if accept(result):
+                for loser in running:
+                    loser.cancel()
+                with _hedge_lock:
+                    _hedge_wins[name] = _hedge_wins.get(name, 0) + 1
+                return result
+            if queue:
+                launch_next()  # failed: don't wait out the delay
+
+    for loser in running:
+        loser.cancel()
+    if running and scope is not None:
+        _out_of_time()
+    return None
+
+
+def hedge_stats() -> Dict[str, int]:
+    """
+    How often each provider won a hedged race in this process.
+    """
+    with _hedge_lock:
+        return dict(_hedge_wins)
@@ -0,0 +1,305 @@
+"""
+Saved Itineraries
+Every generated itinerary is saved to a local SQLite store, together with
+the day visuals generated for it. Its id (the generation job's id) is a
+share link: `?trip=<id>` reopens it in milliseconds, after a browser
+refresh, a server restart or on another machine of the same deployment,
+without generating it again.
+
+Itineraries are stored as compact JSON, deflated with a preset dictionary
+of the keys every itinerary repeats, behind a one-byte format version.
+Day visuals are stored as image bytes, since the generated image URLs
+expire after about an hour.
+
+    python saved.py list
+    python saved.py purge --days 90 --max-mb 500
+
+The app purges on its own too, at most once per PURGE_EVERY_S: itineraries
+not opened for ITINERARY_RETENTION_DAYS (default 90), then the least
+recently opened ones until the store fits ITINERARY_STORE_MAX_MB (default 500).
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import requests
+
+import cassette
+from cache import CACHE_DIR
+
+STORE_PATH = os.getenv("ITINERARY_STORE_PATH", os.path.join(CACHE_DIR, "itineraries.sqlite3"))
+RETENTION_DAYS = float(os.getenv("ITINERARY_RETENTION_DAYS", "90"))
+MAX_STORE_MB = float(os.getenv("ITINERARY_STORE_MAX_MB", "500"))
+PURGE_EVERY_S = 3600
+
+# Format 1: zlib (level 9) over compact UTF-8 JSON, primed with _ZDICT.
+# The dictionary is part of the format: never edit it, add a format 2 instead.
+FORMAT = 1
+_ZDICT = (
+    '"generation":{"seconds":"degraded":[],"reused":[]},"source":"normals"'
+    '"precipitation_probability":"precipitation_sum":"temperature_2m_min":"temperature_2m_max":'
+    '"current":{"temperature_2m":"relative_humidity_2m":"wind_speed_10m":"daily":{"time":['
+    '"urlToImage":"publishedAt":"source":{"name":"url":"https://'
+    '"price_calendar":"score":"link":"image":"reviews":"rating":"price":"address":'
+    '"hotel_alternatives":[{"hotels":[{"clothing_tips":"trip_weather":[{"weather":{'
+    '"timezone":"admin1":"country":"latitude":"longitude":"destination":{"id":'
+    '"from_place":"to_place":"start_date":"num_days":"num_people":"budget":'
+    '"images":{"news":[{"title":"description":"activities":[{"'
+    '"daily_plans":"daily_plans_list":[{"day":"date":"highlight":"visiting "location":"text":"\\n    ### Day '
+    '**Morning (9:00 AM - 12:00 PM)**\\n    - **Afternoon (12:00 PM - 5:00 PM)**\\n    - '
+    '**Evening (5:00 PM - 9:00 PM)**\\n    - **Weather:** **Tips:** "weather_code":'
+    '"attractions":[{"name":"type":"Attraction","lat":"lon":"summary":"'
+).encode("utf-8")
+
+_local = threading.local()
+_purge_lock = threading.Lock()
+_last_purge = 0.0
+
+
+def _connect() -> sqlite3.Connection:
+    """
+    One connection per thread, like the provider cache.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        directory = os.path.dirname(STORE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(STORE_PATH, timeout=10)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # only takes effect on a new file
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS itineraries (
+                id TEXT PRIMARY KEY,
+                label TEXT NOT NULL,
+                start_date TEXT,
+                created_at REAL NOT NULL,
+                opened_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                body BLOB NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS day_images (
+                itinerary_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (itinerary_id, key)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS itineraries_opened ON itineraries (opened_at)")
+        _local.conn = conn
+    return conn
+
+
+# ============================================================================
+# SERIALIZATION
+# ============================================================================
+
+def pack(itinerary: Dict[str, Any]) -> bytes:
+    body = json.dumps(itinerary, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    compressor = zlib.compressobj(9, zdict=_ZDICT)
+    return bytes([FORMAT]) + compressor.compress(body) + compressor.flush()
+
+
+def unpack(blob: bytes) -> Dict[str, Any]:
+    if not blob or blob[0] != FORMAT:
+        raise ValueError(f"Unknown saved itinerary format {blob[:1]!r}")
+    decompressor = zlib.decompressobj(zdict=_ZDICT)
+    return json.loads(decompressor.decompress(blob[1:]) + decompressor.flush())
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+def save(itinerary_id: str, itinerary: Dict[str, Any]) -> Optional[int]:
+    """
+    Save (or overwrite) an itinerary under its share id. Returns its stored size.
+    """
+    try:
+        blob = pack(itinerary)
+        now = time.time()
+        conn = _connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO itineraries (id, label, start_date, created_at, opened_at, size, body) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (itinerary_id, itinerary.get("to_place", ""), itinerary.get("start_date"), now, now, len(blob), blob)
+            )
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        print(f"Itinerary save error: {e}")
+        return None
+    _maybe_purge()
+    return len(blob)
+
+
+def load(itinerary_id: str) -> Optional[Dict[str, Any]]:
+    """
+    A saved itinerary, or None. Opening it keeps it from aging out.
+    """
+    try:
+        conn = _connect()
+        row = conn.execute("SELECT body FROM itineraries WHERE id = ?", (itinerary_id,)).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE itineraries SET opened_at = ? WHERE id = ?", (time.time(), itinerary_id))
+        return unpack(row[0])
+    except (sqlite3.Error, ValueError, zlib.error) as e:
+        print(f"Itinerary load error for {itinerary_id}: {e}")
+        return None
+
+
+def download_image(url: str) -> Optional[bytes]:
+    try:
+        response = cassette.http_get("images", url, timeout=10)
+        if response.status_code == 200 and response.content:
+            return response.content
+    except (requests.RequestException, cassette.ReplayMiss, cassette.ReplayedError) as e:
+        print(f"Day image download error: {e}")
+    return None
+
+
+def save_image(itinerary_id: str, key: str, data: bytes) -> None:
+    """
+    Keep a generated day visual with its itinerary (only if the itinerary is saved).
+    """
+    try:
+        conn = _connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO day_images (itinerary_id, key, data) "
+                "SELECT id, ?, ? FROM itineraries WHERE id = ?",
+                (key, data, itinerary_id)
+            )
+    except sqlite3.Error as e:
+        print(f"Day image save error: {e}")
+
+
+def load_images(itinerary_id: str) -> Dict[str, bytes]:
+    try:
+        rows = _connect().execute(
+            "SELECT key, data FROM day_images WHERE itinerary_id = ?", (itinerary_id,)
+        ).fetchall()
+    except sqlite3.Error as e:
+        print(f"Day image load error: {e}")
+        return {}
+    return {key: bytes(data) for key, data in rows}
+
+
+def list_saved(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Saved itineraries, most recently opened first, with their size including day visuals.
+    """
+    rows = _connect().execute(f"""
+        SELECT i.id, i.label, i.start_date, i.created_at, i.opened_at,
+               i.size + COALESCE(SUM(LENGTH(d.data)), 0), COUNT(d.key)
+        FROM itineraries i LEFT JOIN day_images d ON d.itinerary_id = i.id
+        GROUP BY i.id ORDER BY i.opened_at DESC {'LIMIT ?' if limit else ''}
+    """, (limit,) if limit else ()).fetchall()
+    return [{
+        "id": row[0],
+        "label": row[1],
+        "start_date": row[2],
+        "created": row[3],
+        "opened": row[4],
+        "bytes": row[5],
+        "images": row[6],
+    } for row in rows]
+
+
+def delete(itinerary_ids: List[str]) -> None:
+    conn = _connect()
+    with conn:
+        conn.executemany("DELETE FROM day_images WHERE itinerary_id = ?", [(i,) for i in itinerary_ids])
+        conn.executemany("DELETE FROM itineraries WHERE id = ?", [(i,) for i in itinerary_ids])
+
+
+def purge(max_age_s: Optional[float] = None, max_bytes: Optional[float] = None) -> int:
+    """
+    Delete itineraries not opened for `max_age_s`, then the least recently
+    opened ones until the rest fit in `max_bytes`. Returns how many went.
+    """
+    saved = list_saved()
+    doomed = []
+    if max_age_s is not None:
+        cutoff = time.time() - max_age_s
+        doomed = [item["id"] for item in saved if item["opened"] < cutoff]
+    if max_bytes is not None:
+        kept = [item for item in saved if item["id"] not in doomed]
+        total = sum(item["bytes"] for item in kept)
+        for item in reversed(kept):  # least recently opened first
+            if total <= max_bytes:
+                break
+            doomed.append(item["id"])
+            total -= item["bytes"]
+
+    if doomed:
+        delete(doomed)
+        _connect().execute("PRAGMA incremental_vacuum")
+    return len(doomed)
+
+
+def _maybe_purge() -> None:
+    global _last_purge
+    with _purge_lock:
+        if time.time() - _last_purge < PURGE_EVERY_S:
+            return
+        _last_purge = time.time()
+    try:
+        removed = purge(RETENTION_DAYS * 86400, MAX_STORE_MB * 2 ** 20)
+        if removed:
+            print(f"Purged {removed} saved itineraries")
+    except sqlite3.Error as e:
+        print(f"Itinerary purge error: {e}")
+
+
+def store_stats() -> Dict[str, Any]:
+    """
+    Saved itinerary count and total size, for the metrics panel.
+    """
+    try:
+        count, body_bytes = _connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM itineraries").fetchone()
+        (image_bytes,) = _connect().execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM day_images").fetchone()
+    except sqlite3.Error:
+        return {"itineraries": 0, "mb": 0.0}
+    return {"itineraries": count, "mb": round((body_bytes + image_bytes) / 2 ** 20, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List or purge saved itineraries.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    listing = commands.add_parser("list", help="most recently opened first")
+    listing.add_argument("--limit", type=int, default=None)
+    purging = commands.add_parser("purge", help="delete by age since last opened and by total size")
+    purging.add_argument("--days", type=float, default=None, help="not opened for this many days")
+    purging.add_argument("--max-mb", type=float, default=None, help="then the oldest until the store fits")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        print(f"{'id':14}{'destination':32}{'start':12}{'last opened':18}{'KB':>8}{'images':>8}")
+        for item in list_saved(args.limit):
+            opened = datetime.fromtimestamp(item["opened"]).strftime("%Y-%m-%d %H:%M")
+            print(f"{item['id']:14}{item['label'][:30]:32}{item['start_date'] or '':12}{opened:18}"
+                  f"{item['bytes'] / 1024:>8.1f}{item['images']:>8}")
+        stats = store_stats()
+        print(f"{stats['itineraries']} itineraries, {stats['mb']} MB in {STORE_PATH}")
+    else:
+        if args.days is None and args.max_mb is None:
+            parser.error("purge needs --days and/or --max-mb")
+        removed = purge(None if args.days is None else args.days * 86400,
+                        None if args.max_mb is None else args.max_mb * 2 ** 20)
+        print(f"Removed {removed} itineraries; {store_stats()['mb']} MB left")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import gzip
+
+import pytest
+import requests
+
+import cassette
+import providers
+
+
+def response(body=b'{"ok": true}', status=200):
+    res = requests.Response()
+    res.status_code = status
+    res._content = body
+    res.headers["Content-Type"] = "application/json"
+    return res
+
+
+def test_match_key_ignores_dict_order():
+    a = cassette.Cassette.match_key("geoapify", "http", {"url": "u", "params": {"lat": 1, "lon": 2}})
+    b = cassette.Cassette.match_key("geoapify", "http", {"params": {"lon": 2, "lat": 1}, "url": "u"})
+    assert a == b and len(a) == 20
+
+
+@pytest.mark.parametrize("provider, kind, params", [
+    ("open_meteo", "http", {"lat": 1, "lon": 2}),
+    ("geoapify", "call", {"lat": 1, "lon": 2}),
+    ("geoapify", "http", {"lat": 1, "lon": 3}),
+])
+def test_match_key_depends_on_provider_kind_and_request(provider, kind, params):
+    base = cassette.Cassette.match_key("geoapify", "http", {"url": "u", "params": {"lat": 1, "lon": 2}})
+    assert cassette.Cassette.match_key(provider, kind, {"url": "u", "params": params}) != base
+
+
+def test_redact_drops_secrets_and_volatile_fields_at_any_depth():
+    request = {
+        "apiKey": "k1", "q": "Paris", "timeout": 5,
+        "headers": {"Authorization": "Bearer t", "Accept": "json"},
+        "nested": [{"token": "t2", "keep": 1}],
+    }
+    assert cassette._redact(request) == {"q": "Paris", "headers": {"Accept": "json"}, "nested": [{"keep": 1}]}
+
+
+def test_requests_match_whatever_the_key_and_timeout(tmp_path, monkeypatch):
+    path = str(tmp_path / "run.cassette")
+    monkeypatch.setattr(cassette.requests, "get", lambda url, **kwargs: response())
+    with cassette.use(path, cassette.RECORD):
+        cassette.http_get("newsapi", "https://example.test/news", params={"q": "Paris", "apiKey": "secret-1"},
+                          timeout=5)
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert "secret-1" not in f.read()
+
+    monkeypatch.setattr(cassette.requests, "get", lambda url, **kwargs: pytest.fail("went to the network"))
+    with cassette.use(path, cassette.REPLAY_FAST):
+        replayed = cassette.http_get("newsapi", "https://example.test/news",
+                                     params={"q": "Paris", "apiKey": "secret-2"}, timeout=30)
+        assert replayed.json() == {"ok": True}
+        with pytest.raises(cassette.ReplayMiss):
+            cassette.http_get("newsapi", "https://example.test/news", params={"q": "Rome"})
+
+
+def test_recorded_errors_replay_with_their_status(tmp_path, monkeypatch):
+    path = str(tmp_path / "run.cassette")
+
+    def throttled(url, **kwargs):
+        res = response(b"slow down", 429)
+        res.headers["Retry-After"] = "3"
+        raise requests.HTTPError("429 Too Many Requests", response=res)
+
+    monkeypatch.setattr(cassette.requests, "get", throttled)
+    with cassette.use(path, cassette.RECORD), pytest.raises(requests.HTTPError):
+        cassette.http_get("serpapi", "https://example.test/hotels")
+    with cassette.use(path, cassette.REPLAY_FAST), pytest.raises(cassette.ReplayedError) as error:
+        cassette.http_get("serpapi", "https://example.test/hotels")
+    assert error.value.status_code == 429
+    assert error.value.response.headers["Retry-After"] == "3"
+
+
+def test_abandoned_stream_replays_as_cut_short(tmp_path):
+    path = str(tmp_path / "run.cassette")
+
+    def numbers(count):
+        yield from range(count)
+
+    with cassette.use(path, cassette.RECORD):
+        stream = cassette.wrap_stream("openai", numbers)(10)
+        assert [next(stream), next(stream)] == [0, 1]
+        stream.close()
+        assert list(cassette.wrap_stream("openai", numbers)(3)) == [0, 1, 2]
+
+    entries = list(cassette.read_entries(path))
+    assert [entry.get("truncated", False) for entry in entries] == [True, False]
+
+    with cassette.use(path, cassette.REPLAY_FAST):
+        replayed = cassette.wrap_stream("openai", numbers)(10)
+        assert [next(replayed), next(replayed)] == [0, 1]
+        with pytest.raises(providers.DeadlineExceeded):
+            next(replayed)
+        assert list(cassette.wrap_stream("openai", numbers)(3)) == [0, 1, 2]
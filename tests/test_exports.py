@@ -0,0 +1,84 @@
+import exports
+
+DAY_PLAN = """
+### Day 1 - Old Town, Forts & Markets 🌟
+**Morning (9:00 AM - 12:00 PM)**
+- Walk the ramparts; start early
+**Afternoon (12:00 PM - 5:00 PM)**
+- Spice market
+**Evening (5:00 PM - 9:00 PM)**
+- Sunset at the beach
+**Weather:** Sunny, 31°C
+**Tips:** Carry water
+"""
+
+
+def itinerary(timezone="Asia/Kolkata", start="2026-03-28"):
+    return {
+        "from_place": "Mumbai",
+        "to_place": "Goa",
+        "start_date": start,
+        "num_days": 1,
+        "destination": {"name": "Goa", "country": "India", "latitude": 15.4909, "longitude": 73.8278,
+                        "timezone": timezone},
+        "daily_plans_list": [{"day": 1, "date": start, "text": DAY_PLAN}],
+    }
+
+
+def unfold(ics):
+    return ics.replace("\r\n ", "")
+
+
+def field(ics, name):
+    return [line.split(":", 1)[1] for line in unfold(ics).split("\r\n") if line.startswith(name + ":")]
+
+
+def test_fold_keeps_lines_within_75_octets():
+    line = "DESCRIPTION:" + "a" * 200
+    folded = exports._ics_fold(line)
+    parts = folded.split("\r\n")
+    assert all(len(part.encode("utf-8")) <= 75 for part in parts)
+    assert all(part.startswith(" ") for part in parts[1:])
+    assert unfold(folded) == line
+
+
+def test_fold_never_splits_a_utf8_character():
+    line = "SUMMARY:" + "é" * 40 + "🌟" * 10
+    parts = exports._ics_fold(line).split("\r\n")
+    assert all(len(part.encode("utf-8")) <= 75 for part in parts)
+    for part in parts:
+        part.encode("utf-8").decode("utf-8")  # every piece is whole characters
+    assert unfold(exports._ics_fold(line)) == line
+
+
+def test_short_lines_are_not_folded():
+    assert exports._ics_fold("VERSION:2.0") == "VERSION:2.0"
+
+
+def test_events_are_in_utc_from_the_destination_time_zone():
+    ics = exports.to_ics(itinerary())
+    # Goa is UTC+5:30 with no daylight saving
+    assert field(ics, "DTSTART") == ["20260328T033000Z", "20260328T063000Z", "20260328T113000Z"]
+    assert field(ics, "DTEND") == ["20260328T063000Z", "20260328T113000Z", "20260328T153000Z"]
+
+
+def test_utc_conversion_follows_daylight_saving():
+    winter = exports.to_ics(itinerary("Europe/Paris", "2026-03-28"))
+    summer = exports.to_ics(itinerary("Europe/Paris", "2026-03-29"))
+    assert field(winter, "DTSTART")[0] == "20260328T080000Z"
+    assert field(summer, "DTSTART")[0] == "20260329T070000Z"
+
+
+def test_unknown_time_zone_gives_floating_times():
+    ics = exports.to_ics(itinerary(timezone="Nowhere/Special"))
+    assert field(ics, "DTSTART")[0] == "20260328T090000"
+
+
+def test_text_is_escaped_and_lines_end_in_crlf():
+    ics = exports.to_ics(itinerary())
+    assert ics.endswith("END:VCALENDAR\r\n")
+    assert "\n" not in ics.replace("\r\n", "")
+    assert field(ics, "SUMMARY")[0] == r"Day 1 morning: Old Town\, Forts & Markets"
+    assert field(ics, "DESCRIPTION")[0] == r"- Walk the ramparts\; start early\nWeather: Sunny\, 31°C\nTip: Carry water"
+    assert field(ics, "GEO") == ["15.490900;73.827800"] * 3
+    assert len(set(field(ics, "UID"))) == 3
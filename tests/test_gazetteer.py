@@ -0,0 +1,91 @@
+import pytest
+
+import gazetteer
+
+# id, name, ascii name, alternate names, lat, lon, country, admin1, population, timezone
+CITIES = [
+    (2988507, "Paris", "Paris", "Lutetia", 48.85341, 2.3488, "FR", "11", 2138551, "Europe/Paris"),
+    (4717560, "Paris", "Paris", "", 33.66094, -95.55551, "US", "TX", 24171, "America/Chicago"),
+    (2988506, "Parisot", "Parisot", "", 44.2667, 1.8500, "FR", "76", 500, "Europe/Paris"),
+    (3448439, "São Paulo", "Sao Paulo", "Sampa", -23.5475, -46.63611, "BR", "27", 10021295, "America/Sao_Paulo"),
+    (5112375, "Springfield Gardens", "Springfield Gardens", "", 40.66312, -73.76221, "US", "NY", 30000,
+     "America/New_York"),
+]
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    root = tmp_path_factory.mktemp("gazetteer")
+    source, countries, admin1 = root / "cities.txt", root / "countryInfo.txt", root / "admin1.txt"
+    source.write_text("".join(
+        "\t".join([str(i), name, ascii_name, alternates, str(lat), str(lon), "P", "PPL", country, "",
+                   region, "", "", "", str(population), "", "", tz, "2024-01-01"]) + "\n"
+        for i, name, ascii_name, alternates, lat, lon, country, region, population, tz in CITIES
+    ), encoding="utf-8")
+    countries.write_text("FR\tFRA\t250\tFR\tFrance\nUS\tUSA\t840\tUS\tUnited States\nBR\tBRA\t076\tBR\tBrazil\n",
+                         encoding="utf-8")
+    admin1.write_text("FR.11\tÎle-de-France\nUS.TX\tTexas\nUS.NY\tNew York\n", encoding="utf-8")
+    gazetteer.build_gazetteer(str(source), str(root / "index"), str(countries), str(admin1), alternates=True)
+    return gazetteer.Gazetteer(str(root / "index"))
+
+
+def test_lower_bound_is_the_first_key_not_below_the_target(index):
+    keys = [index._key(i) for i in range(index.n_keys)]
+    assert keys == sorted(keys)
+    for target in [b"", b"par", b"paris", b"parisot", b"sao", b"zzz"]:
+        i = index._lower_bound(target)
+        assert all(key < target for key in keys[:i])
+        assert all(key >= target for key in keys[i:])
+
+
+def test_prefix_search_ranks_by_population(index):
+    assert [(r["name"], r["country"]) for r in index.search("pari")] == [
+        ("Paris", "France"), ("Paris", "United States"), ("Parisot", "France")]
+    assert [r["name"] for r in index.search("pari", limit=1)] == ["Paris"]
+
+
+def test_exact_search_skips_longer_names(index):
+    assert [r["name"] for r in index.search("paris", exact=True)] == ["Paris", "Paris"]
+    assert index.search("pari", exact=True) == []
+    assert index.search("springfield", exact=True) == []
+    assert [r["name"] for r in index.search("springfield")] == ["Springfield Gardens"]
+
+
+def test_search_folds_case_and_accents(index):
+    assert [r["id"] for r in index.search("SAO PAULO", exact=True)] == [3448439]
+    assert [r["id"] for r in index.search("são p")] == [3448439]
+
+
+def test_search_matches_alternate_names(index):
+    assert [r["id"] for r in index.search("lutetia", exact=True)] == [2988507]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Paris, France", [2988507, 2988506]),
+    ("Paris, fr", [2988507, 2988506]),
+    ("paris, texas", [4717560]),
+    ("Paris, Île", [2988507]),
+    ("paris, ile-de", [2988507]),
+    ("paris, Germany", []),
+])
+def test_qualifier_narrows_by_country_or_region(index, query, expected):
+    assert [r["id"] for r in index.search(query)] == expected
+
+
+def test_record_shape_matches_the_geocoder(index):
+    (paris,) = index.search("paris, texas")
+    assert paris == {
+        "id": 4717560, "latitude": 33.66094, "longitude": -95.55551, "name": "Paris",
+        "country": "United States", "admin1": "Texas", "timezone": "America/Chicago",
+    }
+
+
+@pytest.mark.parametrize("query, name, expected", [
+    ("Paris", "Paris", True),
+    ("paris, France", "Paris", True),
+    (" são paulo ", "Sao Paulo", True),
+    ("Paris", "Parisot", False),
+    ("Springfield", "Springfield Gardens", False),
+])
+def test_names_match(query, name, expected):
+    assert gazetteer.names_match(query, {"name": name}) is expected
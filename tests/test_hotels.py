@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+import hotels
+
+
+def columns(price, rating, reviews, lat=None, lon=None):
+    n = len(price)
+    return {
+        "price": np.asarray(price, dtype=np.float64),
+        "rating": np.asarray(rating, dtype=np.float64),
+        "reviews": np.asarray(reviews, dtype=np.float64),
+        "lat": np.asarray(lat if lat is not None else [np.nan] * n, dtype=np.float64),
+        "lon": np.asarray(lon if lon is not None else [np.nan] * n, dtype=np.float64),
+    }
+
+
+def test_parse_prices_reads_numbers_and_display_strings():
+    prices = hotels.parse_prices([4500, 3200.5, "₹1,200", "2,999", "12000", None, "", "Sold out", float("nan")])
+    np.testing.assert_array_equal(prices[:5], [4500.0, 3200.5, 1200.0, 2999.0, 12000.0])
+    assert np.isnan(prices[5:]).all()
+    assert prices.dtype == np.float64
+
+
+def test_parse_prices_of_nothing():
+    assert hotels.parse_prices([]).shape == (0,)
+
+
+def test_to_columns_prefers_the_numeric_price():
+    props = [
+        {"rate_per_night": {"extracted_lowest": 5000, "lowest": "₹5,100"}, "overall_rating": "4.2", "reviews": 10,
+         "gps_coordinates": {"latitude": 15.5, "longitude": 73.8}},
+        {"rate_per_night": {"lowest": "₹2,400"}},
+        {},
+    ]
+    cols = hotels.to_columns(props)
+    np.testing.assert_array_equal(cols["price"][:2], [5000.0, 2400.0])
+    assert np.isnan(cols["price"][2]) and np.isnan(cols["rating"][1])
+    np.testing.assert_array_equal(cols["reviews"], [10.0, 0.0, 0.0])
+    assert cols["rating"][0] == 4.2 and cols["lat"][0] == 15.5
+
+
+def test_score_is_between_0_and_1_and_nan_without_a_price():
+    scores = hotels.score(columns([3000, 9000, np.nan], [4.5, 3.0, 4.9], [800, 20, 5000]), 2000, 4000)
+    assert np.isnan(scores[2])
+    assert ((scores[:2] >= 0) & (scores[:2] <= 1)).all()
+
+
+def test_score_rewards_rating_backed_by_reviews():
+    few, many = hotels.score(columns([3000, 3000], [5.0, 5.0], [3, 3000]), 2000, 4000)
+    assert many > few
+    low, high = hotels.score(columns([3000, 3000], [3.0, 4.8], [500, 500]), 2000, 4000)
+    assert high > low
+
+
+def test_score_price_fit_peaks_mid_band_and_decays_outside():
+    scores = hotels.score(columns([3000, 2000, 6000, 20000], [4.0] * 4, [100] * 4), 2000, 4000)
+    assert scores[0] > scores[1] > scores[2] > scores[3]
+    # At the band edge the price fit is half the mid-band one
+    assert scores[0] - scores[1] == pytest.approx(hotels.W_PRICE * 0.5)
+
+
+def test_score_prefers_hotels_near_the_centroid():
+    cols = columns([3000, 3000, 3000], [4.0] * 3, [100] * 3, lat=[15.50, 15.60, np.nan], lon=[73.80, 73.95, np.nan])
+    near, far, unknown = hotels.score(cols, 2000, 4000, centroid=(15.50, 73.80))
+    assert near > unknown > far
+    # Without a centroid distance is neutral for everyone
+    assert np.ptp(hotels.score(cols, 2000, 4000)) == 0
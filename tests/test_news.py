@@ -0,0 +1,56 @@
+import numpy as np
+
+import news
+
+STORY = ("The city's annual jazz festival returns to the riverside this weekend "
+         "with more than forty concerts, late night food stalls and free workshops for children")
+
+
+def article(title, description, published, **extra):
+    return {"title": title, "description": description, "publishedAt": published, **extra}
+
+
+def test_minhash_is_deterministic_and_sized():
+    signature = news.minhash(STORY)
+    assert signature.shape == (news.NUM_PERM,)
+    assert signature.dtype == np.uint64
+    assert np.array_equal(signature, news.minhash(STORY))
+
+
+def test_minhash_ignores_case_and_punctuation():
+    assert np.array_equal(news.minhash(STORY), news.minhash(STORY.upper().replace(",", " ; ")))
+
+
+def test_minhash_agreement_tracks_shared_shingles():
+    reworded = STORY.replace("this weekend", "on saturday")
+    unrelated = "Heavy rain is expected across the northern coast with strong winds and possible flooding on monday"
+    base = news.minhash(STORY)
+    assert (base == news.minhash(reworded)).mean() >= news.DUPLICATE_THRESHOLD
+    assert (base == news.minhash(unrelated)).mean() < 0.2
+
+
+def test_minhash_of_empty_text():
+    assert news.minhash("").shape == (news.NUM_PERM,)
+
+
+def test_collapse_keeps_the_earliest_copy_and_counts_the_rest():
+    original = article("Jazz festival returns", STORY, "2026-05-01T08:00:00Z")
+    syndicated = article("Jazz festival returns", STORY, "2026-05-01T10:00:00Z", urlToImage="https://img/jazz.jpg")
+    reposted = article("Jazz festival returns!", STORY + " tickets on sale now", "2026-05-02T09:00:00Z")
+    other = article("Museum night", "All city museums stay open until midnight with guided tours",
+                    "2026-05-01T09:00:00Z")
+
+    kept = news.collapse_duplicates([reposted, other, syndicated, original])
+
+    assert [a["publishedAt"] for a in kept] == ["2026-05-01T08:00:00Z", "2026-05-01T09:00:00Z"]
+    assert kept[0]["_copies"] == 3
+    assert kept[0]["urlToImage"] == "https://img/jazz.jpg"  # filled in from a later copy
+    assert "_copies" not in kept[1]
+
+
+def test_ranking_prefers_relevant_recent_stories_and_drops_private_fields():
+    now = "2099-01-01T00:00:00Z"
+    relevant = article("Festival and concert guide", "Events, exhibitions and nightlife", now, _copies=2)
+    irrelevant = article("Road works", "Lane closures on the ring road", now)
+    ranked = news.rank_articles([irrelevant, relevant], limit=1)
+    assert ranked == [{k: v for k, v in relevant.items() if k != "_copies"}]
@@ -0,0 +1,43 @@
+import pytest
+
+import places
+
+
+@pytest.mark.parametrize("latitude, longitude, expected", [
+    (57.64911, 10.40744, "u4pruydqqvj"),   # the geohash.org reference point
+    (48.8584, 2.2945, "u09tunquc"),
+    (-33.8568, 151.2153, "r3gx2"),
+])
+def test_encode_matches_standard_geohash(latitude, longitude, expected):
+    assert places.encode(latitude, longitude, len(expected)) == expected
+
+
+@pytest.mark.parametrize("latitude, longitude", [(57.64911, 10.40744), (-33.8568, 151.2153), (0.0, 0.0)])
+def test_bounds_contain_the_encoded_point(latitude, longitude):
+    south, west, north, east = places.bounds(places.encode(latitude, longitude, 6))
+    assert south <= latitude < north
+    assert west <= longitude < east
+
+
+def test_bounds_cells_have_the_precision_size():
+    south, west, north, east = places.bounds("u09tu")
+    # 5 characters: 12 latitude bits, 13 longitude bits
+    assert north - south == pytest.approx(180 / 2 ** 12)
+    assert east - west == pytest.approx(360 / 2 ** 13)
+
+
+def test_encode_clamps_the_edges_of_the_map():
+    assert places.encode(90.0, 180.0, 4) == "zzzz"
+    assert places.encode(-90.0, -180.0, 4) == "0000"
+
+
+def test_covering_tiles_start_with_the_tile_of_the_point():
+    tiles = places.covering_tiles(48.8584, 2.2945, 3000)
+    assert tiles[0][1] == places.encode(48.8584, 2.2945)
+    assert len({geohash for _, geohash in tiles}) == len(tiles)
+
+
+def test_covering_tiles_wrap_at_the_antimeridian():
+    tiles = places.covering_tiles(0.0, 179.999, 5000)
+    wests = {places.bounds(geohash)[1] for _, geohash in tiles}
+    assert min(wests) < -179 and max(wests) > 179
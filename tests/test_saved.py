@@ -0,0 +1,50 @@
+import json
+import zlib
+from datetime import date
+
+import pytest
+
+import saved
+
+ITINERARY = {
+    "from_place": "Mumbai",
+    "to_place": "São Paulo",
+    "start_date": "2026-11-02",
+    "num_days": 2,
+    "destination": {"id": 3448439, "name": "São Paulo", "latitude": -23.5475, "longitude": -46.63611},
+    "daily_plans_list": [
+        {"day": 1, "date": "2026-11-02", "highlight": "visiting Ibirapuera", "text": "### Day 1 - Parks 🌟"},
+        {"day": 2, "date": "2026-11-03", "highlight": "visiting MASP", "text": "### Day 2 - Museums 🌟"},
+    ],
+    "hotels": [{"name": "Hotel Unique", "price": 21000.0, "rating": 4.6, "reviews": 1840}],
+    "generation": {"seconds": 6.2, "degraded": [], "reused": ["news"]},
+}
+
+
+def test_pack_round_trips():
+    assert saved.unpack(saved.pack(ITINERARY)) == ITINERARY
+
+
+def test_pack_writes_the_format_byte_then_a_zdict_stream():
+    blob = saved.pack(ITINERARY)
+    assert blob[0] == saved.FORMAT
+    decompressor = zlib.decompressobj(zdict=saved._ZDICT)
+    body = decompressor.decompress(blob[1:]) + decompressor.flush()
+    assert body == json.dumps(ITINERARY, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    with pytest.raises(zlib.error):
+        zlib.decompress(blob[1:])  # needs the preset dictionary
+
+
+def test_the_preset_dictionary_shrinks_itineraries():
+    body = json.dumps(ITINERARY, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    assert len(saved.pack(ITINERARY)) - 1 < len(zlib.compress(body, 9))
+
+
+def test_pack_stringifies_what_json_cannot_hold():
+    assert saved.unpack(saved.pack({"start_date": date(2026, 11, 2)})) == {"start_date": "2026-11-02"}
+
+
+@pytest.mark.parametrize("blob", [b"", bytes([2]) + b"later format", b"{\"plain\": \"json\"}"])
+def test_unpack_rejects_unknown_formats(blob):
+    with pytest.raises(ValueError):
+        saved.unpack(blob)
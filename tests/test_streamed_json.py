@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from app import iter_json_array_items
+
+ITEMS = [
+    {"name": "Louvre", "type": "Museum", "tags": ["art", {"wing": "Denon"}]},
+    {"name": "Café {de Flore}", "summary": "Say \"bonjour\" \\ then order"},
+    {"name": "Seine", "lat": 48.85, "lon": 2.35},
+]
+TEXT = "```json\n[\n" + ",\n".join(json.dumps(item, ensure_ascii=False) for item in ITEMS) + "\n]\n```"
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, len(TEXT)])
+def test_items_parse_whatever_the_chunking(size):
+    assert list(iter_json_array_items(chunked(TEXT, size))) == ITEMS
+
+
+def test_items_arrive_as_soon_as_they_close():
+    pulled = []
+
+    def chunks():
+        for chunk in chunked(TEXT, 5):
+            pulled.append(chunk)
+            yield chunk
+
+    items = iter_json_array_items(chunks())
+    first = next(items)
+    assert first == ITEMS[0]
+    assert len("".join(pulled)) < TEXT.index(json.dumps(ITEMS[1], ensure_ascii=False)) + 5
+
+
+def test_stops_reading_at_the_end_of_the_array():
+    def chunks():
+        yield '[{"name": "A"}]'
+        raise AssertionError("read past the closing bracket")
+
+    assert list(iter_json_array_items(chunks())) == [{"name": "A"}]
+
+
+def test_chatter_before_the_array_is_skipped():
+    assert list(iter_json_array_items(['Sure! Here you go:\n[{"name": "A"}]'])) == [{"name": "A"}]
+
+
+def test_malformed_item_is_skipped_not_the_whole_list():
+    text = '[\n{"name": "A"},\n{"name": "B", "summary": "unescaped "quote" here},\n{"name": "C"}\n]'
+    assert list(iter_json_array_items([text])) == [{"name": "A"}, {"name": "C"}]
+
+
+def test_unterminated_item_is_dropped_at_the_next_line_object():
+    text = '[\n{"name": "A", "summary": "cut off"\n{"name": "B"}\n]'
+    assert list(iter_json_array_items([text])) == [{"name": "B"}]
+
+
+def test_truncated_stream_keeps_the_complete_items():
+    text = TEXT[:TEXT.index('"Seine"') + 3]
+    assert list(iter_json_array_items(chunked(text, 4))) == ITEMS[:2]
@@ -0,0 +1,201 @@
+"""
+Cache Warmer
+Refreshes cached provider data for top destinations before it expires, so the
+first traveller of the day doesn't pay cold latency on every provider.
+
+Usage:
+    python warm_cache.py top_destinations.txt
+    python warm_cache.py top_destinations.txt --budget 150 --refresh-ahead 1800
+    python warm_cache.py top_destinations.txt --loop 900     # keep running, every 15 min
+
+Cron example (every 30 minutes):
+    */30 * * * * cd /path/to/app && python warm_cache.py top_destinations.txt --budget 100
+"""
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import app
+import cache
+import climate
+import news
+import places
+from gazetteer import load_gazetteer, names_match
+
+# Credits charged per upstream refresh. Open-Meteo is free; everything else
+# is metered by the provider (OpenAI tokens, Geoapify/NewsAPI/Unsplash quotas).
+CREDIT_COSTS = {
+    "geocode_location": 0,
+    "get_weather": 0,
+    "get_attractions": 1,
+    "get_activities": 1,
+    "geoapify_tile": 1,
+    "get_latest_news": 1,
+    "find_image": 1,
+}
+
+# Geoapify tiles within this distance of a destination are kept warm
+WARM_PLACES_RADIUS_M = 3000
+
+
+class BudgetExhausted(Exception):
+    """Raised when the next refresh would go over the credit budget."""
+
+
+class Warmer:
+    def __init__(self, budget: float, refresh_ahead: float):
+        self.budget = budget
+        self.refresh_ahead = refresh_ahead
+        self.spent = 0.0
+        self.refreshed = 0
+        self.fresh = 0
+        self._lock = threading.Lock()
+
+    def _charge(self, name: str) -> None:
+        cost = CREDIT_COSTS.get(name, 1)
+        with self._lock:
+            if self.spent + cost > self.budget:
+                raise BudgetExhausted(f"credit budget of {self.budget:g} reached")
+            self.spent += cost
+            self.refreshed += 1
+
+    def warm(self, fn: Callable, *args, **kwargs):
+        """
+        Return fn's result, refreshing it upstream if it is missing or about to expire.
+        """
+        remaining = fn.expires_in(*args, **kwargs)
+        if remaining is not None and remaining > self.refresh_ahead:
+            with self._lock:
+                self.fresh += 1
+            return fn(*args, **kwargs)
+
+        self._charge(fn.__name__)
+        return fn.refresh(*args, **kwargs)
+
+    def warm_news(self, destination: str) -> None:
+        """
+        News keeps its own incremental store, refreshed every NEWS_REFRESH_S.
+        That interval is usually shorter than --refresh-ahead, so refresh
+        ahead by at most half of it: otherwise the threshold goes negative
+        and every pass spends a credit on a store refreshed moments ago.
+        """
+        ahead = min(self.refresh_ahead, news.REFRESH_INTERVAL_S / 2)
+        age = news.news_age(destination)
+        if age is not None and age < news.REFRESH_INTERVAL_S - ahead:
+            with self._lock:
+                self.fresh += 1
+            return
+
+        self._charge("get_latest_news")
+        news.refresh_news(destination)
+
+    def warm_places(self, latitude: float, longitude: float) -> None:
+        """
+        Geoapify places are cached per geohash tile; refresh the tiles nearest
+        the destination (the ones a generate query reads first).
+        """
+        api_key = os.getenv("GEOAPIFY_API_KEY")
+        if not api_key:
+            return
+        for _, geohash in places.covering_tiles(latitude, longitude, WARM_PLACES_RADIUS_M):
+            remaining = places.tile_expires_in(geohash)
+            if remaining is not None and remaining > self.refresh_ahead:
+                with self._lock:
+                    self.fresh += 1
+                continue
+            self._charge("geoapify_tile")
+            places.fetch_tile(geohash, places.DEFAULT_CATEGORIES, api_key)
+
+    def warm_destination(self, query: str) -> None:
+        """
+        Warm everything the generate flow fetches for a destination,
+        with the same arguments main() uses so the entries are hits.
+        """
+        gazetteer = load_gazetteer()
+        candidates = gazetteer.search(query, limit=1, exact=True) if gazetteer is not None else []
+        if not candidates:
+            candidates = [c for c in self.warm(app.geocode_location, query) or [] if names_match(query, c)]
+        if not candidates:
+            print(f"  ⚠️  {query}: no place of that exact name")
+            return
+        place = candidates[0]
+        name = place["name"]
+
+        self.warm(app.get_weather, place["latitude"], place["longitude"], place.get("timezone", "UTC"))
+        attractions = self.warm(app.get_attractions, name, limit=4) or []
+        self.warm_places(place["latitude"], place["longitude"])
+        attractions += app.get_geoapify_attractions(place["latitude"], place["longitude"], limit=6)
+        activities = self.warm(app.get_activities, name, limit=6) or []
+        self.warm_news(name)
+
+        # Free and fetched at most once per grid cell; later runs only open the file
+        try:
+            climate.load_normals(place["latitude"], place["longitude"])
+        except Exception as e:
+            print(f"  ⚠️  {query}: climate normals unavailable ({e})")
+
+        for item in attractions + activities:
+            if item.get("name"):
+                self.warm(app.find_image, item["name"])
+
+        print(f"  ✅ {query} -> {name}, {place.get('country', '')}")
+
+
+def read_destinations(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def run_once(destinations: List[str], budget: float, refresh_ahead: float, workers: int) -> Dict[str, float]:
+    warmer = Warmer(budget, refresh_ahead)
+    start = time.time()
+
+    def task(query: str) -> None:
+        try:
+            warmer.warm_destination(query)
+        except BudgetExhausted as e:
+            print(f"  ⏹️  {query}: skipped, {e}")
+        except Exception as e:
+            print(f"  ❌ {query}: {e}")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(task, destinations))
+
+    return {
+        "refreshed": warmer.refreshed,
+        "already_fresh": warmer.fresh,
+        "credits_spent": warmer.spent,
+        "seconds": round(time.time() - start, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-warm the provider cache for top destinations.")
+    parser.add_argument("destinations", help="Text file with one destination per line")
+    parser.add_argument("--budget", type=float, default=100, help="Max credits to spend per run (default: 100)")
+    parser.add_argument("--refresh-ahead", type=float, default=3600,
+                        help="Refresh entries expiring within this many seconds (default: 3600)")
+    parser.add_argument("--workers", type=int, default=2, help="Destinations warmed in parallel (default: 2)")
+    parser.add_argument("--loop", type=float, default=0, help="Repeat every N seconds instead of exiting")
+    parser.add_argument("--purge-after", type=float, default=7 * 24 * 3600,
+                        help="Drop entries expired for longer than this many seconds (default: 7 days)")
+    args = parser.parse_args()
+
+    while True:
+        destinations = read_destinations(args.destinations)
+        print(f"🔥 Warming {len(destinations)} destinations (budget {args.budget:g} credits)")
+        summary = run_once(destinations, args.budget, args.refresh_ahead, args.workers)
+        purged = cache.purge(older_than=args.purge_after)
+        print(f"📊 {summary} | purged {purged} old entries")
+
+        if not args.loop:
+            break
+        time.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    main()